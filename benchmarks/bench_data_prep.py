@@ -0,0 +1,76 @@
+"""Timing comparison of the row-wise and the vectorized data preparation.
+
+Usage:
+    python benchmarks/bench_data_prep.py [--repeat 5] [--scales 1 10 50]
+
+The raw data, see DASHBOARD_DATA_PATH, is read once and replicated to simulate larger order histories.
+"""
+import argparse
+import os
+import sys
+import timeit
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../src'))
+
+from utils.data_prep import (DATA_PATH, _calculate_delivery_details, _calculate_month_and_year,  # noqa: E402
+                             _drop_unnecessary_columns, _rename_columns, read_raw_data)
+
+
+def _determine_delivery_indicator(row: pd.Series) -> str:
+    """Return the delivery indicator (previous row-wise implementation)."""
+    if row['Delivery Deviation (Days)'] <= 0:
+        return 'in time'
+    elif row['Delivery Deviation (Days)'] < 5:
+        return 'late: < 5 days'
+    elif row['Delivery Deviation (Days)'] > 10:
+        return 'late: > 10 days'
+
+    return 'late: 5 to 10 days'
+
+
+def _row_wise_preparation(df: pd.DataFrame) -> None:
+    """Month, year and delivery details as computed before the vectorization."""
+    df['Year'] = df['Document Date'].dt.year
+    df['Month'] = df['Document Date'].dt.month
+    df['Year/Month'] = pd.to_datetime(df['Document Date']).dt.to_period('M')
+    df['Delivery Deviation (Days)'] = (df['Delivery Date'] - df['Supplier Delivery Date']).dt.days
+    df['Deviation Indicator'] = df.apply(_determine_delivery_indicator, axis=1)
+
+
+def _vectorized_preparation(df: pd.DataFrame) -> None:
+    """Month, year and delivery details as computed by utils.data_prep."""
+    _calculate_month_and_year(df)
+    _calculate_delivery_details(df)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help='Number of timed runs per implementation.')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 50], help='Replication factors of the data.')
+    args = parser.parse_args()
+
+    df_raw = read_raw_data(DATA_PATH)
+    _rename_columns(df_raw)
+    _drop_unnecessary_columns(df_raw)
+
+    print(f'{"rows":>10} {"row-wise [s]":>14} {"vectorized [s]":>16} {"speedup":>9}')
+
+    for scale in args.scales:
+        df = pd.concat([df_raw] * scale, ignore_index=True)
+
+        df_row_wise = df.copy()
+        df_vectorized = df.copy()
+        _row_wise_preparation(df_row_wise)
+        _vectorized_preparation(df_vectorized)
+        pd.testing.assert_frame_equal(df_row_wise, df_vectorized)
+
+        row_wise = min(timeit.repeat(lambda: _row_wise_preparation(df.copy()), number=1, repeat=args.repeat))
+        vectorized = min(timeit.repeat(lambda: _vectorized_preparation(df.copy()), number=1, repeat=args.repeat))
+
+        print(f'{len(df):>10} {row_wise:>14.4f} {vectorized:>16.4f} {row_wise / vectorized:>8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Timing comparison of the row-wise and the vectorized formatting of bar labels.
+
+Usage:
+    python benchmarks/bench_format_numbers.py [--repeat 5] [--sizes 10 100 10000]
+
+The numbers span the magnitudes of both metrics, i.e. integer order counts and
+ordered spend amounts up to the trillions.
+"""
+import argparse
+import os
+import sys
+import timeit
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../src'))
+
+from utils.charts import format_numbers  # noqa: E402
+
+
+def _numpy_float_is_int(x_float: Union[float, np.float64]) -> bool:
+    """Check if float number is approximately an integer (previous row-wise implementation)."""
+    x_int = np.around(x_float, 0)
+    x_res = x_float % x_int
+    return np.isclose(x_res, 0.0)
+
+
+def _format_numbers_row_wise(row: pd.Series, displayed: str) -> str:
+    """Format numbers to be displayed (previous row-wise implementation)."""
+    suffices = ['', 'k', 'M', 'B', 'T']
+    counter = 0
+    number = row[displayed]
+
+    if number < 1000 and (isinstance(number, int) or (_numpy_float_is_int(number))):
+        return f'{int(number)}'
+
+    while number >= 1000:
+        number /= 1000
+        counter += 1
+
+    return f'{number:.1f}{suffices[counter]}'
+
+
+def _sample(size: int, rng: np.random.Generator) -> pd.DataFrame:
+    """Bar chart data with one column per metric."""
+    return pd.DataFrame({
+        'Ordered Spend': rng.random(size) * 10.0**rng.integers(0, 15, size),
+        'Number of Orders': rng.integers(1, 10**rng.integers(1, 7, size)).astype(np.float64),
+    })
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help='Number of timed runs per implementation.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 10000], help='Numbers of bars.')
+    args = parser.parse_args()
+
+    # The row-wise implementation divides by zero for numbers that round to 0
+    np.seterr(divide='ignore', invalid='ignore')
+    rng = np.random.default_rng(0)
+
+    print(f'{"bars":>8} {"metric":>17} {"row-wise [s]":>14} {"vectorized [s]":>16} {"speedup":>9}')
+
+    for size in args.sizes:
+        df = _sample(size, rng)
+
+        for displayed in df.columns:
+            row_wise_labels = df.apply(lambda row: _format_numbers_row_wise(row, displayed), axis=1)
+            pd.testing.assert_series_equal(row_wise_labels, format_numbers(df[displayed]))
+
+            row_wise = min(
+                timeit.repeat(
+                    lambda: df.apply(lambda row: _format_numbers_row_wise(row, displayed), axis=1),
+                    number=1,
+                    repeat=args.repeat,
+                ))
+            vectorized = min(timeit.repeat(lambda: format_numbers(df[displayed]), number=1, repeat=args.repeat))
+
+            print(f'{size:>8} {displayed:>17} {row_wise:>14.5f} {vectorized:>16.5f} {row_wise / vectorized:>8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+"""Benchmark suite of the data preparation, the pre-aggregation, the filtering and the charts.
+
+Usage:
+    python benchmarks/bench_suite.py [--scales 1 10] [--repeat 5] [--stages prepare builders filter charts]
+                                     [--input orders.parquet] [--output benchmark.json]
+
+Every stage is timed separately for every data size, the filter and chart
+stages additionally for every filter selectivity. The raw data, the source
+data of the dashboard or e.g. the output of benchmarks/generate_data.py, is
+read once and replicated to simulate larger order histories. The application
+cache is replaced by a null cache, so memoized functions compute on every call.
+
+The JSON report holds per stage, data size and selectivity the median and the
+spread (interquartile range, minimum and maximum) of the run times and the peak
+memory allocated while the stage ran, measured in a separate traced run.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../src'))
+
+from app import app, cache  # noqa: E402
+
+from charts.ordered_spend_charts import (get_data_os_by_month_charts,  # noqa: E402
+                                         get_data_os_top_10_suppliers_charts, get_data_os_total_by_year_charts,
+                                         os_by_month_chart, os_by_org_chart, os_top_10_suppliers_chart,
+                                         os_total_by_year_chart)
+from charts.supplier_performance_charts import (get_data_sp_by_month_charts, get_data_sp_by_org_charts,  # noqa: E402
+                                                get_data_sp_deviation_cause_and_indicator_charts,
+                                                get_data_sp_top_10_suppliers_charts,
+                                                get_data_sp_total_deviation_and_percentage_charts, sp_by_month_chart,
+                                                sp_by_org_chart, sp_deviation_cause_and_indicator_chart,
+                                                sp_top_10_suppliers_chart, sp_total_deviation_and_percentage_chart)
+from utils.data_prep import DATA_PATH, copy_and_apply_filter, prepare_data, read_raw_data  # noqa: E402
+from utils.filter_index import FILTER_COLUMNS, FilterIndex  # noqa: E402
+from utils.periods import get_comparison, get_month_index  # noqa: E402
+
+STAGES = ('prepare', 'builders', 'filter', 'charts')
+
+BUILDERS = {
+    'os_total_by_year': get_data_os_total_by_year_charts,
+    'os_by_month': get_data_os_by_month_charts,
+    'os_top_10_suppliers': get_data_os_top_10_suppliers_charts,
+    'sp_total_deviation_and_reference': get_data_sp_total_deviation_and_percentage_charts,
+    'sp_deviation_cause_and_indicator': get_data_sp_deviation_cause_and_indicator_charts,
+    'sp_by_month': get_data_sp_by_month_charts,
+    'sp_by_org': get_data_sp_by_org_charts,
+    'sp_top_10_suppliers': get_data_sp_top_10_suppliers_charts,
+}
+
+FILTER_ARGUMENTS = ('company_code', 'purchasing_org', 'plant', 'material_group')
+
+
+def _measure(func: Callable[[], Any], repeat: int) -> dict[str, float]:
+    """Time the function and trace the peak memory it allocates."""
+    tracemalloc.start()
+    func()
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    times = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    quartiles = np.percentile(times, [25, 75])
+
+    return {
+        'median_s': statistics.median(times),
+        'iqr_s': float(quartiles[1] - quartiles[0]),
+        'min_s': min(times),
+        'max_s': max(times),
+        'peak_memory_bytes': peak_memory,
+    }
+
+
+def _selectivities(df: pd.DataFrame) -> dict[str, dict[str, Optional[Any]]]:
+    """Return filters of decreasing selectivity, each setting the most frequent values."""
+    most_frequent = df.groupby(list(FILTER_COLUMNS), observed=True).size().idxmax()
+    values = dict(zip(FILTER_ARGUMENTS, most_frequent))
+    values['material_group'] = str(values['material_group'])
+
+    filters = {'none': {}}
+    filters['company_code'] = {'company_code': values['company_code']}
+    filters['company_code_and_plant'] = {'company_code': values['company_code'], 'plant': values['plant']}
+    filters['all_filters'] = values
+
+    return {
+        name: {argument: _python_scalar(selected.get(argument)) for argument in FILTER_ARGUMENTS}
+        for name, selected in filters.items()
+    }
+
+
+def _python_scalar(value: Any) -> Any:
+    """Convert NumPy scalars, as the dropdowns deliver Python values."""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _selectivity(df: pd.DataFrame, filters: dict[str, Any]) -> float:
+    """Return the fraction of rows matching the filters."""
+    positions = FilterIndex(df).positions(**filters)
+    return 1.0 if positions is None else len(positions) / len(df)
+
+
+def _chart_calls(aggregates: dict[str, Any], filters: dict[str, Any]) -> dict[str, Callable[[], Any]]:
+    """Return the undecorated chart functions bound to their pre-aggregates and the filters."""
+    sp_reference, sp_all = aggregates['sp_total_deviation_and_reference']
+
+    calls = {
+        'os_total_by_year_chart': lambda: os_total_by_year_chart.uncached(
+            aggregates['os_total_by_year'], False, **filters),
+        'os_by_month_chart': lambda: os_by_month_chart.uncached(aggregates['os_by_month'], False, **filters),
+        'os_by_org_chart': lambda: os_by_org_chart.uncached(aggregates['os_total_by_year'], False, **filters),
+        'os_top_10_suppliers_chart': lambda: os_top_10_suppliers_chart.uncached(
+            aggregates['os_top_10_suppliers'], False, **filters),
+        'sp_total_deviation_and_percentage_chart': lambda: sp_total_deviation_and_percentage_chart.uncached(
+            sp_reference, sp_all, False, **filters),
+        'sp_deviation_cause_and_indicator_chart': lambda: sp_deviation_cause_and_indicator_chart.uncached(
+            aggregates['sp_deviation_cause_and_indicator'], False, **filters),
+        'sp_by_month_chart': lambda: sp_by_month_chart.uncached(aggregates['sp_by_month'], False, **filters),
+        'sp_by_org_chart': lambda: sp_by_org_chart.uncached(aggregates['sp_by_org'], False, **filters),
+        'sp_top_10_suppliers_chart': lambda: sp_top_10_suppliers_chart.uncached(
+            aggregates['sp_top_10_suppliers'], False, **filters),
+    }
+
+    return calls
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10], help='Replication factors of the data.')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of timed runs per measurement.')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES), help='Stages to measure.')
+    parser.add_argument('--input', default=DATA_PATH, help='Raw data, an Excel, CSV or Parquet file.')
+    parser.add_argument('--output', default='benchmark.json', help='Path of the JSON report.')
+    args = parser.parse_args()
+
+    # Memoized functions must compute on every call
+    cache.init_app(app.server, config={'CACHE_TYPE': 'NullCache'})
+
+    df_raw = read_raw_data(args.input)
+    results = []
+
+    def record(stage: str, name: str, rows: int, func: Callable[[], Any], **context: Any) -> None:
+        measurement = _measure(func, args.repeat)
+        results.append({'stage': stage, 'name': name, 'rows': rows, **context, **measurement})
+        print(f'{stage:>9} {name:<42} {rows:>10} {context.get("filters", ""):>23} '
+              f'{measurement["median_s"]:>10.4f}s {measurement["peak_memory_bytes"] / 1e6:>9.1f} MB')
+
+    print(f'{"stage":>9} {"name":<42} {"rows":>10} {"filters":>23} {"median":>11} {"peak":>12}')
+
+    for scale in args.scales:
+        df_scaled = pd.concat([df_raw] * scale, ignore_index=True)
+        rows = len(df_scaled)
+
+        if 'prepare' in args.stages:
+            record('prepare', 'prepare_data', rows, lambda: prepare_data(df_scaled.copy()))
+
+        df = prepare_data(df_scaled.copy())
+        comparison = get_comparison(get_month_index(df).latest)
+        del df_scaled
+
+        if 'builders' in args.stages:
+            for name, build in BUILDERS.items():
+                record('builders', f'get_data_{name}', rows, lambda: build(df, comparison))
+
+        aggregates = {name: build(df, comparison) for name, build in BUILDERS.items()}
+
+        for selectivity_name, filters in _selectivities(df).items():
+            context = {'filters': selectivity_name, 'selectivity': _selectivity(df, filters)}
+
+            if 'filter' in args.stages:
+                record('filter', 'copy_and_apply_filter', rows,
+                       lambda: copy_and_apply_filter(df, **filters), **context)
+
+            if 'charts' in args.stages:
+                for name, call in _chart_calls(aggregates, filters).items():
+                    record('charts', name, rows, call, **context)
+
+    report = {
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+        },
+        'input': os.path.basename(args.input),
+        'repeat': args.repeat,
+        'results': results,
+    }
+
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+
+    print(f'Report written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,301 @@
+"""Generator of synthetic purchasing data in the raw schema of data/Daten I.xlsx.
+
+Usage:
+    python benchmarks/generate_data.py --rows 10000000 --output orders.parquet [--seed 0]
+                                       [--suppliers 2000] [--materials 50000] [--material-groups 400]
+                                       [--start 2019-01-01] [--end 2020-12-31]
+
+The columns, their names and order match the Excel-File, so the output runs
+through the regular preparation (utils.data_prep.prepare_data). Cardinalities
+and distributions follow the Excel-File: few company codes, purchasing
+organisations and plants, suppliers and materials with skewed popularity,
+material groups and postal codes mixing numbers and strings, mostly single-item
+purchasing documents and rare deviations. The rows are generated and written in
+chunks, so tens of millions of rows fit into memory. The output format follows
+the file extension: .xlsx (at most 1,048,575 rows), .csv or .parquet.
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+EXCEL_MAX_ROWS = 1048575
+
+CHUNK_SIZE = 1000000
+
+# Company code, country, purchasing organisations and plants
+ORGANISATION = [
+    (52, 'AT', [5200, 5210], [51]),
+    (53, 'GB', [54, 5310, 5320], [51, 61, 6599, 9699]),
+    (54, 'DE', [5400, 5410, 5420], [51, 61, 62, 77, 78, 3799, 5899]),
+]
+
+SUPPLIER_COUNTRIES = {
+    'FR': 0.52, 'DE': 0.36, 'GB': 0.06, 'BE': 0.02, 'SE': 0.014, 'IT': 0.006,
+    'AT': 0.005, 'ES': 0.004, 'US': 0.003, 'NL': 0.001, 'LU': 0.001, 'RO': 0.001,
+}
+
+ORDER_UNITS = {'ST': 0.971, 'M': 0.026, 'L': 0.0015, 'ROL': 0.0007, 'M2': 0.0007, 'KG': 0.0001}
+
+# Deviation cause and its text, 0 is no deviation
+DEVIATION_CAUSES = {
+    0: ('no deviation', 0.981),
+    1: ('damaged goods (obvious defects)', 0.0015),
+    2: ('over-delivery', 0.00025),
+    3: ('under-delivery', 0.0038),
+    4: ('damaged goods and over-delivery', 0.00015),
+    5: ('damaged goods and under-delivery', 0.00075),
+    7: ('delivery deviation - too late', 0.0119),
+    8: ('over-delivery&delivery deviation - too late', 0.00025),
+    9: ('damaged goods & over-delivery & deliv. dev. - too late', 0.0001),
+    10: ('under-delivery&delivery deviation - too late', 0.0005),
+}
+
+LATE_CAUSES = (7, 8, 9, 10)
+UNDER_DELIVERY_CAUSES = (3, 5, 10)
+OVER_DELIVERY_CAUSES = (2, 4, 8, 9)
+
+CITIES = [
+    'COLOMIERS', 'HAMBURG', 'BREMEN', 'TOULOUSE', 'MUENCHEN', 'AUGSBURG', 'STADE', 'BLAGNAC', 'FILTON',
+    'BROUGHTON', 'GETAFE', 'DONAUWOERTH', 'NANTES', 'SAINT-NAZAIRE', 'MARIGNANE', 'KASSEL', 'VAREL',
+    'NORDENHAM', 'LEMWERDER', 'WUPPERTAL-ELBERFELD', 'WREXHAM', 'WATERLOO', 'AICHACH', 'TURNHOUT',
+]
+
+
+def _zipf_weights(size: int, exponent: float = 1.1) -> np.ndarray:
+    """Skewed popularity, the first entries are picked most often."""
+    weights = 1.0 / np.arange(1, size + 1)**exponent
+    return weights / weights.sum()
+
+
+def _choice(rng: np.random.Generator, values: dict, size: int) -> np.ndarray:
+    """Draw keys of the mapping with the probabilities given as values."""
+    keys = np.array(list(values), dtype=object)
+    probabilities = np.array(list(values.values()), dtype=np.float64)
+    return keys[rng.choice(len(keys), size=size, p=probabilities / probabilities.sum())]
+
+
+def _mixed_codes(rng: np.random.Generator, size: int, string_share: float) -> np.ndarray:
+    """Codes as Python ints and, for a share of them, alphanumeric strings as in the Excel-File."""
+    codes = np.empty(size, dtype=object)
+    numeric = rng.integers(1000, 9999, size=size)
+    letters = rng.choice(list('ABCDEGHMPQ'), size=size)
+    is_string = rng.random(size) < string_share
+
+    for position in range(size):
+        if is_string[position]:
+            codes[position] = f'{letters[position]}{numeric[position] % 100:02d}{letters[(position + 1) % size]}'
+        else:
+            codes[position] = int(numeric[position])
+
+    return codes
+
+
+def create_dimensions(rng: np.random.Generator, suppliers: int, materials: int, material_groups: int) -> dict:
+    """Create the suppliers, materials and material groups the order lines refer to."""
+    supplier_countries = _choice(rng, SUPPLIER_COUNTRIES, suppliers)
+
+    dimensions = {
+        'supplier': {
+            'Supplier': rng.choice(np.arange(10000000, 99999999), size=suppliers, replace=False),
+            'Supplier name': np.array([f'SUPPLIER {number:05d} GMBH' for number in range(suppliers)], dtype=object),
+            'Postal code': _mixed_codes(rng, suppliers, string_share=0.08),
+            'Street': np.array([f'{number % 200 + 1} INDUSTRIESTRASSE' for number in range(suppliers)], dtype=object),
+            'City': np.array(CITIES, dtype=object)[rng.integers(0, len(CITIES), size=suppliers)],
+            'Supplier\ncountry': supplier_countries,
+        },
+        'material_group': {
+            'Material Group': _mixed_codes(rng, material_groups, string_share=0.6),
+            'Material Group Text': np.array([f'Material group {number}' for number in range(material_groups)],
+                                            dtype=object),
+        },
+    }
+
+    material_group_of_material = rng.choice(material_groups, size=materials, p=_zipf_weights(material_groups))
+
+    dimensions['material'] = {
+        'Material': rng.choice(np.arange(50000000, 59999999), size=materials, replace=False),
+        'Material Short Text': np.array([f'PART {number:07d}' for number in range(materials)], dtype=object),
+        'material_group': material_group_of_material,
+        'Order Unit': _choice(rng, ORDER_UNITS, materials),
+        'Net price': np.round(rng.lognormal(mean=0.7, sigma=1.6, size=materials), 2) + 0.01,
+    }
+
+    return dimensions
+
+
+def generate_chunk(
+    rng: np.random.Generator,
+    dimensions: dict,
+    rows: int,
+    first_document: int,
+    start: pd.Timestamp,
+    end: pd.Timestamp,
+) -> pd.DataFrame:
+    """Generate order lines of whole purchasing documents in the raw schema.
+
+    Args:
+        rng: Random number generator.
+        dimensions: See create_dimensions.
+        rows: Number of order lines.
+        first_document: Number of the first purchasing document.
+        start, end: Range of the document dates.
+
+    Returns:
+        The order lines.
+    """
+    # Items per document, mostly one as in the Excel-File
+    items_per_document = rng.geometric(0.82, size=rows)
+    number_of_documents = int(np.searchsorted(np.cumsum(items_per_document), rows)) + 1
+    items_per_document = items_per_document[:number_of_documents]
+    items_per_document[-1] -= items_per_document.sum() - rows
+
+    document = np.repeat(np.arange(number_of_documents), items_per_document)
+    item = np.arange(rows) - np.repeat(np.cumsum(items_per_document) - items_per_document, items_per_document) + 1
+
+    # Organisation, supplier and date per document
+    plants = [(code, country, org, plant) for code, country, orgs, plants in ORGANISATION for org in orgs
+              for plant in plants]
+    organisation = rng.integers(0, len(plants), size=number_of_documents)[document]
+    company_code, country, purchasing_org, plant = (np.array(values, dtype=object) for values in zip(*plants))
+
+    supplier = dimensions['supplier']
+    supplier_of_document = rng.choice(len(supplier['Supplier']), size=number_of_documents,
+                                      p=_zipf_weights(len(supplier['Supplier'])))[document]
+
+    days = (end - start).days + 1
+    document_date = start + pd.to_timedelta(rng.integers(0, days, size=number_of_documents)[document], unit='D')
+    supplier_delivery_date = document_date + pd.to_timedelta(7 + (rng.random(rows) < 0.01) * 2, unit='D')
+
+    # Material and quantities per line
+    material = dimensions['material']
+    material_group = dimensions['material_group']
+    material_of_line = rng.choice(len(material['Material']), size=rows, p=_zipf_weights(len(material['Material'])))
+
+    causes = np.array(list(DEVIATION_CAUSES))
+    cause_probabilities = np.array([probability for _, probability in DEVIATION_CAUSES.values()])
+    deviation_cause = causes[rng.choice(len(causes), size=rows, p=cause_probabilities / cause_probabilities.sum())]
+    cause_text = np.array([DEVIATION_CAUSES[cause][0] for cause in causes], dtype=object)
+
+    ordered_quantity = np.round(rng.lognormal(mean=5.0, sigma=2.0, size=rows)).clip(1)
+    delivered_quantity = ordered_quantity.copy()
+    under_delivered = np.isin(deviation_cause, UNDER_DELIVERY_CAUSES)
+    over_delivered = np.isin(deviation_cause, OVER_DELIVERY_CAUSES)
+    delivered_quantity[under_delivered] = np.floor(ordered_quantity[under_delivered] * rng.uniform(
+        0.3, 0.95, size=under_delivered.sum()))
+    delivered_quantity[over_delivered] = np.ceil(ordered_quantity[over_delivered] * rng.uniform(
+        1.05, 1.5, size=over_delivered.sum()))
+
+    late = np.isin(deviation_cause, LATE_CAUSES)
+    early = rng.random(rows) < 0.01
+    deviation_days = np.where(late, rng.integers(1, 30, size=rows), -rng.integers(1, 5, size=rows) * early)
+    delivery_date = supplier_delivery_date + pd.to_timedelta(deviation_days, unit='D')
+
+    net_price = material['Net price'][material_of_line]
+    material_group_of_line = material['material_group'][material_of_line]
+    empty = np.full(rows, np.nan)
+
+    return pd.DataFrame({
+        'Document Date': document_date,
+        'Year/Month': empty,
+        'Year': empty,
+        'Month': empty,
+        'supplier delivery date': supplier_delivery_date,
+        'delivery date': delivery_date,
+        'Company Code': company_code[organisation].astype(np.int64),
+        'Country': country[organisation],
+        'Purchasing Doc.': first_document + document,
+        'Item': item,
+        'Purchasing Org.': purchasing_org[organisation].astype(np.int64),
+        'Plant': plant[organisation].astype(np.int64),
+        'Supplier': supplier['Supplier'][supplier_of_document],
+        'Supplier name': supplier['Supplier name'][supplier_of_document],
+        'Postal code': supplier['Postal code'][supplier_of_document],
+        'Street': supplier['Street'][supplier_of_document],
+        'City': supplier['City'][supplier_of_document],
+        'Supplier\ncountry': supplier['Supplier\ncountry'][supplier_of_document],
+        'Material': material['Material'][material_of_line],
+        'Material Short Text': material['Material Short Text'][material_of_line],
+        'Material Group': material_group['Material Group'][material_group_of_line],
+        'Material Group Text': material_group['Material Group Text'][material_group_of_line],
+        'Order Unit': material['Order Unit'][material_of_line],
+        'Net price': net_price,
+        'ORDERED Quantity': ordered_quantity.astype(np.int64),
+        'Delivered QTY': delivered_quantity.astype(np.int64),
+        'open quantity': np.clip(ordered_quantity - delivered_quantity, 0, None).astype(np.int64),
+        'Delivery deviation  in days': empty,
+        'deviation indicator': empty,
+        'deviation cause': deviation_cause,
+        'deviation cause text': cause_text[np.searchsorted(causes, deviation_cause)],
+        'Net Value': np.round(net_price * ordered_quantity, 2),
+        'Local Currency': 'EUR',
+        'Counter': 1,
+        'Unnamed: 34': empty,
+        'Unnamed: 35': empty,
+    })
+
+
+def _to_parquet_compatible(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert the columns mixing numbers and strings to strings, which Parquet requires."""
+    return df.astype({'Postal code': str, 'Material Group': str})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, required=True, help='Number of order lines.')
+    parser.add_argument('--output', required=True, help='Output file, .xlsx, .csv or .parquet.')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the random number generator.')
+    parser.add_argument('--suppliers', type=int, default=2000, help='Number of suppliers.')
+    parser.add_argument('--materials', type=int, default=50000, help='Number of materials.')
+    parser.add_argument('--material-groups', type=int, default=400, help='Number of material groups.')
+    parser.add_argument('--start', default='2019-01-01', help='First document date.')
+    parser.add_argument('--end', default='2020-12-31', help='Last document date.')
+    args = parser.parse_args()
+
+    extension = os.path.splitext(args.output)[1].lower()
+
+    if extension not in ('.xlsx', '.csv', '.parquet'):
+        parser.error('the output must be an .xlsx, .csv or .parquet file')
+
+    if extension == '.xlsx' and args.rows > EXCEL_MAX_ROWS:
+        parser.error(f'Excel files hold at most {EXCEL_MAX_ROWS} rows, write CSV or Parquet instead')
+
+    rng = np.random.default_rng(args.seed)
+    dimensions = create_dimensions(rng, args.suppliers, args.materials, args.material_groups)
+    start, end = pd.Timestamp(args.start), pd.Timestamp(args.end)
+
+    if extension == '.xlsx':
+        generate_chunk(rng, dimensions, args.rows, 8200000000, start, end).to_excel(args.output, index=False)
+        return
+
+    writer = None
+    first_document = 8200000000
+
+    try:
+        for chunk_start in range(0, args.rows, CHUNK_SIZE):
+            chunk = generate_chunk(rng, dimensions, min(CHUNK_SIZE, args.rows - chunk_start), first_document, start,
+                                   end)
+            first_document = int(chunk['Purchasing Doc.'].iloc[-1]) + 1
+
+            if extension == '.csv':
+                chunk.to_csv(args.output, mode='w' if chunk_start == 0 else 'a', header=chunk_start == 0, index=False)
+            else:
+                table = pa.Table.from_pandas(_to_parquet_compatible(chunk), preserve_index=False)
+
+                if writer is None:
+                    writer = pq.ParquetWriter(args.output, table.schema)
+
+                writer.write_table(table)
+
+            print(f'{chunk_start + len(chunk)} of {args.rows} rows written', file=sys.stderr)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -6,6 +6,8 @@ should only contain setup and boilerplate code.
 import dash_bootstrap_components as dbc
 from dash_extensions.enrich import Dash
 from flask_caching import Cache
+from utils.settings import (DASHBOARD_CACHE_DISK_MAX_BYTES, DASHBOARD_CACHE_GC_INTERVAL,
+                            DASHBOARD_CACHE_MEMORY_MAX_BYTES, DASHBOARD_CACHE_MEMORY_MAX_ENTRIES)
 
 app = Dash(
     __name__,
@@ -21,8 +23,12 @@ app = Dash(
 cache = Cache(
     app.server,
     config={
-        'CACHE_TYPE': 'FileSystemCache',
-        'CACHE_DIR': 'file_system_store',
+        'CACHE_TYPE': 'utils.tiered_cache.TieredCache',
+        'CACHE_DIR': 'file_system_cache',
         'CACHE_DEFAULT_TIMEOUT': 180,
+        'CACHE_MEMORY_MAX_ENTRIES': DASHBOARD_CACHE_MEMORY_MAX_ENTRIES,
+        'CACHE_MEMORY_MAX_BYTES': DASHBOARD_CACHE_MEMORY_MAX_BYTES,
+        'CACHE_DISK_MAX_BYTES': DASHBOARD_CACHE_DISK_MAX_BYTES,
+        'CACHE_GC_INTERVAL': DASHBOARD_CACHE_GC_INTERVAL,
     },
 )
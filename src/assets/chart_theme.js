@@ -0,0 +1,45 @@
+if(!window.dash_clientside) {window.dash_clientside = {};}
+
+// Color the elements of a figure, the traces name their element in the attribute meta
+function applyTheme(figure, theme) {
+  if (!figure.data || !figure.data.length) {
+    let annotations = (figure.layout.annotations || []).map(annotation => ({
+      ...annotation,
+      font: {...annotation.font, color: theme.current},
+    }));
+
+    return {...figure, layout: {...figure.layout, annotations: annotations}};
+  }
+
+  let data = figure.data.map(trace => {
+    let color = theme[trace.meta];
+
+    if (!color) {
+      return trace;
+    }
+
+    if (trace.type === 'indicator') {
+      let number = trace.number || {};
+      return {...trace, number: {...number, font: {...number.font, color: color}}};
+    }
+
+    return {...trace, marker: {...trace.marker, color: color}};
+  });
+
+  return {...figure, data: data};
+}
+
+window.dash_clientside.theme = {
+
+  // Figures of the metric selected in the dropdown menu, in the theme of the active tab
+  selectThemedFigures: function(figures, label, activeTab, themes) {
+    let selected = window.dash_clientside.metric.selectFigures(figures, label);
+    let theme = (themes || {})[activeTab];
+
+    if (!theme) {
+      return selected;
+    }
+
+    return selected.map(figure => applyTheme(figure, theme));
+  },
+}
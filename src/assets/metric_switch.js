@@ -0,0 +1,29 @@
+if(!window.dash_clientside) {window.dash_clientside = {};}
+
+window.dash_clientside.metric = {
+
+  // Label of the dropdown menu after one of its items was clicked
+  dropdownLabel: function(currentLabel, orderedSpendClicks, numberOfOrdersClicks) {
+    let labels = {'ordered-spend-amount': 'Ordered Spend Amount', 'number-of-orders': 'Number of Orders'};
+    let triggered = window.dash_clientside.callback_context.triggered
+      .map(trigger => trigger.prop_id.split('.')[0])
+      .filter(id => id in labels);
+
+    let label = triggered.length ? labels[triggered[0]] : 'Ordered Spend Amount';
+
+    if (label === currentLabel) {
+      return window.dash_clientside.no_update;
+    }
+
+    return label;
+  },
+
+  // The figures of the page hold both metrics, keyed on the label of the dropdown menu
+  selectFigures: function(figures, label) {
+    if (!figures || !figures[label]) {
+      throw window.dash_clientside.PreventUpdate;
+    }
+
+    return figures[label];
+  },
+}
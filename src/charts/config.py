@@ -82,23 +82,19 @@ EMPTY_GRAPH = {
     }
 }
 
-EMPTY_GRAPH_IBCS = {
-    'layout': {
-        'xaxis': {
-            'visible': False
-        },
-        'yaxis': {
-            'visible': False
-        },
-        'annotations': [{
-            'text': 'No matching data found',
-            'xref': 'paper',
-            'yref': 'paper',
-            'showarrow': False,
-            'font': {
-                'size': 28,
-                'color': IBCS_HUE_1
-            }
-        }]
-    }
+# Colors of the chart elements per tab, applied in the browser, see assets/chart_theme.js.
+# The traces name their element in the attribute meta, the message of an empty graph has the color of 'current'.
+CHART_THEMES = {
+    'tab-ordered-spend': {
+        'current': SAP_UI_POINT_CHART_NUMBER,
+        'prior': SAP_UI_CHART_PALETTE_SEMANTIC_NEUTRAL,
+        'current_number': SAP_UI_POINT_CHART_NUMBER,
+        'prior_number': SAP_UI_POINT_CHART_NUMBER,
+    },
+    'tab-ordered-spend-ibcs': {
+        'current': IBCS_HUE_1,
+        'prior': IBCS_HUE_2,
+        'current_number': IBCS_HUE_1,
+        'prior_number': IBCS_HUE_2,
+    },
 }
@@ -3,64 +3,66 @@ import pandas as pd
 import plotly.graph_objects as go
 
 from utils.charts import apply_number_of_orders_flag, format_numbers
-from utils.data_prep import copy_and_apply_filter
+from utils.cube import filter_and_aggregate, pre_aggregate
+from utils.memoize import memoize_figure
+from utils.metrics import instrument_chart
+from utils.periods import Comparison, period_labels, select_periods
 
-from charts.config import (CHART_HEIGHT, CHART_MARGIN, DISPLAY, EMPTY_GRAPH, EMPTY_GRAPH_IBCS, IBCS_HUE_1, IBCS_HUE_2,
-                           NUMBER_OF_ORDERS, ORDERED_SPEND, SAP_FONT, SAP_LABEL_COLOR, SAP_TEXT_COLOR,
-                           SAP_UI_CHART_PALETTE_SEMANTIC_NEUTRAL, SAP_UI_POINT_CHART_LABEL, SAP_UI_POINT_CHART_NUMBER,
+from charts.config import (CHART_HEIGHT, CHART_MARGIN, CHART_THEMES, DISPLAY, EMPTY_GRAPH, NUMBER_OF_ORDERS,
+                           ORDERED_SPEND, SAP_FONT, SAP_LABEL_COLOR, SAP_TEXT_COLOR, SAP_UI_POINT_CHART_LABEL,
                            TEMPLATE, TITLE_FONT_SIZE)
 
 pd.options.mode.chained_assignment = None
 
+# The charts are drawn in the theme of the first tab, the browser applies the theme of the active tab,
+# see assets/chart_theme.js
+DEFAULT_THEME = CHART_THEMES['tab-ordered-spend']
 
+# Grouping applied by each chart after filtering the pre-aggregate
+OS_TOTAL_BY_YEAR_GROUPING = ['Period']
+OS_BY_MONTH_GROUPING = ['Period', 'Month']
+OS_BY_ORG_GROUPING = ['Period', 'Purchasing Org.']
+OS_TOP_10_SUPPLIERS_GROUPING = ['Period', 'Supplier Name']
 
-def get_data_os_total_by_year_charts(df: pd.DataFrame) -> pd.DataFrame:
+
+def get_data_os_total_by_year_charts(df: pd.DataFrame, comparison: Comparison) -> pd.DataFrame:
     """Create DataFrame for total Ordered Spend by year charts."""
-    df_point_charts = df.groupby([
-        'Year',
+    df_point_charts = pre_aggregate(select_periods(df, comparison), [
+        'Period',
         'Company Code',
         'Purchasing Org.',
         'Plant',
         'Material Group',
-    ]).agg({
-        'Purchasing Doc.': 'nunique',
-        'Net Value': 'sum',
-    }).reset_index().rename(columns={
-        'Net Value': ORDERED_SPEND,
-        'Purchasing Doc.': NUMBER_OF_ORDERS,
-    })
+    ])
 
     return df_point_charts
 
 
+@instrument_chart
+@memoize_figure
 def os_total_by_year_chart(
     df: pd.DataFrame,
     number_of_orders: bool,
-    ibcs: bool,
     company_code: str,
     purchasing_org: str,
     plant: str,
     material_group: str,
 ) -> go.Figure:
-    """Creates a figure showing Ordered Spend or Number of Orders of the current and prior year.
+    """Creates a figure showing Ordered Spend or Number of Orders of the current and prior period.
 
     Args:
         df: DataFrame produced by function get_data_os_total_by_year_charts.
         number_of_orders: Flag that dictates whether to display Ordered Spend or Number of Orders.
-        ibcs: Flag that dictates whether to use the IBCS styling.
         company_code, purchasing_org, plant, material_group: Filters from GUI.
 
     Returns:
         Two plotly indicators.
     """
-    df = copy_and_apply_filter(df, company_code, purchasing_org, plant, material_group)
-    df = df.groupby('Year').agg({
-        NUMBER_OF_ORDERS: 'sum',
-        ORDERED_SPEND: 'sum',
-    }).reset_index()
+    current, prior = period_labels(df)
+    df = filter_and_aggregate(df, OS_TOTAL_BY_YEAR_GROUPING, company_code, purchasing_org, plant, material_group)
 
-    df_this_year = df.loc[df['Year'] == 2020]
-    df_last_year = df.loc[df['Year'] == 2019]
+    df_current = df.loc[df['Period'] == current]
+    df_prior = df.loc[df['Period'] == prior]
 
     if number_of_orders:
         displayed = NUMBER_OF_ORDERS
@@ -70,33 +72,26 @@ def os_total_by_year_chart(
         number_suffix = '€'
 
     try:
-        value_this_year = df_this_year[displayed].iloc[0]
+        value_current = df_current[displayed].iloc[0]
     except IndexError:
-        value_this_year = 0
+        value_current = 0
 
     try:
-        value_last_year = df_last_year[displayed].iloc[0]
+        value_prior = df_prior[displayed].iloc[0]
     except IndexError:
-        value_last_year = 0
+        value_prior = 0
 
-    if value_last_year == 0:
+    if value_prior == 0:
         reference_value = None
     else:
-        reference_value = value_last_year
-
-    if ibcs:
-        number_font_color_this_year = IBCS_HUE_1
-        number_font_color_last_year = IBCS_HUE_2
-    else:
-        number_font_color_this_year = SAP_UI_POINT_CHART_NUMBER
-        number_font_color_last_year = SAP_UI_POINT_CHART_NUMBER
+        reference_value = value_prior
 
     fig = go.Figure()
 
     fig.add_trace(
         go.Indicator(
             mode='number+delta',
-            value=value_this_year,
+            value=value_current,
             domain={
                 'x': [0, 0.45],
                 'y': [0, 1]
@@ -105,24 +100,26 @@ def os_total_by_year_chart(
                 'reference': reference_value,
                 'relative': True
             },
-            title='2020',
-            number_font_color=number_font_color_this_year,
+            title=current,
+            number_font_color=DEFAULT_THEME['current_number'],
+            meta='current_number',
         ))
 
     fig.add_trace(
         go.Indicator(
             mode='number+delta',
-            value=value_last_year,
+            value=value_prior,
             domain={
                 'x': [0.55, 1],
                 'y': [0, 1]
             },
             delta={
-                'reference': value_last_year,
+                'reference': value_prior,
                 'relative': True,
             },
-            title='2019',
-            number_font_color=number_font_color_last_year,
+            title=prior,
+            number_font_color=DEFAULT_THEME['prior_number'],
+            meta='prior_number',
         ))
 
     fig.update_traces(
@@ -151,55 +148,42 @@ def os_total_by_year_chart(
     return fig
 
 
-
-def get_data_os_by_month_charts(df: pd.DataFrame) -> pd.DataFrame:
+def get_data_os_by_month_charts(df: pd.DataFrame, comparison: Comparison) -> pd.DataFrame:
     """Create DataFrame for the Ordered Spend by month chart."""
-    df_line_charts = df.groupby([
-        'Year',
+    df_line_charts = pre_aggregate(select_periods(df, comparison), [
+        'Period',
         'Month',
         'Company Code',
         'Purchasing Org.',
         'Plant',
         'Material Group',
-    ]).agg({
-        'Purchasing Doc.': 'nunique',
-        'Net Value': 'sum',
-    }).reset_index().rename(columns={
-        'Net Value': ORDERED_SPEND,
-        'Purchasing Doc.': NUMBER_OF_ORDERS,
-    })
+    ])
 
     return df_line_charts
 
 
+@instrument_chart
+@memoize_figure
 def os_by_month_chart(
     df: pd.DataFrame,
     number_of_orders: bool,
-    ibcs: bool,
     company_code: str,
     purchasing_org: str,
     plant: str,
     material_group: str,
 ) -> go.Figure:
-    """Create a figure showing Ordered Spend or Number of Orders by month for the current and prior year.
+    """Create a figure showing Ordered Spend or Number of Orders by month for the current and prior period.
 
     Args:
         df: DataFrame produced by function get_data_os_by_month_charts.
         number_of_orders: Flag that dictates whether to display Ordered Spend or Number of Orders.
-        ibcs: Flag that dictates whether to use the IBCS styling.
         company_code, purchasing_org, plant, material_group: Filters from GUI.
 
     Returns:
         Two line chart subplots.
     """
-    df = copy_and_apply_filter(df, company_code, purchasing_org, plant, material_group)
-    df = df.groupby([
-        'Year',
-        'Month',
-    ]).agg({
-        NUMBER_OF_ORDERS: 'sum',
-        ORDERED_SPEND: 'sum',
-    }).reset_index()
+    current, prior = period_labels(df)
+    df = filter_and_aggregate(df, OS_BY_MONTH_GROUPING, company_code, purchasing_org, plant, material_group)
 
     df.replace(
         {
@@ -222,39 +206,34 @@ def os_by_month_chart(
     )
 
     if df.empty:
-        return EMPTY_GRAPH_IBCS if ibcs else EMPTY_GRAPH
+        return EMPTY_GRAPH
 
     displayed, subtitle = apply_number_of_orders_flag(number_of_orders)
     title = f'Orders by Month<br><sup style="color: {SAP_LABEL_COLOR}">{subtitle}</sup>'
 
-    df_this_year = df.loc[df['Year'] == 2020]
-    df_last_year = df.loc[df['Year'] == 2019]
-
-    if ibcs:
-        trace_color_this_year = IBCS_HUE_1
-        trace_color_last_year = IBCS_HUE_2
-    else:
-        trace_color_this_year = SAP_UI_POINT_CHART_NUMBER
-        trace_color_last_year = SAP_UI_CHART_PALETTE_SEMANTIC_NEUTRAL
+    df_current = df.loc[df['Period'] == current]
+    df_prior = df.loc[df['Period'] == prior]
 
     fig = go.Figure()
 
     fig.add_trace(
         go.Scatter(
-            x=df_this_year['Month'],
-            y=df_this_year[displayed],
+            x=df_current['Month'],
+            y=df_current[displayed],
             mode='lines+markers',
-            marker_color=trace_color_this_year,
-            name=2020,
+            marker_color=DEFAULT_THEME['current'],
+            meta='current',
+            name=current,
         ))
 
     fig.add_trace(
         go.Scatter(
-            x=df_last_year['Month'],
-            y=df_last_year[displayed],
+            x=df_prior['Month'],
+            y=df_prior[displayed],
             mode='lines+markers',
-            marker_color=trace_color_last_year,
-            name=2019,
+            marker_color=DEFAULT_THEME['prior'],
+            meta='prior',
+            name=prior,
         ))
 
     fig.update_layout(
@@ -270,76 +249,65 @@ def os_by_month_chart(
     return fig
 
 
+@instrument_chart
+@memoize_figure
 def os_by_org_chart(
     df: pd.DataFrame,
     number_of_orders: bool,
-    ibcs: bool,
     company_code: str,
     purchasing_org: str,
     plant: str,
     material_group: str,
 ) -> go.Figure:
-    """Create a figure showing Ordered Spend or Number of Orders by Purchasing Organisation for this & last year.
+    """Create a figure showing Ordered Spend or Number of Orders by Purchasing Org. for the current & prior period.
 
     Args:
         df: DataFrame produced by function get_data_os_total_by_year_charts.
         number_of_orders: Flag that dictates whether to display Ordered Spend or Number of Orders.
-        ibcs: Flag that dictates whether to use the IBCS styling.
         company_code, purchasing_org, plant, material_group: Filters from GUI.
 
     Returns:
         Two bar chart subplots.
     """
-    df = copy_and_apply_filter(df, company_code, purchasing_org, plant, material_group)
-    df = df.groupby([
-        'Year',
-        'Purchasing Org.',
-    ]).agg({
-        NUMBER_OF_ORDERS: 'sum',
-        ORDERED_SPEND: 'sum',
-    }).reset_index()
+    current, prior = period_labels(df)
+    df = filter_and_aggregate(df, OS_BY_ORG_GROUPING, company_code, purchasing_org, plant, material_group)
 
     if df.empty:
-        return EMPTY_GRAPH_IBCS if ibcs else EMPTY_GRAPH
+        return EMPTY_GRAPH
 
     displayed, subtitle = apply_number_of_orders_flag(number_of_orders)
     title = f'Orders by Purchasing Organisation<br><sup style="color: {SAP_LABEL_COLOR}">{subtitle}</sup>'
 
-    df[DISPLAY] = df.apply(lambda row: format_numbers(row, displayed), axis=1)
+    df[DISPLAY] = format_numbers(df[displayed])
 
-    sort_array = df.sort_values(['Year', displayed], ascending=True)
+    sort_array = df.sort_values(['Period', displayed], ascending=True)
     sort_array = sort_array.loc[:, 'Purchasing Org.'].drop_duplicates(keep='last')
 
-    df_this_year = df.loc[df['Year'] == 2020]
-    df_last_year = df.loc[df['Year'] == 2019]
-
-    if ibcs:
-        trace_color_this_year = IBCS_HUE_1
-        trace_color_last_year = IBCS_HUE_2
-    else:
-        trace_color_this_year = SAP_UI_POINT_CHART_NUMBER
-        trace_color_last_year = SAP_UI_CHART_PALETTE_SEMANTIC_NEUTRAL
+    df_current = df.loc[df['Period'] == current]
+    df_prior = df.loc[df['Period'] == prior]
 
     fig = go.Figure()
 
     fig.add_trace(
         go.Bar(
-            x=df_last_year[displayed],
-            y=df_last_year['Purchasing Org.'],
-            marker_color=trace_color_last_year,
-            name=2019,
+            x=df_prior[displayed],
+            y=df_prior['Purchasing Org.'],
+            marker_color=DEFAULT_THEME['prior'],
+            meta='prior',
+            name=prior,
             orientation='h',
-            text=df_last_year[DISPLAY],
+            text=df_prior[DISPLAY],
         ))
 
     fig.add_trace(
         go.Bar(
-            x=df_this_year[displayed],
-            y=df_this_year['Purchasing Org.'],
-            marker_color=trace_color_this_year,
-            name=2020,
+            x=df_current[displayed],
+            y=df_current['Purchasing Org.'],
+            marker_color=DEFAULT_THEME['current'],
+            meta='current',
+            name=current,
             orientation='h',
-            text=df_this_year[DISPLAY],
+            text=df_current[DISPLAY],
         ))
 
     fig.update_layout(
@@ -363,100 +331,82 @@ def os_by_org_chart(
     return fig
 
 
-
-def get_data_os_top_10_suppliers_charts(df: pd.DataFrame) -> pd.DataFrame:
+def get_data_os_top_10_suppliers_charts(df: pd.DataFrame, comparison: Comparison) -> pd.DataFrame:
     """Create DataFrame for the Ordered Spend by top 10 suppliers chart."""
-    df_bar_charts = df.groupby([
-        'Year',
+    df_bar_charts = pre_aggregate(select_periods(df, comparison), [
+        'Period',
         'Supplier Name',
         'Company Code',
         'Purchasing Org.',
         'Plant',
         'Material Group',
-    ]).agg({
-        'Purchasing Doc.': 'nunique',
-        'Net Value': 'sum',
-    }).reset_index().rename(columns={
-        'Net Value': ORDERED_SPEND,
-        'Purchasing Doc.': NUMBER_OF_ORDERS,
-    })
+    ])
 
     return df_bar_charts
 
 
+@instrument_chart
+@memoize_figure
 def os_top_10_suppliers_chart(
     df: pd.DataFrame,
     number_of_orders: bool,
-    ibcs: bool,
     company_code: str,
     purchasing_org: str,
     plant: str,
     material_group: str,
 ) -> go.Figure:
-    """Create a figure showing Ordered Spend or Number of Orders by top 10 suppliers for this & last year.
+    """Create a figure showing Ordered Spend or Number of Orders by top 10 suppliers for the current & prior period.
 
     Args:
         df: DataFrame produced by function get_data_os_top_10_suppliers_charts.
         number_of_orders: Flag that dictates whether to display Ordered Spend or Number of Orders.
-        ibcs: Flag that dictates whether to use the IBCS styling.
         company_code, purchasing_org, plant, material_group: Filters from GUI.
 
     Returns:
         Two bar chart subplots.
     """
-    df = copy_and_apply_filter(df, company_code, purchasing_org, plant, material_group)
-    df = df.groupby([
-        'Year',
-        'Supplier Name',
-    ]).agg({
-        NUMBER_OF_ORDERS: 'sum',
-        ORDERED_SPEND: 'sum',
-    }).reset_index()
+    current, prior = period_labels(df)
+    df = filter_and_aggregate(df, OS_TOP_10_SUPPLIERS_GROUPING, company_code, purchasing_org, plant, material_group)
 
-    supplier_names = df.nlargest(10, ['Year', ORDERED_SPEND])['Supplier Name']
+    supplier_names = df.sort_values(['Period', ORDERED_SPEND], ascending=False).head(10)['Supplier Name']
     df = df.loc[df['Supplier Name'].isin(supplier_names)]
 
     if df.empty:
-        return EMPTY_GRAPH_IBCS if ibcs else EMPTY_GRAPH
+        return EMPTY_GRAPH
 
     displayed, subtitle = apply_number_of_orders_flag(number_of_orders)
     title = f'Orders of Top Ten Suppliers<br><sup style="color: {SAP_LABEL_COLOR}">{subtitle}</sup>'
 
-    df[DISPLAY] = df.apply(lambda row: format_numbers(row, displayed), axis=1)
+    df[DISPLAY] = format_numbers(df[displayed])
 
-    sort_array = df.sort_values(['Year', displayed], ascending=True)
+    sort_array = df.sort_values(['Period', displayed], ascending=True)
     sort_array = sort_array.loc[:, 'Supplier Name'].drop_duplicates(keep='last')
 
-    df_this_year = df.loc[df['Year'] == 2020]
-    df_last_year = df.loc[df['Year'] == 2019]
-
-    if ibcs:
-        trace_color_this_year = IBCS_HUE_1
-        trace_color_last_year = IBCS_HUE_2
-    else:
-        trace_color_this_year = SAP_UI_POINT_CHART_NUMBER
-        trace_color_last_year = SAP_UI_CHART_PALETTE_SEMANTIC_NEUTRAL
+    df_current = df.loc[df['Period'] == current]
+    df_prior = df.loc[df['Period'] == prior]
 
     fig = go.Figure()
 
     fig.add_trace(
         go.Bar(
-            x=df_last_year[displayed],
-            y=df_last_year['Supplier Name'],
-            marker_color=trace_color_last_year,
-            name=2019,
+            x=df_prior[displayed],
+            y=df_prior['Supplier Name'],
+            marker_color=DEFAULT_THEME['prior'],
+            meta='prior',
+            name=prior,
             orientation='h',
-            text=df_last_year[DISPLAY],
+            text=df_prior[DISPLAY],
         ))
 
     fig.add_trace(
         go.Bar(
-            x=df_this_year[displayed],
-            y=df_this_year['Supplier Name'],
-            marker_color=trace_color_this_year,
-            name=2020,
+            x=df_current[displayed],
+            y=df_current['Supplier Name'],
+            marker_color=DEFAULT_THEME['current'],
+            meta='current',
+            name=current,
             orientation='h',
-            text=df_this_year[DISPLAY],
+            text=df_current[DISPLAY],
         ))
 
     fig.update_layout(
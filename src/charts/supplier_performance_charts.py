@@ -3,32 +3,41 @@ import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from utils.charts import apply_number_of_orders_flag, format_numbers
-from utils.data_prep import copy_and_apply_filter
+from utils.cube import filter_and_aggregate, pre_aggregate
+from utils.memoize import memoize_figure
+from utils.metrics import instrument_chart
+from utils.periods import Comparison, select_current_period
 
 from charts.config import (CHART_HEIGHT, CHART_MARGIN, DEVIATION_CAUSE_COLORS, DISPLAY, EMPTY_GRAPH, NUMBER_OF_ORDERS,
                            ORDERED_SPEND, SAP_FONT, SAP_LABEL_COLOR, SAP_TEXT_COLOR, SAP_UI_POINT_CHART_LABEL,
                            SAP_UI_POINT_CHART_NUMBER, TEMPLATE, TITLE_FONT_SIZE)
 
+# Grouping applied by each chart after filtering the pre-aggregate
+SP_TOTAL_DEVIATION_GROUPING = []
+SP_DEVIATION_CAUSE_GROUPING = ['Deviation Cause Text']
+SP_DEVIATION_INDICATOR_GROUPING = ['Deviation Indicator']
+SP_BY_MONTH_GROUPING = ['Month', 'Deviation Cause Text']
+SP_BY_ORG_GROUPING = ['Purchasing Org.', 'Deviation Cause Text']
+SP_TOP_10_SUPPLIERS_GROUPING = ['Supplier Name', 'Deviation Cause Text']
 
-def get_data_sp_total_deviation_and_percentage_charts(df: pd.DataFrame) -> tuple[pd.DataFrame]:
+
+def get_data_sp_total_deviation_and_percentage_charts(df: pd.DataFrame, comparison: Comparison) -> tuple[pd.DataFrame]:
     """Create DataFrames for total deviation and percentage of deviation by purchasing organisation."""
     group_columns = ['Company Code', 'Purchasing Org.', 'Plant', 'Material Group']
-    aggregate_functions = {'Purchasing Doc.': 'nunique', 'Net Value': 'sum'}
-    rename_columns = {'Net Value': ORDERED_SPEND, 'Purchasing Doc.': NUMBER_OF_ORDERS}
 
-    # DataFrame containing sum and count of all orders of 2020
-    df_total_deviation_and_percentage_charts = df.loc[df['Year'] == 2020]
-    df_total_deviation_and_percentage_charts = df_total_deviation_and_percentage_charts.groupby(group_columns).agg(
-        aggregate_functions).reset_index().rename(columns=rename_columns)
+    # DataFrame containing sum and documents of all orders of the current period
+    df_total_deviation_and_percentage_charts = select_current_period(df, comparison)
+    df_total_deviation_and_percentage_charts = pre_aggregate(df_total_deviation_and_percentage_charts, group_columns)
 
-    # DataFrame containing sum and count of orders of 2020 with deviation cause != 0
-    df_reference = df.loc[(df['Deviation Cause'] != 0) & (df['Year'] == 2020)]
-    df_reference = df_reference.groupby(group_columns).agg(aggregate_functions).reset_index().rename(
-        columns=rename_columns)
+    # DataFrame containing sum and documents of orders of the current period with deviation cause != 0
+    df_reference = select_current_period(df, comparison)
+    df_reference = pre_aggregate(df_reference.loc[df_reference['Deviation Cause'] != 0], group_columns)
 
     return df_reference, df_total_deviation_and_percentage_charts
 
 
+@instrument_chart
+@memoize_figure
 def sp_total_deviation_and_percentage_chart(
     df_deviated: pd.DataFrame,
     df_all: pd.DataFrame,
@@ -49,17 +58,23 @@ def sp_total_deviation_and_percentage_chart(
     Returns:
         Two plotly indicators.
     """
-    df_deviated = copy_and_apply_filter(df_deviated, company_code, purchasing_org, plant, material_group)
-    df_deviated = df_deviated.agg({
-        NUMBER_OF_ORDERS: 'sum',
-        ORDERED_SPEND: 'sum',
-    })
-
-    df_all = copy_and_apply_filter(df_all, company_code, purchasing_org, plant, material_group)
-    df_all = df_all.agg({
-        NUMBER_OF_ORDERS: 'sum',
-        ORDERED_SPEND: 'sum',
-    })
+    df_deviated = filter_and_aggregate(
+        df_deviated,
+        SP_TOTAL_DEVIATION_GROUPING,
+        company_code,
+        purchasing_org,
+        plant,
+        material_group,
+    )
+
+    df_all = filter_and_aggregate(
+        df_all,
+        SP_TOTAL_DEVIATION_GROUPING,
+        company_code,
+        purchasing_org,
+        plant,
+        material_group,
+    )
 
     if number_of_orders:
         displayed = NUMBER_OF_ORDERS
@@ -132,27 +147,24 @@ def sp_total_deviation_and_percentage_chart(
     return fig
 
 
-def get_data_sp_deviation_cause_and_indicator_charts(df: pd.DataFrame) -> pd.DataFrame:
+def get_data_sp_deviation_cause_and_indicator_charts(df: pd.DataFrame, comparison: Comparison) -> pd.DataFrame:
     """Create DataFrame for deviation cause and indicator charts."""
-    df_bar_charts = df.loc[(df['Deviation Cause'] != 0) & (df['Year'] == 2020)]
-    df_bar_charts = df_bar_charts.groupby([
+    df_bar_charts = select_current_period(df, comparison)
+    df_bar_charts = df_bar_charts.loc[df_bar_charts['Deviation Cause'] != 0]
+    df_bar_charts = pre_aggregate(df_bar_charts, [
         'Deviation Cause Text',
         'Deviation Indicator',
         'Company Code',
         'Purchasing Org.',
         'Plant',
         'Material Group',
-    ]).agg({
-        'Purchasing Doc.': 'nunique',
-        'Net Value': 'sum',
-    }).reset_index().rename(columns={
-        'Net Value': ORDERED_SPEND,
-        'Purchasing Doc.': NUMBER_OF_ORDERS,
-    })
+    ])
 
     return df_bar_charts
 
 
+@instrument_chart
+@memoize_figure
 def sp_deviation_cause_and_indicator_chart(
     df: pd.DataFrame,
     number_of_orders: bool,
@@ -171,21 +183,23 @@ def sp_deviation_cause_and_indicator_chart(
     Returns:
         Two plotly bar chart subplots.
     """
-    df = copy_and_apply_filter(df, company_code, purchasing_org, plant, material_group)
-
-    df_dev_cause = df.groupby([
-        'Deviation Cause Text',
-    ]).agg({
-        NUMBER_OF_ORDERS: 'sum',
-        ORDERED_SPEND: 'sum',
-    }).reset_index()
+    df_dev_cause = filter_and_aggregate(
+        df,
+        SP_DEVIATION_CAUSE_GROUPING,
+        company_code,
+        purchasing_org,
+        plant,
+        material_group,
+    )
 
-    df_dev_indicator = df.groupby([
-        'Deviation Indicator',
-    ]).agg({
-        NUMBER_OF_ORDERS: 'sum',
-        ORDERED_SPEND: 'sum',
-    }).reset_index()
+    df_dev_indicator = filter_and_aggregate(
+        df,
+        SP_DEVIATION_INDICATOR_GROUPING,
+        company_code,
+        purchasing_org,
+        plant,
+        material_group,
+    )
 
     if df_dev_cause.empty and df_dev_indicator.empty:
         return EMPTY_GRAPH
@@ -196,8 +210,8 @@ def sp_deviation_cause_and_indicator_chart(
 
     df_dev_cause['Color'] = df_dev_cause['Deviation Cause Text'].map(DEVIATION_CAUSE_COLORS)
 
-    df_dev_cause[DISPLAY] = df_dev_cause.apply(lambda row: format_numbers(row, displayed), axis=1)
-    df_dev_indicator[DISPLAY] = df_dev_indicator.apply(lambda row: format_numbers(row, displayed), axis=1)
+    df_dev_cause[DISPLAY] = format_numbers(df_dev_cause[displayed])
+    df_dev_indicator[DISPLAY] = format_numbers(df_dev_indicator[displayed])
 
     fig = make_subplots(
         rows=1,
@@ -247,27 +261,24 @@ def sp_deviation_cause_and_indicator_chart(
     return fig
 
 
-def get_data_sp_by_month_charts(df: pd.DataFrame) -> pd.DataFrame:
+def get_data_sp_by_month_charts(df: pd.DataFrame, comparison: Comparison) -> pd.DataFrame:
     """Create DataFrame for supplier performance by month chart."""
-    df_line_charts = df.loc[(df['Deviation Cause'] != 0) & (df['Year'] == 2020)]
-    df_line_charts = df_line_charts.groupby([
+    df_line_charts = select_current_period(df, comparison)
+    df_line_charts = df_line_charts.loc[df_line_charts['Deviation Cause'] != 0]
+    df_line_charts = pre_aggregate(df_line_charts, [
         'Month',
         'Company Code',
         'Purchasing Org.',
         'Plant',
         'Material Group',
         'Deviation Cause Text',
-    ]).agg({
-        'Purchasing Doc.': 'nunique',
-        'Net Value': 'sum',
-    }).reset_index().rename(columns={
-        'Net Value': ORDERED_SPEND,
-        'Purchasing Doc.': NUMBER_OF_ORDERS,
-    })
+    ])
 
     return df_line_charts
 
 
+@instrument_chart
+@memoize_figure
 def sp_by_month_chart(
     df: pd.DataFrame,
     number_of_orders: bool,
@@ -286,14 +297,7 @@ def sp_by_month_chart(
     Returns:
         A plotly line chart.
     """
-    df = copy_and_apply_filter(df, company_code, purchasing_org, plant, material_group)
-    df = df.groupby([
-        'Month',
-        'Deviation Cause Text',
-    ]).agg({
-        NUMBER_OF_ORDERS: 'sum',
-        ORDERED_SPEND: 'sum',
-    }).reset_index()
+    df = filter_and_aggregate(df, SP_BY_MONTH_GROUPING, company_code, purchasing_org, plant, material_group)
 
     df.replace(
         {
@@ -351,26 +355,23 @@ def sp_by_month_chart(
     return fig
 
 
-def get_data_sp_by_org_charts(df: pd.DataFrame) -> pd.DataFrame:
+def get_data_sp_by_org_charts(df: pd.DataFrame, comparison: Comparison) -> pd.DataFrame:
     """Create DataFrame for top 10 suppliers chart."""
-    df_bar_charts = df.loc[(df['Deviation Cause'] != 0) & (df['Year'] == 2020)]
-    df_bar_charts = df_bar_charts.groupby([
+    df_bar_charts = select_current_period(df, comparison)
+    df_bar_charts = df_bar_charts.loc[df_bar_charts['Deviation Cause'] != 0]
+    df_bar_charts = pre_aggregate(df_bar_charts, [
         'Company Code',
         'Purchasing Org.',
         'Plant',
         'Material Group',
         'Deviation Cause Text',
-    ]).agg({
-        'Purchasing Doc.': 'nunique',
-        'Net Value': 'sum',
-    }).reset_index().rename(columns={
-        'Net Value': ORDERED_SPEND,
-        'Purchasing Doc.': NUMBER_OF_ORDERS,
-    })
+    ])
 
     return df_bar_charts
 
 
+@instrument_chart
+@memoize_figure
 def sp_by_org_chart(
     df: pd.DataFrame,
     number_of_orders: bool,
@@ -389,14 +390,7 @@ def sp_by_org_chart(
     Returns:
         A plotly bar chart.
     """
-    df = copy_and_apply_filter(df, company_code, purchasing_org, plant, material_group)
-    df = df.groupby([
-        'Purchasing Org.',
-        'Deviation Cause Text',
-    ]).agg({
-        NUMBER_OF_ORDERS: 'sum',
-        ORDERED_SPEND: 'sum',
-    }).reset_index()
+    df = filter_and_aggregate(df, SP_BY_ORG_GROUPING, company_code, purchasing_org, plant, material_group)
 
     if df.empty:
         return EMPTY_GRAPH
@@ -405,13 +399,14 @@ def sp_by_org_chart(
     title = (f'Deviated Orders by Purchasing Organisation'
              f'<br><sup style="color: {SAP_LABEL_COLOR}">{subtitle}</sup>')
 
+    df[DISPLAY] = format_numbers(df[displayed])
+
     fig = go.Figure()
 
     deviation_causes = df['Deviation Cause Text'].unique()
 
     for deviation_cause in deviation_causes:
         trace_df = df.loc[df['Deviation Cause Text'] == deviation_cause]
-        trace_df[DISPLAY] = trace_df.apply(lambda row: format_numbers(row, displayed), axis=1)
 
         fig.add_trace(
             go.Bar(
@@ -442,27 +437,24 @@ def sp_by_org_chart(
     return fig
 
 
-def get_data_sp_top_10_suppliers_charts(df: pd.DataFrame) -> pd.DataFrame:
+def get_data_sp_top_10_suppliers_charts(df: pd.DataFrame, comparison: Comparison) -> pd.DataFrame:
     """Create DataFrame for top 10 suppliers chart."""
-    df_bar_charts = df.loc[(df['Deviation Cause'] != 0) & (df['Year'] == 2020)]
-    df_bar_charts = df_bar_charts.groupby([
+    df_bar_charts = select_current_period(df, comparison)
+    df_bar_charts = df_bar_charts.loc[df_bar_charts['Deviation Cause'] != 0]
+    df_bar_charts = pre_aggregate(df_bar_charts, [
         'Supplier Name',
         'Company Code',
         'Purchasing Org.',
         'Plant',
         'Material Group',
         'Deviation Cause Text',
-    ]).agg({
-        'Purchasing Doc.': 'nunique',
-        'Net Value': 'sum',
-    }).reset_index().rename(columns={
-        'Net Value': ORDERED_SPEND,
-        'Purchasing Doc.': NUMBER_OF_ORDERS,
-    })
+    ])
 
     return df_bar_charts
 
 
+@instrument_chart
+@memoize_figure
 def sp_top_10_suppliers_chart(
     df: pd.DataFrame,
     number_of_orders: bool,
@@ -481,14 +473,7 @@ def sp_top_10_suppliers_chart(
     Returns:
         A plotly bar chart.
     """
-    df = copy_and_apply_filter(df, company_code, purchasing_org, plant, material_group)
-    df = df.groupby([
-        'Supplier Name',
-        'Deviation Cause Text',
-    ]).agg({
-        NUMBER_OF_ORDERS: 'sum',
-        ORDERED_SPEND: 'sum',
-    }).reset_index()
+    df = filter_and_aggregate(df, SP_TOP_10_SUPPLIERS_GROUPING, company_code, purchasing_org, plant, material_group)
 
     supplier_names = df.nlargest(10, [ORDERED_SPEND])['Supplier Name']
     df = df.loc[df['Supplier Name'].isin(supplier_names)]
@@ -501,13 +486,14 @@ def sp_top_10_suppliers_chart(
     displayed, subtitle = apply_number_of_orders_flag(number_of_orders)
     title = f'Deviated Orders of Top Ten Suppliers<br><sup style="color: {SAP_LABEL_COLOR}">{subtitle}</sup>'
 
+    df[DISPLAY] = format_numbers(df[displayed])
+
     fig = go.Figure()
 
     deviation_causes = df['Deviation Cause Text'].unique()
 
     for deviation_cause in deviation_causes:
         trace_df = df.loc[df['Deviation Cause Text'] == deviation_cause]
-        trace_df[DISPLAY] = trace_df.apply(lambda row: format_numbers(row, displayed), axis=1)
 
         fig.add_trace(
             go.Bar(
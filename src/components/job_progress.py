@@ -0,0 +1,45 @@
+"""Progress of the Background Job of a Page."""
+import dash_bootstrap_components as dbc
+import dash_core_components as dcc
+import dash_html_components as html
+from utils.settings import DASHBOARD_BACKGROUND_POLL_INTERVAL
+
+
+def job_progress(page: str) -> html.Div:
+    """Generate the progress bar and the polling of the background job rendering the charts of a page.
+
+    The progress bar is hidden and the polling disabled unless a job is running, see utils.jobs. If the job
+    failed, an error with a retry button is shown instead.
+
+    Args:
+        page: Prefix of the component ids, e.g. 'supplier-performance'.
+
+    Returns:
+        The html of the progress bar, the error of a failed job, the job id store and the interval polling the job.
+    """
+    job_progress = html.Div(
+        [
+            dbc.Progress(
+                id=f'{page}-job-progress',
+                value=0,
+                striped=True,
+                animated=True,
+                className='job-progress',
+                style={'display': 'none'},
+            ),
+            dbc.Alert(
+                [
+                    'The charts could not be updated, those shown do not match the current filters.',
+                    dbc.Button('Retry', id=f'{page}-job-retry', color='danger', size='sm', className='job-retry'),
+                ],
+                id=f'{page}-job-error',
+                color='danger',
+                is_open=False,
+                className='job-error',
+            ),
+            dcc.Store(id=f'{page}-job'),
+            dcc.Interval(id=f'{page}-job-interval', interval=DASHBOARD_BACKGROUND_POLL_INTERVAL, disabled=True),
+        ],
+    )
+
+    return job_progress
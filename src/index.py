@@ -7,6 +7,7 @@ import dash_core_components as dcc
 import dash_html_components as html
 
 import utils.callbacks
+import utils.profiler
 from app import app
 from components.app_bar import app_bar
 from components.header import header
@@ -1,8 +1,11 @@
 """Dashboard Ordered Spend Page."""
 import dash_core_components as dcc
 import dash_html_components as html
+from components.job_progress import job_progress
 from utils.loading_indicator_config import INDICATOR_COLOR, INDICATOR_TYPE
 
+from charts.config import CHART_THEMES
+
 
 def ordered_spend() -> html.Div:
     """Generate the ordered spend page.
@@ -12,11 +15,15 @@ def ordered_spend() -> html.Div:
         - ordered spend by purchasing organization
         - ordered spend by top 10 suppliers
 
+    The charts of both metrics are held in a store, see assets/metric_switch.js,
+    and colored in the browser, see assets/chart_theme.js.
+
     Returns:
         The html of the chart containers and the charts.
     """
     ordered_spend = html.Div(
         [
+            job_progress('ordered-spend'),
             html.Div(
                 [
                     html.Div(
@@ -44,8 +51,11 @@ def ordered_spend() -> html.Div:
                         className='chart-container',
                     )
                 ],
+                id='ordered-spend-main',
                 className='page-main',
-            )
+            ),
+            dcc.Store(id='ordered-spend-figures'),
+            dcc.Store(id='ordered-spend-themes', data=CHART_THEMES),
         ],
         className='page',
     )
@@ -1,6 +1,7 @@
 """Dashboard Supplier Performance Page."""
 import dash_core_components as dcc
 import dash_html_components as html
+from components.job_progress import job_progress
 from utils.loading_indicator_config import INDICATOR_COLOR, INDICATOR_TYPE
 
 
@@ -13,11 +14,14 @@ def supplier_performance() -> html.Div:
         - supplier performance by top 10 suppliers
         - supplier performance by deviation cause and indicator
 
+    The charts of both metrics are held in a store, see assets/metric_switch.js.
+
     Returns:
         The html of the chart containers and the charts.
     """
     supplier_performance = html.Div(
         [
+            job_progress('supplier-performance'),
             html.Div(
                 [
                     html.Div(
@@ -53,8 +57,10 @@ def supplier_performance() -> html.Div:
                         className='chart-container',
                     )
                 ],
+                id='supplier-performance-main',
                 className='page-main',
-            )
+            ),
+            dcc.Store(id='supplier-performance-figures'),
         ],
         className='page',
     )
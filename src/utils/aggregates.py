@@ -0,0 +1,226 @@
+"""Lazily built pre-aggregates of the prepared data.
+
+The prepared data and every pre-aggregate are built on first use and retained
+afterwards, so the server accepts requests before any of them exists and tabs
+nobody opens cost nothing. Builds are thread-safe: concurrent callbacks asking
+for the same pre-aggregate wait for a single build. build_all builds whatever
+is still missing, e.g. in a background thread after the startup.
+
+The pre-aggregates cover the periods compared by the charts, see
+utils.periods, which follow from the prepared data and the settings. Every
+build declares the periods it needs, only the month partitions of those
+periods are loaded, see utils.partitions.
+
+Appending new order lines yields a new registry. Pre-aggregates that exist
+already are updated from the new lines instead of being rebuilt, unless the
+compared periods move: additive measures of the same group and document are
+summed, see utils.document_sets.
+"""
+import logging
+import threading
+import time
+from typing import Callable, Optional, Union
+
+import pandas as pd
+
+from utils.data_prep import append_partitions
+from utils.memoize import set_fingerprint
+from utils.partitions import PartitionedData, concat_partitions
+from utils.periods import Comparison, get_comparison
+from utils.shared_data import map_frame, share_frame
+
+logger = logging.getLogger(__name__)
+
+# Increase whenever the columns of the pre-aggregates change, it is part of their fingerprints and shared files
+AGGREGATES_VERSION = 4
+
+
+class AggregateRegistry:
+    """Pre-aggregates of the prepared data, built on first use.
+
+    Args:
+        load_data: Returns the prepared data, called on first use.
+        additive_measures: Measure columns of the pre-aggregates holding sums, all other columns are group columns.
+        share: Map the pre-aggregates from the files of the worker building them first, see utils.shared_data.
+    """
+
+    def __init__(
+        self,
+        load_data: Callable[[], PartitionedData],
+        additive_measures: list[str],
+        share: bool = False,
+    ) -> None:
+        self._load_data = load_data
+        self.additive_measures = additive_measures
+        self.share = share
+        self._data: Optional[PartitionedData] = None
+        self._data_lock = threading.Lock()
+
+        self._builds: dict[str, tuple[tuple[str, ...], Callable, tuple[str, ...], threading.Lock]] = {}
+        self._aggregates: dict[str, pd.DataFrame] = {}
+
+    def register(
+        self,
+        names: Union[str, tuple[str, ...]],
+        build: Callable,
+        periods: tuple[str, ...] = ('prior', 'current'),
+    ) -> None:
+        """Register the build of one or several pre-aggregates.
+
+        Args:
+            names: Name of the pre-aggregate or names of the pre-aggregates built together.
+            build: Builds the pre-aggregate from the prepared data and the compared periods,
+                or a tuple of them in the order of names.
+            periods: The periods read by the build, 'prior' and/or 'current'. The build
+                receives the order lines of their months only.
+        """
+        names = (names,) if isinstance(names, str) else names
+        entry = (names, build, periods, threading.Lock())
+
+        for name in names:
+            self._builds[name] = entry
+
+    @property
+    def names(self) -> list[str]:
+        """Names of the registered pre-aggregates."""
+        return list(self._builds)
+
+    @property
+    def version(self) -> Optional[str]:
+        """Fingerprint of the prepared data or None if it is not loaded yet."""
+        data = self._data
+        return data.fingerprint if data is not None else None
+
+    def data(self) -> PartitionedData:
+        """Return the prepared data, loading it on first use."""
+        if self._data is None:
+            with self._data_lock:
+                if self._data is None:
+                    self._data = self._load_data()
+
+        return self._data
+
+    def get(self, name: str) -> pd.DataFrame:
+        """Return the pre-aggregate, building it on first use.
+
+        The pre-aggregate is fingerprinted with its name, AGGREGATES_VERSION, the
+        compared periods and the fingerprint of the prepared data, memoized
+        results are keyed on all of them.
+        """
+        aggregate = self._aggregates.get(name)
+
+        if aggregate is not None:
+            return aggregate
+
+        names, build, periods, lock = self._builds[name]
+
+        with lock:
+            if name not in self._aggregates:
+                data = self.data()
+                version = data.fingerprint
+                comparison = get_comparison(data.latest)
+                aggregates = self._map(names, comparison, version) if self.share else None
+
+                if aggregates is None:
+                    start = time.perf_counter()
+                    aggregates = build(data.select([getattr(comparison, period) for period in periods]), comparison)
+
+                    if len(names) == 1:
+                        aggregates = (aggregates,)
+
+                    logger.info('Built pre-aggregate(s) %s in %.2fs', ', '.join(names), time.perf_counter() - start)
+
+                    if self.share:
+                        for aggregate_name, aggregate in zip(names, aggregates):
+                            share_frame(aggregate, _versioned(aggregate_name, comparison), version)
+
+                        aggregates = self._map(names, comparison, version) or aggregates
+
+                for aggregate_name, aggregate in zip(names, aggregates):
+                    set_fingerprint(aggregate, _versioned(aggregate_name, comparison), version)
+                    self._aggregates[aggregate_name] = aggregate
+
+        return self._aggregates[name]
+
+    @staticmethod
+    def _map(names: tuple[str, ...], comparison: Comparison, version: str) -> Optional[tuple[pd.DataFrame, ...]]:
+        """Map the pre-aggregates shared by another worker, None unless all of them are shared."""
+        aggregates = tuple(map_frame(_versioned(name, comparison), version) for name in names)
+        return aggregates if all(aggregate is not None for aggregate in aggregates) else None
+
+    def build_all(self) -> None:
+        """Build all pre-aggregates that do not exist yet."""
+        for name in self._builds:
+            self.get(name)
+
+    def append(self, df_delta: pd.DataFrame, delta_hash: str) -> 'AggregateRegistry':
+        """Return a registry of the data with new order lines appended.
+
+        Pre-aggregates built so far are updated incrementally from the
+        pre-aggregates of the new lines, the others are built from the appended
+        data on first use. If the new lines move the compared periods, all
+        pre-aggregates are built anew on first use. Only the partitions of the
+        months of the new lines are loaded.
+
+        Args:
+            df_delta: Prepared DataFrame of new order lines.
+            delta_hash: Content hash of the delta file.
+
+        Returns:
+            The new registry, this one is left unchanged.
+        """
+        data = self.data()
+        data_appended, df_new = append_partitions(data, df_delta, delta_hash)
+
+        registry = AggregateRegistry(
+            lambda: data_appended,
+            self.additive_measures,
+            self.share,
+        )
+        registry._data = data_appended
+
+        for names, build, periods, _ in dict.fromkeys(self._builds.values()):
+            registry.register(names, build, periods)
+
+        comparison = get_comparison(data_appended.latest)
+
+        if comparison != get_comparison(data.latest):
+            logger.info('The compared periods moved to %r, the pre-aggregates are built anew', comparison)
+            return registry
+
+        for names, build, _, _ in dict.fromkeys(self._builds.values()):
+            if any(name not in self._aggregates for name in names):
+                continue
+
+            start = time.perf_counter()
+            increments = build(df_new, comparison)
+
+            if len(names) == 1:
+                increments = (increments,)
+
+            for name, increment in zip(names, increments):
+                aggregate = self._merge(self._aggregates[name], increment)
+                set_fingerprint(aggregate, _versioned(name, comparison), data_appended.fingerprint)
+                registry._aggregates[name] = aggregate
+
+            logger.info('Updated pre-aggregate(s) %s in %.2fs', ', '.join(names), time.perf_counter() - start)
+
+        return registry
+
+    def _merge(self, aggregate: pd.DataFrame, aggregate_new: pd.DataFrame) -> pd.DataFrame:
+        """Merge the pre-aggregate of the new lines into a pre-aggregate.
+
+        Additive measures of rows with the same group columns, the document
+        included, are summed, so documents occurring in both count once.
+        """
+        group_columns = [column for column in aggregate.columns if column not in self.additive_measures]
+
+        parts = [part for part in [aggregate, aggregate_new] if not part.empty] or [aggregate]
+        merged = concat_partitions(parts).groupby(group_columns, observed=True)[self.additive_measures].sum()
+
+        return merged.reset_index().sort_values(group_columns, ignore_index=True)[aggregate.columns]
+
+
+def _versioned(name: str, comparison: Comparison) -> str:
+    """Return the name of a pre-aggregate in its fingerprint and shared file."""
+    return f'{name}.v{AGGREGATES_VERSION}.{comparison.key}'
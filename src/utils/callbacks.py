@@ -1,42 +1,335 @@
 """Dashboard Callbacks."""
-from typing import Any
+import logging
+import threading
+import time
+from typing import Any, Callable, Optional
 
-import dash
 import dash_html_components as html
 import plotly.graph_objects as go
 from app import app
 from components.ordered_spend_npc import ordered_spend_npc
 from components.supplier_performance_npc import supplier_performance_npc
+from dash import callback_context, no_update
 from dash.dependencies import ClientsideFunction
 from dash.exceptions import PreventUpdate
-from dash_extensions.enrich import Input, Output, ServersideOutput, Trigger
+from dash_extensions.enrich import Input, Output, ServersideOutput, State
 from pages.ordered_spend import ordered_spend
 from pages.supplier_performance import supplier_performance
 
-from charts.ordered_spend_charts import (get_data_os_by_month_charts, get_data_os_top_10_suppliers_charts,
-                                         get_data_os_total_by_year_charts, os_by_month_chart, os_by_org_chart,
-                                         os_top_10_suppliers_chart, os_total_by_year_chart)
-from charts.supplier_performance_charts import (get_data_sp_by_month_charts, get_data_sp_by_org_charts,
+from charts.config import ORDERED_SPEND
+from charts.ordered_spend_charts import (OS_BY_MONTH_GROUPING, OS_BY_ORG_GROUPING, OS_TOP_10_SUPPLIERS_GROUPING,
+                                         OS_TOTAL_BY_YEAR_GROUPING, get_data_os_by_month_charts,
+                                         get_data_os_top_10_suppliers_charts, get_data_os_total_by_year_charts,
+                                         os_by_month_chart, os_by_org_chart, os_top_10_suppliers_chart,
+                                         os_total_by_year_chart)
+from charts.supplier_performance_charts import (SP_BY_MONTH_GROUPING, SP_BY_ORG_GROUPING, SP_DEVIATION_CAUSE_GROUPING,
+                                                SP_DEVIATION_INDICATOR_GROUPING, SP_TOP_10_SUPPLIERS_GROUPING,
+                                                SP_TOTAL_DEVIATION_GROUPING, get_data_sp_by_month_charts,
+                                                get_data_sp_by_org_charts,
                                                 get_data_sp_deviation_cause_and_indicator_charts,
                                                 get_data_sp_top_10_suppliers_charts,
                                                 get_data_sp_total_deviation_and_percentage_charts, sp_by_month_chart,
                                                 sp_by_org_chart, sp_deviation_cause_and_indicator_chart,
                                                 sp_top_10_suppliers_chart, sp_total_deviation_and_percentage_chart)
-from utils.data_prep import copy_and_apply_filter, get_data
+from utils.aggregates import AggregateRegistry
+from utils.cube import materialize_cubes, query_context
+from utils.data_prep import (DATA_PATH, DELTA_EXTENSIONS, append_partitions, copy_and_apply_filter, get_data,
+                             list_delta_files, read_delta_data)
+from utils.file_watch import DirectoryWatcher, FileWatcher
+from utils.ingest_cache import file_content_hash
+from utils.jobs import CANCELLED, DONE, FAILED, JobQueue, progress_part, report_progress
+from utils.memoize import invalidate_version, memoize
+from utils.metrics import instrument_callback
+from utils.partitions import PartitionedData
+from utils.settings import (DASHBOARD_BACKGROUND_CALLBACKS_ENABLED, DASHBOARD_BACKGROUND_WORKERS,
+                            DASHBOARD_CUBE_ENABLED, DASHBOARD_CUBE_MAX_BYTES, DASHBOARD_DELTA_DIR,
+                            DASHBOARD_DELTA_INTERVAL, DASHBOARD_PRE_AGGREGATES_BUILD, DASHBOARD_RELOAD_INTERVAL,
+                            DASHBOARD_SHARED_DATA_ENABLED, DASHBOARD_WARM_UP_BACKGROUND, DASHBOARD_WARM_UP_ENABLED,
+                            DASHBOARD_WARM_UP_FILTERS)
+from utils.shared_data import remove_outdated_frames
+from utils.warm_up import start_warm_up
+
+logger = logging.getLogger(__name__)
+
+# Dropdown labels of the metrics and the corresponding number_of_orders flag of the charts
+METRICS = {'Ordered Spend Amount': False, 'Number of Orders': True}
+
+# Styles of the progress bar of the background job of a page
+_PROGRESS_VISIBLE = {'display': 'flex'}
+_PROGRESS_HIDDEN = {'display': 'none'}
+
+# Class names of the charts of a page, which are outdated after a job failed
+_CHARTS_CURRENT = 'page-main'
+_CHARTS_OUTDATED = 'page-main page-main-outdated'
+
+
+def load_data() -> PartitionedData:
+    """Read the prepared data and append the delta files of DASHBOARD_DELTA_DIR, see append_data_file.
+
+    With shared data, the shared frames of other data versions are removed once the delta files are appended.
+    The partitions are shared under the fingerprint of the prepared data, the pre-aggregates under that of the
+    appended data, so the frames of both are kept.
+    """
+    data = prepared = get_data()
+
+    for path in list_delta_files(DASHBOARD_DELTA_DIR):
+        delta_hash = file_content_hash(path)
+
+        if delta_hash not in data.deltas:
+            data, _ = append_partitions(data, read_delta_data(path), delta_hash)
+            logger.info('Appended %s', path)
+
+    if DASHBOARD_SHARED_DATA_ENABLED:
+        remove_outdated_frames(prepared.fingerprint, data.fingerprint)
+
+    return data
+
+
+def create_aggregates() -> AggregateRegistry:
+    """Create the registry of the pre-aggregates of the dashboard, see utils.aggregates."""
+    registry = AggregateRegistry(
+        load_data,
+        [ORDERED_SPEND],
+        share=DASHBOARD_SHARED_DATA_ENABLED,
+    )
+
+    # Ordered Spend Page
+    registry.register('os_total_by_year', get_data_os_total_by_year_charts)
+    registry.register('os_by_month', get_data_os_by_month_charts)
+    registry.register('os_top_10_suppliers', get_data_os_top_10_suppliers_charts)
+
+    # Supplier Performance Page, the current period only
+    registry.register(
+        ('sp_total_deviation', 'sp_reference'),
+        get_data_sp_total_deviation_and_percentage_charts,
+        ('current',),
+    )
+    registry.register(
+        'sp_deviation_cause_and_indicator',
+        get_data_sp_deviation_cause_and_indicator_charts,
+        ('current',),
+    )
+    registry.register('sp_by_month', get_data_sp_by_month_charts, ('current',))
+    registry.register('sp_by_org', get_data_sp_by_org_charts, ('current',))
+    registry.register('sp_top_10_suppliers', get_data_sp_top_10_suppliers_charts, ('current',))
+
+    return registry
+
+
+# Snapshot of the data and its pre-aggregates, built on first use. Replaced as a whole
+# when the data changes, callbacks read it once and finish on the snapshot they started with.
+aggregates = create_aggregates()
+
+# Serializes replacements of the snapshot
+_aggregates_update_lock = threading.Lock()
+
+# Worker pool of the background callbacks, see utils.jobs
+jobs = JobQueue(DASHBOARD_BACKGROUND_WORKERS)
+
+
+def build_aggregates(registry: AggregateRegistry) -> None:
+    """Build all pre-aggregates and, if enabled, the cubes serving every filter combination from memory."""
+    registry.build_all()
+
+    if DASHBOARD_CUBE_ENABLED:
+        materialize_cubes(
+            [
+                (registry.get('os_total_by_year'), OS_TOTAL_BY_YEAR_GROUPING),
+                (registry.get('os_by_month'), OS_BY_MONTH_GROUPING),
+                (registry.get('os_total_by_year'), OS_BY_ORG_GROUPING),
+                (registry.get('os_top_10_suppliers'), OS_TOP_10_SUPPLIERS_GROUPING),
+                (registry.get('sp_total_deviation'), SP_TOTAL_DEVIATION_GROUPING),
+                (registry.get('sp_reference'), SP_TOTAL_DEVIATION_GROUPING),
+                (registry.get('sp_deviation_cause_and_indicator'), SP_DEVIATION_CAUSE_GROUPING),
+                (registry.get('sp_deviation_cause_and_indicator'), SP_DEVIATION_INDICATOR_GROUPING),
+                (registry.get('sp_by_month'), SP_BY_MONTH_GROUPING),
+                (registry.get('sp_by_org'), SP_BY_ORG_GROUPING),
+                (registry.get('sp_top_10_suppliers'), SP_TOP_10_SUPPLIERS_GROUPING),
+            ],
+            DASHBOARD_CUBE_MAX_BYTES,
+        )
+
 
-df = get_data()
+def _swap_aggregates(registry: AggregateRegistry) -> None:
+    """Replace the snapshot and delete the memoized results of the previous data."""
+    global aggregates
 
-# Ordered Spend Page
-df_os_total_by_year_charts = get_data_os_total_by_year_charts(df)
-df_os_by_month_charts = get_data_os_by_month_charts(df)
-df_os_top_10_suppliers_charts = get_data_os_top_10_suppliers_charts(df)
+    previous_version = aggregates.version
+    aggregates = registry
 
-# Supplier Performance Page
-df_sp_total_deviation_charts, df_sp_reference = get_data_sp_total_deviation_and_percentage_charts(df)
-df_sp_deviation_cause_and_indicator_charts = get_data_sp_deviation_cause_and_indicator_charts(df)
-df_sp_by_month_charts = get_data_sp_by_month_charts(df)
-df_sp_by_org_charts = get_data_sp_by_org_charts(df)
-df_sp_top_10_suppliers_charts = get_data_sp_top_10_suppliers_charts(df)
+    if previous_version is not None and previous_version != registry.version:
+        logger.info('Deleted %d cached result(s) of %s', invalidate_version(previous_version), previous_version)
+
+
+def append_data_file(path: str) -> None:
+    """Append the order lines of a delta file to the data of the dashboard.
+
+    Called for every new file of DASHBOARD_DELTA_DIR. Pre-aggregates built so
+    far are updated incrementally. Callbacks see the new data once all of them
+    are updated, memoized results of the old data are deleted. A file with the
+    content of a file appended before is skipped.
+
+    Args:
+        path: Excel or CSV file with the columns of the Excel-File.
+    """
+    delta_hash = file_content_hash(path)
+
+    with _aggregates_update_lock:
+        if delta_hash in aggregates.data().deltas:
+            return
+
+        registry = aggregates.append(read_delta_data(path), delta_hash)
+        _swap_aggregates(registry)
+        logger.info('Appended %s, the data version is %s', path, registry.version)
+
+    if DASHBOARD_CUBE_ENABLED:
+        threading.Thread(target=build_aggregates, args=(registry,), name='pre-aggregates', daemon=True).start()
+
+    _start_warm_up()
+
+
+def reload_data() -> None:
+    """Rebuild the data and all pre-aggregates from the Excel-File and swap them in.
+
+    Callbacks keep using the previous snapshot until the new one is complete.
+    The delta files of DASHBOARD_DELTA_DIR are appended again.
+    """
+    with _aggregates_update_lock:
+        start = time.perf_counter()
+        registry = create_aggregates()
+        build_aggregates(registry)
+        _swap_aggregates(registry)
+        logger.info('Reloaded %s in %.1fs', registry.version, time.perf_counter() - start)
+
+    _start_warm_up()
+
+
+def render_ordered_spend_charts(
+    number_of_orders: bool,
+    company_code: int,
+    purchasing_org: int,
+    plant: int,
+    material_group: str,
+) -> tuple[go.Figure]:
+    """Render the charts of the ordered spend page.
+
+    Args:
+        number_of_orders: Display the number of orders instead of the ordered spend.
+        company_code, purchasing_org, plant, material_group: GUI filters.
+
+    Returns:
+        The total by year, by month, by org and top 10 suppliers charts, for
+        the SAP and the IBCS tab alike, see assets/chart_theme.js.
+    """
+    registry = aggregates
+    filters = {
+        'company_code': company_code,
+        'purchasing_org': purchasing_org,
+        'plant': plant,
+        'material_group': material_group,
+    }
+
+    charts = [
+        (os_total_by_year_chart, ('os_total_by_year',)),
+        (os_by_month_chart, ('os_by_month',)),
+        (os_by_org_chart, ('os_total_by_year',)),
+        (os_top_10_suppliers_chart, ('os_top_10_suppliers',)),
+    ]
+
+    with query_context(**filters):
+        return _render_charts(registry, charts, number_of_orders, filters)
+
+
+def render_supplier_performance_charts(
+    number_of_orders: bool,
+    company_code: int,
+    purchasing_org: int,
+    plant: int,
+    material_group: str,
+) -> tuple[go.Figure]:
+    """Render the charts of the supplier performance page.
+
+    Args:
+        number_of_orders: Display the number of orders instead of the ordered spend.
+        company_code, purchasing_org, plant, material_group: GUI filters.
+
+    Returns:
+        The total deviation and percentage, deviation cause and indicator, by month, by org
+        and top 10 suppliers charts.
+    """
+    registry = aggregates
+    filters = {
+        'company_code': company_code,
+        'purchasing_org': purchasing_org,
+        'plant': plant,
+        'material_group': material_group,
+    }
+
+    charts = [
+        (sp_total_deviation_and_percentage_chart, ('sp_total_deviation', 'sp_reference')),
+        (sp_deviation_cause_and_indicator_chart, ('sp_deviation_cause_and_indicator',)),
+        (sp_by_month_chart, ('sp_by_month',)),
+        (sp_by_org_chart, ('sp_by_org',)),
+        (sp_top_10_suppliers_chart, ('sp_top_10_suppliers',)),
+    ]
+
+    with query_context(**filters):
+        return _render_charts(registry, charts, number_of_orders, filters)
+
+
+def _render_charts(
+    registry: AggregateRegistry,
+    charts: list[tuple[Callable, tuple[str, ...]]],
+    number_of_orders: bool,
+    filters: dict[str, Any],
+) -> tuple[go.Figure]:
+    """Render charts in turn, reporting the progress of the current job before every chart.
+
+    Args:
+        registry: The pre-aggregates.
+        charts: The chart functions and the names of the pre-aggregates they take.
+        number_of_orders: Display the number of orders instead of the ordered spend.
+        filters: GUI filters.
+
+    Returns:
+        The charts.
+    """
+    figures = []
+
+    for step, (chart, names) in enumerate(charts):
+        report_progress(step, len(charts))
+        figures.append(chart(*[registry.get(name) for name in names], number_of_orders, **filters))
+
+    return tuple(figures)
+
+
+def _start_warm_up() -> None:
+    """Precompute the figures of the most common views, the default view first."""
+    start_warm_up(
+        [
+            render_ordered_spend_charts,
+            render_supplier_performance_charts,
+        ],
+        DASHBOARD_WARM_UP_FILTERS,
+        enabled=DASHBOARD_WARM_UP_ENABLED,
+        background=DASHBOARD_WARM_UP_BACKGROUND,
+    )
+
+
+if DASHBOARD_PRE_AGGREGATES_BUILD == 'startup':
+    build_aggregates(aggregates)
+elif DASHBOARD_PRE_AGGREGATES_BUILD == 'background' or DASHBOARD_CUBE_ENABLED:
+    threading.Thread(target=build_aggregates, args=(aggregates,), name='pre-aggregates', daemon=True).start()
+
+_start_warm_up()
+
+# Rebuild everything in the background when the Excel-File changes
+if DASHBOARD_RELOAD_INTERVAL > 0:
+    FileWatcher(DATA_PATH, lambda content_hash: reload_data(), DASHBOARD_RELOAD_INTERVAL).start()
+
+# Append the new files of the delta directory, every worker process watches it on its own
+if DASHBOARD_DELTA_DIR and DASHBOARD_DELTA_INTERVAL > 0:
+    DirectoryWatcher(DASHBOARD_DELTA_DIR, append_data_file, DASHBOARD_DELTA_INTERVAL, DELTA_EXTENSIONS).start()
 
 # Function can be found here: assets/sticky_header.js
 app.clientside_callback(
@@ -54,8 +347,9 @@ app.clientside_callback(
         Input('plant', 'value'),
         Input('material-group', 'value'),
     ],
-    memoize=True,
 )
+@instrument_callback
+@memoize
 def update_store(
     company_code: int,
     purchasing_org: int,
@@ -78,36 +372,16 @@ def update_store(
     }
 
 
-@app.callback(
+# Function can be found here: assets/metric_switch.js
+app.clientside_callback(
+    ClientsideFunction('metric', 'dropdownLabel'),
     Output('dropdown-menu', 'label'),
     [
         Input('dropdown-menu', 'label'),
-        Trigger('ordered-spend-amount', 'n_clicks'),
-        Trigger('number-of-orders', 'n_clicks'),
+        Input('ordered-spend-amount', 'n_clicks'),
+        Input('number-of-orders', 'n_clicks'),
     ],
 )
-def update_dropdown_label(current_label: str) -> str:
-    """Callback that updates the dropdown label.
-
-    Args:
-        current_label: The current label of the dropdown menu.
-
-    Returns:
-        The updated dropdown label.
-    """
-    id_lookup = {'ordered-spend-amount': 'Ordered Spend Amount', 'number-of-orders': 'Number of Orders'}
-    ctx = dash.callback_context
-
-    if not ctx.triggered:
-        dropdown_label = 'Ordered Spend Amount'
-    else:
-        button_id = ctx.triggered[0]['prop_id'].split('.')[0]
-        dropdown_label = id_lookup[button_id]
-
-    if current_label == dropdown_label:
-        raise PreventUpdate
-
-    return dropdown_label
 
 
 @app.callback(
@@ -117,12 +391,18 @@ def update_dropdown_label(current_label: str) -> str:
         Output('page-content', 'children'),
     ],
     Input('tabs', 'active_tab'),
+    State('page-header', 'children'),
 )
-def update_page(active_tab: str) -> tuple[str, html.Div, html.Div]:
+@instrument_callback
+def update_page(active_tab: str, current_page_header: str) -> tuple[str, html.Div, html.Div]:
     """Callback that updates the page.
 
+    The SAP and the IBCS tab share the ordered spend page, switching between
+    them only restyles the charts in the browser, see assets/chart_theme.js.
+
     Args:
         active_tab: The active tab of the page.
+        current_page_header: The header of the displayed page.
 
     Returns:
         The page header, numeric point charts and the page content.
@@ -137,6 +417,9 @@ def update_page(active_tab: str) -> tuple[str, html.Div, html.Div]:
         page_numeric_point_chart = supplier_performance_npc()
         page_content = supplier_performance()
 
+    if page_header == current_page_header:
+        raise PreventUpdate
+
     return page_header, page_numeric_point_chart, page_content
 
 
@@ -149,6 +432,7 @@ def update_page(active_tab: str) -> tuple[str, html.Div, html.Div]:
     ],
     Input('store', 'data'),
 )
+@instrument_callback
 def update_filters(store: dict[str, Any]) -> tuple[list[dict[str, Any]]]:
     """Update filters based on user input.
 
@@ -159,7 +443,7 @@ def update_filters(store: dict[str, Any]) -> tuple[list[dict[str, Any]]]:
         A tuple containing lists of dictionaries with the new labels and values of the filters.
     """
     filtered_df = copy_and_apply_filter(
-        df=df,
+        df=aggregates.data().filter_values(),
         company_code=store['company_code'],
         purchasing_org=store['purchasing_org'],
         plant=store['plant'],
@@ -194,235 +478,205 @@ def update_filters(store: dict[str, Any]) -> tuple[list[dict[str, Any]]]:
     )
 
 
+def _render_metrics(render_charts: Callable, store: dict[str, Any]) -> dict[str, tuple[go.Figure]]:
+    """Render the charts of a page for every metric.
+
+    Both metrics share one query context, so the pre-aggregates are filtered once.
+
+    Args:
+        render_charts: Renders the charts of the page, e.g. render_ordered_spend_charts.
+        store: GUI filters.
+
+    Returns:
+        The charts per dropdown label, see assets/metric_switch.js.
+    """
+    figures = {}
+
+    with query_context(**store):
+        for part, (dropdown_label, number_of_orders) in enumerate(METRICS.items()):
+            with progress_part(part, len(METRICS)):
+                figures[dropdown_label] = render_charts(number_of_orders, **store)
+
+    return figures
+
+
+def _update_figures(render_charts: Callable, store: dict[str, Any], job_id: Optional[str]) -> tuple[Any, ...]:
+    """Render the charts of a page for every metric, in a background job if enabled.
+
+    A change of the filters or of the page renders the charts of both metrics,
+    the browser switches between them without a request, see
+    assets/metric_switch.js.
+
+    Without background callbacks the charts are rendered within the request.
+    Otherwise rendering submits a job, which supersedes the previous job of the
+    page, and every poll of the page reports the progress of its job until the
+    charts are rendered. If the job failed, the page shows an error with a
+    retry button and marks its charts as outdated. The charts of the browser
+    are dropped, so that switching the metric does not show them either.
+
+    Args:
+        render_charts: Renders the charts of the page, e.g. render_ordered_spend_charts.
+        store: GUI filters.
+        job_id: The job of the page, if any.
+
+    Returns:
+        The charts per dropdown label, the job of the page, whether the polling
+        is disabled, the value and the style of the progress bar, whether the
+        error is shown, and the class name of the charts.
+    """
+    polled = any(trigger['prop_id'].endswith('-job-interval.n_intervals') for trigger in callback_context.triggered)
+
+    if not polled:
+        if not DASHBOARD_BACKGROUND_CALLBACKS_ENABLED:
+            figures = _render_metrics(render_charts, store)
+            return figures, no_update, no_update, no_update, no_update, no_update, no_update
+
+        job_id = jobs.submit(_render_metrics, render_charts, store, supersedes=job_id)
+        return no_update, job_id, False, 0, _PROGRESS_VISIBLE, False, no_update
+
+    job = jobs.poll(job_id) if job_id is not None else None
+
+    if job is None or job.status == CANCELLED:
+        return no_update, None, True, 0, _PROGRESS_HIDDEN, no_update, no_update
+
+    if job.status == FAILED:
+        return {}, None, True, 0, _PROGRESS_HIDDEN, True, _CHARTS_OUTDATED
+
+    if job.status == DONE:
+        return job.result, None, True, 100, _PROGRESS_HIDDEN, False, _CHARTS_CURRENT
+
+    return no_update, no_update, no_update, round(job.progress * 100), _PROGRESS_VISIBLE, no_update, no_update
+
+
 @app.callback(
     [
-        Output('ordered-spend-total-by-year-chart', 'figure'),
-        Output('ordered-spend-by-month-chart', 'figure'),
-        Output('ordered-spend-by-org-chart', 'figure'),
-        Output('ordered-spend-top-10-suppliers-chart', 'figure'),
+        Output('ordered-spend-figures', 'data'),
+        Output('ordered-spend-job', 'data'),
+        Output('ordered-spend-job-interval', 'disabled'),
+        Output('ordered-spend-job-progress', 'value'),
+        Output('ordered-spend-job-progress', 'style'),
+        Output('ordered-spend-job-error', 'is_open'),
+        Output('ordered-spend-main', 'className'),
     ],
     [
-        Input('tabs', 'active_tab'),
-        Input('dropdown-menu', 'label'),
         Input('store', 'data'),
+        Input('ordered-spend-job-interval', 'n_intervals'),
+        Input('ordered-spend-job-retry', 'n_clicks'),
+    ],
+    [
+        State('tabs', 'active_tab'),
+        State('ordered-spend-job', 'data'),
     ],
 )
+@instrument_callback
 def update_ordered_spend_charts(
-    active_tab: str,
-    dropdown_label: str,
     store: dict[str, Any],
-) -> tuple[go.Figure]:
-    """Callback that updates the ordered spend charts.
+    n_intervals: int,
+    retry_clicks: Optional[int],
+    active_tab: str,
+    job_id: Optional[str],
+) -> tuple[Any, ...]:
+    """Callback that updates the ordered spend charts of both metrics.
+
+    The browser displays the charts of the metric selected in the dropdown menu,
+    switching the metric does not reach the server, see assets/metric_switch.js.
+    With background callbacks the charts are rendered in a job, see utils.jobs.
 
     Args:
-        active_tab: The active tab of the page.
-        dropdown_label: The current dropdown label.
         store: GUI filters.
+        n_intervals: Number of polls of the job.
+        retry_clicks: Number of clicks on the retry button of a failed job.
+        active_tab: The active tab of the page.
+        job_id: The job rendering the charts, if any.
 
     Returns:
-        The updated charts.
+        The updated charts per dropdown label and the state of the job, see _update_figures.
     """
     if active_tab not in ('tab-ordered-spend', 'tab-ordered-spend-ibcs'):
         raise PreventUpdate
 
-    company_code = store['company_code']
-    purchasing_org = store['purchasing_org']
-    plant = store['plant']
-    material_group = store['material_group']
-
-    if active_tab == 'tab-ordered-spend':
-        if dropdown_label == 'Ordered Spend Amount':
-            number_of_orders_para = False
-        elif dropdown_label == 'Number of Orders':
-            number_of_orders_para = True
-
-        total_by_year_chart = os_total_by_year_chart(
-            df=df_os_total_by_year_charts,
-            number_of_orders=number_of_orders_para,
-            ibcs=False,
-            company_code=company_code,
-            purchasing_org=purchasing_org,
-            plant=plant,
-            material_group=material_group,
-        )
-
-        by_month_chart = os_by_month_chart(
-            df=df_os_by_month_charts,
-            number_of_orders=number_of_orders_para,
-            ibcs=False,
-            company_code=company_code,
-            purchasing_org=purchasing_org,
-            plant=plant,
-            material_group=material_group,
-        )
-
-        by_org_chart = os_by_org_chart(
-            df=df_os_total_by_year_charts,
-            number_of_orders=number_of_orders_para,
-            ibcs=False,
-            company_code=company_code,
-            purchasing_org=purchasing_org,
-            plant=plant,
-            material_group=material_group,
-        )
-
-        top_10_suppliers_chart = os_top_10_suppliers_chart(
-            df=df_os_top_10_suppliers_charts,
-            number_of_orders=number_of_orders_para,
-            ibcs=False,
-            company_code=company_code,
-            purchasing_org=purchasing_org,
-            plant=plant,
-            material_group=material_group,
-        )
-
-    elif active_tab == 'tab-ordered-spend-ibcs':
-        if dropdown_label == 'Ordered Spend Amount':
-            number_of_orders_para = False
-        elif dropdown_label == 'Number of Orders':
-            number_of_orders_para = True
-
-        total_by_year_chart = os_total_by_year_chart(
-            df=df_os_total_by_year_charts,
-            number_of_orders=number_of_orders_para,
-            ibcs=True,
-            company_code=company_code,
-            purchasing_org=purchasing_org,
-            plant=plant,
-            material_group=material_group,
-        )
-
-        by_month_chart = os_by_month_chart(
-            df=df_os_by_month_charts,
-            number_of_orders=number_of_orders_para,
-            ibcs=True,
-            company_code=company_code,
-            purchasing_org=purchasing_org,
-            plant=plant,
-            material_group=material_group,
-        )
-
-        by_org_chart = os_by_org_chart(
-            df=df_os_total_by_year_charts,
-            number_of_orders=number_of_orders_para,
-            ibcs=True,
-            company_code=company_code,
-            purchasing_org=purchasing_org,
-            plant=plant,
-            material_group=material_group,
-        )
-
-        top_10_suppliers_chart = os_top_10_suppliers_chart(
-            df=df_os_top_10_suppliers_charts,
-            number_of_orders=number_of_orders_para,
-            ibcs=True,
-            company_code=company_code,
-            purchasing_org=purchasing_org,
-            plant=plant,
-            material_group=material_group,
-        )
-
-    return (
-        total_by_year_chart,
-        by_month_chart,
-        by_org_chart,
-        top_10_suppliers_chart,
-    )
+    return _update_figures(render_ordered_spend_charts, store, job_id)
 
 
 @app.callback(
     [
-        Output('supplier-performance-total-deviation-and-percentage-chart', 'figure'),
-        Output('supplier-performance-deviation-cause-and-indicator-chart', 'figure'),
-        Output('supplier-performance-by-month-chart', 'figure'),
-        Output('supplier-performance-by-org-chart', 'figure'),
-        Output('supplier-performance-top-10-suppliers-chart', 'figure'),
+        Output('supplier-performance-figures', 'data'),
+        Output('supplier-performance-job', 'data'),
+        Output('supplier-performance-job-interval', 'disabled'),
+        Output('supplier-performance-job-progress', 'value'),
+        Output('supplier-performance-job-progress', 'style'),
+        Output('supplier-performance-job-error', 'is_open'),
+        Output('supplier-performance-main', 'className'),
     ],
     [
-        Input('tabs', 'active_tab'),
-        Input('dropdown-menu', 'label'),
         Input('store', 'data'),
+        Input('supplier-performance-job-interval', 'n_intervals'),
+        Input('supplier-performance-job-retry', 'n_clicks'),
+    ],
+    [
+        State('tabs', 'active_tab'),
+        State('supplier-performance-job', 'data'),
     ],
 )
+@instrument_callback
 def update_supplier_performance_charts(
-    active_tab: str,
-    dropdown_label: str,
     store: dict[str, Any],
-) -> tuple[go.Figure]:
-    """Callback that updates the supplier performance charts.
+    n_intervals: int,
+    retry_clicks: Optional[int],
+    active_tab: str,
+    job_id: Optional[str],
+) -> tuple[Any, ...]:
+    """Callback that updates the supplier performance charts of both metrics.
+
+    The browser displays the charts of the metric selected in the dropdown menu,
+    switching the metric does not reach the server, see assets/metric_switch.js.
+    With background callbacks the charts are rendered in a job, see utils.jobs.
 
     Args:
-        active_tab: The active_tab of the page.
-        dropdown_label: The current dropdown label.
         store: GUI filters.
+        n_intervals: Number of polls of the job.
+        retry_clicks: Number of clicks on the retry button of a failed job.
+        active_tab: The active_tab of the page.
+        job_id: The job rendering the charts, if any.
 
     Returns:
-        The updated charts.
+        The updated charts per dropdown label and the state of the job, see _update_figures.
     """
     if active_tab != 'tab-supplier-performance':
         raise PreventUpdate
 
-    company_code = store['company_code']
-    purchasing_org = store['purchasing_org']
-    plant = store['plant']
-    material_group = store['material_group']
-
-    if active_tab == 'tab-supplier-performance':
-        if dropdown_label == 'Ordered Spend Amount':
-            number_of_orders_para = False
-        elif dropdown_label == "Number of Orders":
-            number_of_orders_para = True
-
-        total_deviation_and_percentage_chart = sp_total_deviation_and_percentage_chart(
-            df_deviated=df_sp_total_deviation_charts,
-            df_all=df_sp_reference,
-            number_of_orders=number_of_orders_para,
-            company_code=company_code,
-            purchasing_org=purchasing_org,
-            plant=plant,
-            material_group=material_group,
-        )
+    return _update_figures(render_supplier_performance_charts, store, job_id)
 
-        deviation_cause_and_indicator_chart = sp_deviation_cause_and_indicator_chart(
-            df=df_sp_deviation_cause_and_indicator_charts,
-            number_of_orders=number_of_orders_para,
-            company_code=company_code,
-            purchasing_org=purchasing_org,
-            plant=plant,
-            material_group=material_group,
-        )
-
-        by_month_chart = sp_by_month_chart(
-            df=df_sp_by_month_charts,
-            number_of_orders=number_of_orders_para,
-            company_code=company_code,
-            purchasing_org=purchasing_org,
-            plant=plant,
-            material_group=material_group,
-        )
 
-        by_org_chart = sp_by_org_chart(
-            df=df_sp_by_org_charts,
-            number_of_orders=number_of_orders_para,
-            company_code=company_code,
-            purchasing_org=purchasing_org,
-            plant=plant,
-            material_group=material_group,
-        )
-
-        top_10_suppliers_chart = sp_top_10_suppliers_chart(
-            df=df_sp_top_10_suppliers_charts,
-            number_of_orders=number_of_orders_para,
-            company_code=company_code,
-            purchasing_org=purchasing_org,
-            plant=plant,
-            material_group=material_group,
-        )
+# Function can be found here: assets/chart_theme.js
+app.clientside_callback(
+    ClientsideFunction('theme', 'selectThemedFigures'),
+    [
+        Output('ordered-spend-total-by-year-chart', 'figure'),
+        Output('ordered-spend-by-month-chart', 'figure'),
+        Output('ordered-spend-by-org-chart', 'figure'),
+        Output('ordered-spend-top-10-suppliers-chart', 'figure'),
+    ],
+    [
+        Input('ordered-spend-figures', 'data'),
+        Input('dropdown-menu', 'label'),
+        Input('tabs', 'active_tab'),
+    ],
+    State('ordered-spend-themes', 'data'),
+)
 
-    return (
-        total_deviation_and_percentage_chart,
-        deviation_cause_and_indicator_chart,
-        by_month_chart,
-        by_org_chart,
-        top_10_suppliers_chart,
-    )
+# Function can be found here: assets/metric_switch.js
+app.clientside_callback(
+    ClientsideFunction('metric', 'selectFigures'),
+    [
+        Output('supplier-performance-total-deviation-and-percentage-chart', 'figure'),
+        Output('supplier-performance-deviation-cause-and-indicator-chart', 'figure'),
+        Output('supplier-performance-by-month-chart', 'figure'),
+        Output('supplier-performance-by-org-chart', 'figure'),
+        Output('supplier-performance-top-10-suppliers-chart', 'figure'),
+    ],
+    [
+        Input('supplier-performance-figures', 'data'),
+        Input('dropdown-menu', 'label'),
+    ],
+)
@@ -7,26 +7,51 @@ import pandas as pd
 from charts.config import (NUMBER_OF_ORDERS, ORDERED_SPEND, SUBTITLE_NUMBER_OF_ORDERS, SUBTITLE_ORDERED_SPEND)
 
 
-def _numpy_float_is_int(x_float: Union[float, np.float64]) -> bool:
-    """Check if float number is approximately an integer."""
-    x_int = np.around(x_float, 0)
-    x_res = x_float % x_int
-    return np.isclose(x_res, 0.0)
-
-def format_numbers(row: pd.Series, displayed: str) -> str:
-    """Format numbers to be displayed."""
-    suffices = ['', 'k', 'M', 'B', 'T']
-    counter = 0
-    number = row[displayed]
-
-    if number < 1000 and (isinstance(number, int) or (_numpy_float_is_int(number))):
-        return f'{int(number)}'
-
-    while number >= 1000:
-        number /= 1000
-        counter += 1
-
-    return f'{number:.1f}{suffices[counter]}'
+SUFFIXES = np.array(['', 'k', 'M', 'B', 'T'])
+
+
+def format_numbers(values: Union[pd.Series, np.ndarray]) -> Union[pd.Series, np.ndarray]:
+    """Format numbers to be displayed.
+
+    Integers below 1000 are displayed as such, larger numbers are divided by 1000
+    until they are below 1000 and displayed with one decimal and the suffix k, M, B
+    or T. Floats count as integers if they are within 1e-8 of their rounded value,
+    apart from 0.0.
+
+    Args:
+        values: Numbers to format.
+
+    Returns:
+        The labels, as a Series with the same index if values is a Series.
+    """
+    numbers = np.asarray(values)
+
+    if np.issubdtype(numbers.dtype, np.integer):
+        is_int = np.ones(numbers.shape, dtype=bool)
+    else:
+        # Same test as x % round(x) == 0, which is NaN and hence false for numbers that round to 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            is_int = np.isclose(np.mod(numbers, np.around(numbers, 0)), 0.0)
+
+    is_small_int = (numbers < 1000) & is_int
+
+    numbers = numbers.astype(np.float64)
+    counters = np.zeros(numbers.shape, dtype=np.int64)
+    large = numbers >= 1000
+
+    # Repeated division instead of a single one by a power of 1000, the rounding must not change
+    while large.any():
+        numbers[large] /= 1000
+        counters[large] += 1
+        large = numbers >= 1000
+
+    labels = np.char.add(np.char.mod('%.1f', numbers).astype(str), SUFFIXES[counters]).astype(object)
+    labels[is_small_int] = np.asarray(values)[is_small_int].astype(np.int64).astype(str)
+
+    if isinstance(values, pd.Series):
+        return pd.Series(labels, index=values.index, dtype=object)
+
+    return labels
 
 
 def apply_number_of_orders_flag(number_of_orders: bool) -> tuple[str]:
@@ -0,0 +1,305 @@
+"""Materialized aggregates of the chart data over all filter combinations.
+
+The filter space is small: every combination of Company Code, Purchasing Org.,
+Plant and Material Group, each of which may also be "All". Pre-aggregates sum
+the Ordered Spend per group and distinct document, so that the Number of Orders
+stays exact when rows are rolled up, see utils.document_sets. A cube holds the
+result of the chart grouping for every combination that occurs in a
+pre-aggregate, so serving chart data becomes a dictionary lookup.
+Combinations that do not fit into the memory cap, as well as all data without
+a cube, are filtered and aggregated on the fly. Within a query context, e.g. a
+callback rendering several charts, every pre-aggregate is filtered only once
+and the filtered frame is shared by all charts built from it.
+"""
+import contextlib
+import weakref
+from contextvars import ContextVar
+from itertools import combinations
+from typing import Any, Iterator, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from charts.config import NUMBER_OF_ORDERS, ORDERED_SPEND
+from utils.data_prep import copy_and_apply_filter
+from utils.document_sets import DOCUMENT_COLUMN, collect_documents, count_all_documents, count_documents
+from utils.filter_index import FILTER_COLUMNS, STRING_FILTER_COLUMNS
+from utils.frame_registry import FrameRegistry
+
+MEASURES = [NUMBER_OF_ORDERS, ORDERED_SPEND]
+
+FilterKey = tuple[Any, Any, Any, Any]
+ChartData = Union[pd.DataFrame, pd.Series]
+
+_cubes = FrameRegistry()
+
+_query_context: ContextVar[Optional['QueryContext']] = ContextVar('query_context', default=None)
+
+
+def filter_key(company_code: int, purchasing_org: int, plant: int, material_group: str) -> FilterKey:
+    """Normalize the GUI filters to a hashable key, unset filters become None."""
+    values = (company_code, purchasing_org, plant, material_group)
+
+    return tuple(
+        (str(value) if column in STRING_FILTER_COLUMNS else value) if value else None
+        for column, value in zip(FILTER_COLUMNS, values))
+
+
+def pre_aggregate(df: pd.DataFrame, by: list[str]) -> pd.DataFrame:
+    """Aggregate order lines to a pre-aggregate.
+
+    Args:
+        df: Prepared DataFrame or a part of it.
+        by: The group columns of the pre-aggregate.
+
+    Returns:
+        The group columns, a distinct document and the Ordered Spend of every group and document.
+    """
+    df_aggregate = collect_documents(df, by).rename(columns={
+        'Net Value': ORDERED_SPEND,
+    }).reset_index()
+
+    # Sorting the columns is faster than sorting the index of a group per document
+    return df_aggregate.sort_values([*by, DOCUMENT_COLUMN], ignore_index=True)
+
+
+def aggregate_measures(df: pd.DataFrame, by: list[str]) -> ChartData:
+    """Aggregate the measures of the DataFrame grouped by the given columns.
+
+    The Number of Orders counts the distinct documents of each group, the
+    Ordered Spend is summed.
+
+    Args:
+        df: A filtered pre-aggregate.
+        by: The columns to group by, the measures are aggregated over all rows if empty.
+
+    Returns:
+        The aggregated DataFrame or, without group columns, a Series of the totals.
+    """
+    if not by:
+        return pd.Series({
+            NUMBER_OF_ORDERS: count_all_documents(df[DOCUMENT_COLUMN]),
+            ORDERED_SPEND: df[ORDERED_SPEND].sum(),
+        }, dtype=np.float64)
+
+    grouped = df.groupby(by, observed=True)
+
+    number_of_orders = count_documents(df[DOCUMENT_COLUMN], grouped.ngroup().to_numpy(), grouped.ngroups)
+
+    df_aggregate = grouped.agg({ORDERED_SPEND: 'sum'})
+    df_aggregate.insert(0, NUMBER_OF_ORDERS, number_of_orders)
+
+    return df_aggregate.sort_index().reset_index()
+
+
+class AggregateCube:
+    """Chart data of a pre-aggregate for every occurring filter combination.
+
+    Args:
+        df: The pre-aggregate.
+        by: The chart grouping applied after filtering.
+    """
+
+    def __init__(self, df: pd.DataFrame, by: list[str]) -> None:
+        self.by = list(by)
+        self.entries: dict[FilterKey, ChartData] = {}
+        self.number_of_bytes = 0
+        self._df = weakref.ref(df)
+
+    def get(self, key: FilterKey) -> Optional[ChartData]:
+        """Return a copy of the chart data of the filter combination or None if it is not materialized."""
+        entry = self.entries.get(key)
+
+        if entry is None:
+            return None
+
+        return entry.copy()
+
+    def compute_entries(self, filter_columns: tuple[str, ...]) -> list[tuple[FilterKey, ChartData, int, int]]:
+        """Compute the chart data of all occurring combinations of the given filter columns.
+
+        Args:
+            filter_columns: The filters that are set, all others are "All".
+
+        Returns:
+            The filter key, chart data, number of source rows and estimated
+            bytes per combination, most frequent combinations first.
+        """
+        df = self._df()
+
+        if df is None:
+            return []
+
+        if not filter_columns:
+            entry = aggregate_measures(df, self.by)
+            return [(filter_key(None, None, None, None), entry, len(df), _memory_usage(entry))]
+
+        filter_columns = list(filter_columns)
+        group_columns = filter_columns + [column for column in self.by if column not in filter_columns]
+
+        df_grouped = aggregate_measures(df, group_columns)
+        df_values = df_grouped[self.by + MEASURES]
+        bytes_per_row = _memory_usage(df_values) / max(len(df_values), 1)
+
+        number_of_rows = df.groupby(filter_columns, observed=True).size().to_dict()
+        positions_by_value = df_grouped.groupby(filter_columns, observed=True, sort=False).indices
+
+        entries = []
+
+        for values, positions in positions_by_value.items():
+            selected = dict(zip(filter_columns, values if isinstance(values, tuple) else (values,)))
+            key = filter_key(*(selected.get(column) for column in FILTER_COLUMNS))
+
+            if self.by:
+                entry = df_values.take(positions).reset_index(drop=True)
+            else:
+                entry = df_values.iloc[positions[0]]
+
+            entries.append((key, entry, number_of_rows[values], int(len(positions) * bytes_per_row)))
+
+        entries.sort(key=lambda entry: entry[2], reverse=True)
+        return entries
+
+
+def _memory_usage(data: ChartData) -> int:
+    """Estimate the bytes held by chart data.
+
+    Categories of categorical columns are shared with the pre-aggregate and not counted.
+    """
+    if isinstance(data, pd.Series):
+        return int(data.memory_usage(index=True, deep=False))
+
+    return int(data.memory_usage(index=True, deep=False).sum())
+
+
+def materialize_cubes(sources: list[tuple[pd.DataFrame, list[str]]], max_bytes: int) -> list[AggregateCube]:
+    """Build and register the cubes of the given pre-aggregates.
+
+    Combinations with fewer filters set are materialized first, and among those
+    the ones covering the most rows. Once the memory cap is reached, the remaining
+    long tail is left to be computed on the fly.
+
+    Args:
+        sources: Pairs of pre-aggregate and the chart grouping applied to it.
+        max_bytes: Memory cap shared by all cubes.
+
+    Returns:
+        The registered cubes.
+    """
+    cubes = [AggregateCube(df, by) for df, by in sources]
+    number_of_bytes = 0
+
+    for number_of_filters in range(len(FILTER_COLUMNS) + 1):
+        for cube in cubes:
+            for filter_columns in combinations(FILTER_COLUMNS, number_of_filters):
+                for key, entry, _, entry_size in cube.compute_entries(filter_columns):
+                    if number_of_bytes + entry_size > max_bytes:
+                        continue
+
+                    cube.entries[key] = entry
+                    cube.number_of_bytes += entry_size
+                    number_of_bytes += entry_size
+
+    for (df, by), cube in zip(sources, cubes):
+        _cubes.set(df, cube, key=tuple(by))
+
+    return cubes
+
+
+class QueryContext:
+    """The GUI filters of one request and the pre-aggregates filtered so far.
+
+    Args:
+        company_code, purchasing_org, plant, material_group: GUI filters.
+    """
+
+    def __init__(self, company_code: int, purchasing_org: int, plant: int, material_group: str) -> None:
+        self.filters = {
+            'company_code': company_code,
+            'purchasing_org': purchasing_org,
+            'plant': plant,
+            'material_group': material_group,
+        }
+        self.key = filter_key(company_code, purchasing_org, plant, material_group)
+        self._filtered: dict[int, tuple[pd.DataFrame, pd.DataFrame]] = {}
+
+    def filter(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Return the pre-aggregate with the filters applied, filtering it on first use."""
+        # The pre-aggregate is kept alongside, so that its id is not reused during the request
+        entry = self._filtered.get(id(df))
+
+        if entry is None:
+            entry = (df, copy_and_apply_filter(df, **self.filters))
+            self._filtered[id(df)] = entry
+
+        return entry[1]
+
+
+@contextlib.contextmanager
+def query_context(company_code: int, purchasing_org: int, plant: int, material_group: str) -> Iterator[QueryContext]:
+    """Share the filtered pre-aggregates between all charts built within the block.
+
+    Charts built with other filters than those of the context filter on their own.
+    Nested blocks with the same filters share the context of the outermost one.
+
+    Args:
+        company_code, purchasing_org, plant, material_group: GUI filters.
+
+    Yields:
+        The query context.
+    """
+    context = _query_context.get()
+
+    if context is None or context.key != filter_key(company_code, purchasing_org, plant, material_group):
+        context = QueryContext(company_code, purchasing_org, plant, material_group)
+
+    token = _query_context.set(context)
+
+    try:
+        yield context
+    finally:
+        _query_context.reset(token)
+
+
+def get_cube(df: pd.DataFrame, by: list[str]) -> Optional[AggregateCube]:
+    """Return the cube registered for the pre-aggregate and chart grouping, if any."""
+    return _cubes.get(df, key=tuple(by))
+
+
+def filter_and_aggregate(
+    df: pd.DataFrame,
+    by: list[str],
+    company_code: int,
+    purchasing_org: int,
+    plant: int,
+    material_group: str,
+) -> ChartData:
+    """Apply the GUI filters to a pre-aggregate and sum the measures by the given columns.
+
+    Served from the cube of the pre-aggregate if the combination is materialized,
+    otherwise the filtered pre-aggregate is taken from the active query context.
+
+    Args:
+        df: The pre-aggregate.
+        by: The chart grouping.
+        company_code, purchasing_org, plant, material_group: GUI filters.
+
+    Returns:
+        The chart data, see aggregate_measures.
+    """
+    cube = get_cube(df, by)
+
+    if cube is not None:
+        entry = cube.get(filter_key(company_code, purchasing_org, plant, material_group))
+
+        if entry is not None:
+            return entry
+
+    context = _query_context.get()
+
+    if context is not None and context.key == filter_key(company_code, purchasing_org, plant, material_group):
+        df = context.filter(df)
+    else:
+        df = copy_and_apply_filter(df, company_code, purchasing_org, plant, material_group)
+
+    return aggregate_measures(df, by)
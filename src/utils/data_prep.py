@@ -1,32 +1,256 @@
 """Serves to read and prepare the data used for the dashboard."""
+import hashlib
+import logging
 import os
+from typing import Optional
 
+import numpy as np
 import pandas as pd
-from app import cache
 
+from utils.filter_index import get_filter_index
+from utils.ingest_cache import (PREPARATION_VERSION, file_content_hash, read_partition, read_partition_keys,
+                                write_partitions)
+from utils.partitions import PartitionedData, concat_partitions, split_partitions
+from utils.settings import DASHBOARD_DATA_PATH, DASHBOARD_PARTITIONS_MAX_BYTES, DASHBOARD_SHARED_DATA_ENABLED
+from utils.shared_data import map_frame, share_frame
 
-@cache.memoize()
-def get_data() -> pd.DataFrame:
+DATA_PATH = DASHBOARD_DATA_PATH
+
+# File types of the source data and the delta files of new order lines, see read_raw_data
+DELTA_EXTENSIONS = ('.xlsx', '.xls', '.csv', '.parquet')
+
+# Date columns of the raw data, parsed when reading CSV files
+DATE_COLUMNS = ['Document Date', 'delivery date', 'supplier delivery date']
+
+# Dimension columns with few distinct values, stored dictionary-encoded
+CATEGORICAL_COLUMNS = [
+    'Country',
+    'Supplier Name',
+    'City',
+    'Supplier Country',
+    'Material Group',
+    'Material Group Text',
+    'Order Unit',
+    'Deviation Indicator',
+    'Deviation Cause Text',
+    'Local Currency',
+]
+
+# ID, calendar and quantity columns downcast to the smallest sufficient integer type
+INTEGER_COLUMNS = [
+    'Year',
+    'Month',
+    'Company Code',
+    'Purchasing Doc.',
+    'Item',
+    'Purchasing Org.',
+    'Plant',
+    'Supplier',
+    'Material',
+    'Open Quantity',
+    'Delivery Deviation (Days)',
+    'Deviation Cause',
+    'Counter',
+]
+
+logger = logging.getLogger(__name__)
+
+
+def get_data() -> PartitionedData:
     """Read and prepare the data.
 
-    Reads the data from an Excel-File, applies
-    the preparation required for the Dashboardand returns the data frame.
+    Reads the prepared data from the on-disk cache if the source data file,
+    see DASHBOARD_DATA_PATH, has not changed since it was last parsed. Otherwise
+    reads the data from the file, applies the preparation required for the
+    Dashboard, stores the result in the cache and returns it.
+
+    The data is partitioned by month, see utils.partitions. Partitions are read
+    from the cache on first use and evicted again once the loaded ones exceed
+    DASHBOARD_PARTITIONS_MAX_BYTES. If sharing between workers is enabled, every
+    partition is memory-mapped from the file of the first worker loading it
+    instead, see utils.shared_data.
+
+    The data is fingerprinted with the content hash of the Excel-File,
+    so memoized results computed from an older version are never reused.
+
+    Returns:
+        Prepared data.
+    """
+    content_hash = file_content_hash(DATA_PATH)
+    version = f'v{PREPARATION_VERSION}-{content_hash}'
+    fingerprint = f'prepared@{version}'
+    keys = read_partition_keys(content_hash)
+    partitions = {}
+    stored = True
+
+    if keys is None:
+        partitions = split_partitions(prepare_data(read_raw_data(DATA_PATH)))
+        keys = list(partitions)
+        stored = write_partitions(partitions, content_hash)
+
+    def load(key: str, df: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """Load a partition, from the cache unless it is given."""
+        df_mapped = map_frame(f'prepared-{key}', fingerprint) if DASHBOARD_SHARED_DATA_ENABLED else None
+
+        if df_mapped is not None:
+            return df_mapped
+
+        df = read_partition(content_hash, key) if df is None else df
+
+        if DASHBOARD_SHARED_DATA_ENABLED:
+            share_frame(df, f'prepared-{key}', fingerprint)
+            df_mapped = map_frame(f'prepared-{key}', fingerprint)
+
+        return df_mapped if df_mapped is not None else df
+
+    # Partitions without a file in the cache are never evicted
+    return PartitionedData(
+        version,
+        keys,
+        load,
+        set(keys) if stored else set(),
+        {key: load(key, df) for key, df in partitions.items()},
+        DASHBOARD_PARTITIONS_MAX_BYTES,
+    )
+
+
+def list_delta_files(directory: str) -> list[str]:
+    """Return the delta files of a directory in the order of their names, hidden files are skipped.
+
+    Args:
+        directory: The directory, an empty string or a missing directory has no delta files.
+    """
+    if not directory or not os.path.isdir(directory):
+        return []
+
+    return [
+        os.path.join(directory, name) for name in sorted(os.listdir(directory))
+        if not name.startswith('.') and name.lower().endswith(DELTA_EXTENSIONS)
+    ]
+
+
+def read_raw_data(path: str) -> pd.DataFrame:
+    """Read raw order lines, e.g. the source data or the output of benchmarks/generate_data.py.
+
+    Args:
+        path: Excel, CSV or Parquet file with the columns of the Excel-File, the type follows the extension.
+
+    Returns:
+        Raw DataFrame as read from the file.
+    """
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension == '.csv':
+        return pd.read_csv(path, parse_dates=DATE_COLUMNS)
+
+    if extension == '.parquet':
+        return pd.read_parquet(path)
+
+    return pd.read_excel(path)
+
+
+def read_delta_data(path: str) -> pd.DataFrame:
+    """Read and prepare a delta file of new order lines.
+
+    Args:
+        path: Excel, CSV or Parquet file with the columns of the Excel-File, see read_raw_data.
 
     Returns:
         Prepared DataFrame.
     """
-    data_path = os.path.join(os.path.dirname(__file__), '../../data/Daten I.xlsx')
-    df = pd.read_excel(data_path)
+    return prepare_data(read_raw_data(path))
+
+
+def append_data(df: pd.DataFrame, df_delta: pd.DataFrame) -> pd.DataFrame:
+    """Append prepared order lines to prepared data, e.g. a partition.
+
+    The categories of the delta are merged into the categorical columns, so the
+    result keeps their dtype.
+
+    Args:
+        df: Prepared DataFrame.
+        df_delta: Prepared DataFrame of new order lines.
+
+    Returns:
+        The prepared DataFrame followed by the new order lines.
+    """
+    categorical_columns = {}
+    categorical_delta_columns = {}
+
+    for column in CATEGORICAL_COLUMNS:
+        categories = df[column].cat.categories
+        values = df_delta[column].astype(object)
+
+        # Mixed columns were normalized to strings, which the delta alone may not have required
+        if pd.api.types.infer_dtype(categories) == 'string':
+            values = values.where(values.isna(), values.astype(str))
+
+        # Sorted like the categories of a full preparation
+        dtype = pd.CategoricalDtype(categories.union(pd.Index(values.dropna().unique())))
+
+        categorical_columns[column] = df[column].cat.set_categories(dtype.categories)
+        categorical_delta_columns[column] = values.astype(dtype)
+
+    return pd.concat(
+        [df.assign(**categorical_columns), df_delta.assign(**categorical_delta_columns)],
+        ignore_index=True,
+    )
+
+
+def append_partitions(
+    data: PartitionedData,
+    df_delta: pd.DataFrame,
+    delta_hash: str,
+) -> tuple[PartitionedData, pd.DataFrame]:
+    """Append prepared order lines to the partitions of their months.
+
+    Only the partitions of the months of the new order lines are loaded and
+    replaced, see append_data. The result is versioned with the fingerprint of
+    the data and the content hash of the delta file.
+
+    Args:
+        data: Prepared data.
+        df_delta: Prepared DataFrame of new order lines.
+        delta_hash: Content hash of the delta file.
+
+    Returns:
+        The appended data and the new order lines with the dtypes of the data,
+        the given data is left unchanged.
+    """
+    template = data.partition(data.keys[0]).iloc[:0]
+    partitions = {}
+    new_lines = []
+
+    for key, df_month in split_partitions(df_delta).items():
+        partition = data.partition(key) if key in data.keys else template
+        partitions[key] = append_data(partition, df_month)
+        new_lines.append(partitions[key].iloc[len(partition):])
+
+    version = hashlib.sha256(f'{data.fingerprint}+{delta_hash}'.encode()).hexdigest()
+    data_appended = data.with_partitions(f'v{PREPARATION_VERSION}-{version}', partitions, delta_hash)
+
+    return data_appended, concat_partitions(new_lines).reset_index(drop=True)
+
+
+def prepare_data(df: pd.DataFrame) -> pd.DataFrame:
+    """Apply the preparation required for the Dashboard to the raw data.
 
+    Args:
+        df: Raw DataFrame as read from the Excel-File.
+
+    Returns:
+        Prepared DataFrame.
+    """
     _rename_columns(df)
     _drop_unnecessary_columns(df)
+    _normalize_mixed_type_columns(df)
     _calculate_month_and_year(df)
     _calculate_delivery_details(df)
+    _compact_dtypes(df)
 
     return df
 
 
-@cache.memoize()
 def copy_and_apply_filter(
     df: pd.DataFrame,
     company_code: int,
@@ -36,6 +260,11 @@ def copy_and_apply_filter(
 ) -> pd.DataFrame:
     """Copy the DataFrame and apply the filters from the GUI.
 
+    The rows are selected through the filter index of the DataFrame,
+    which is built once on first use and reused by every later call.
+    The result is not memoized: taking the rows is cheaper than pickling
+    them into the cache and reading them back.
+
     Args:
         df: The DataFrame used for the dashboard.
         company_code, purchasing_org, plant, material_group: GUI filters.
@@ -43,21 +272,12 @@ def copy_and_apply_filter(
     Returns:
         The filtered data as a DataFrame.
     """
-    filtered_df = df.copy(deep=True)
+    positions = get_filter_index(df).positions(company_code, purchasing_org, plant, material_group)
 
-    if company_code:
-        filtered_df = filtered_df.loc[filtered_df['Company Code'] == company_code]
+    if positions is None:
+        return df.copy(deep=False)
 
-    if purchasing_org:
-        filtered_df = filtered_df.loc[filtered_df['Purchasing Org.'] == purchasing_org]
-
-    if plant:
-        filtered_df = filtered_df.loc[filtered_df['Plant'] == plant]
-
-    if material_group:
-        filtered_df = filtered_df.loc[filtered_df['Material Group'].astype(str) == material_group]
-
-    return filtered_df
+    return df.take(positions)
 
 
 def _rename_columns(df: pd.DataFrame) -> None:
@@ -85,26 +305,58 @@ def _drop_unnecessary_columns(df: pd.DataFrame) -> None:
     df.drop(columns=df.columns[-2:], axis=1, inplace=True)
 
 
+def _normalize_mixed_type_columns(df: pd.DataFrame) -> None:
+    """Convert columns mixing numbers and strings (e.g. 'Material Group') to strings."""
+    for column in df.columns[df.dtypes == object]:
+        values = df[column].dropna()
+
+        if values.map(type).nunique() > 1:
+            df[column] = df[column].where(df[column].isna(), df[column].astype(str))
+
+
 def _calculate_month_and_year(df: pd.DataFrame) -> None:
     """Fill the missing values for the columns concerning month and year."""
-    df['Year'] = df['Document Date'].dt.year
-    df['Month'] = df['Document Date'].dt.month
-    df['Year/Month'] = pd.to_datetime(df['Document Date']).dt.to_period('M')
+    document_date = df['Document Date'].dt
 
+    df['Year'] = document_date.year
+    df['Month'] = document_date.month
+    df['Year/Month'] = document_date.to_period('M')
 
-def _determine_delivery_indicator(row: pd.Series) -> str:
-    """Return the delivery indicator."""
-    if row['Delivery Deviation (Days)'] <= 0:
-        return 'in time'
-    elif row['Delivery Deviation (Days)'] < 5:
-        return 'late: < 5 days'
-    elif row['Delivery Deviation (Days)'] > 10:
-        return 'late: > 10 days'
 
-    return 'late: 5 to 10 days'
+def _calculate_delivery_details(df: pd.DataFrame) -> None:
+    """Calculate the delivery deviation and classify the corresponding indicator.
 
+    The indicator bins the deviation into 'in time' (<= 0 days), 'late: < 5 days',
+    'late: 5 to 10 days' and 'late: > 10 days'. Missing deviations fall into the
+    last remaining bin, 'late: 5 to 10 days'.
+    """
+    deviation = (df['Delivery Date'] - df['Supplier Delivery Date']).dt.days
+    df['Delivery Deviation (Days)'] = deviation
+    df['Deviation Indicator'] = np.select(
+        [deviation <= 0, deviation < 5, deviation > 10],
+        ['in time', 'late: < 5 days', 'late: > 10 days'],
+        default='late: 5 to 10 days',
+    ).astype(object)
 
-def _calculate_delivery_details(df: pd.DataFrame) -> None:
-    """Calculate the delivery deviation and classify the corresponding indicator."""
-    df['Delivery Deviation (Days)'] = (df['Delivery Date'] - df['Supplier Delivery Date']).dt.days
-    df['Deviation Indicator'] = df.apply(_determine_delivery_indicator, axis=1)
+
+def _compact_dtypes(df: pd.DataFrame) -> None:
+    """Dictionary-encode the dimension columns and downcast the integer columns.
+
+    Categorical columns let groupbys operate on integer codes. Float columns
+    are left untouched, so that sums of e.g. 'Net Value' stay exact.
+    """
+    memory_before = df.memory_usage(deep=True).sum()
+
+    for column in CATEGORICAL_COLUMNS:
+        df[column] = df[column].astype('category')
+
+    for column in INTEGER_COLUMNS:
+        df[column] = pd.to_numeric(df[column], downcast='integer')
+
+    memory_after = df.memory_usage(deep=True).sum()
+    logger.info(
+        'Compacted prepared data from %.1f MB to %.1f MB (%.1f MB saved)',
+        memory_before / 1e6,
+        memory_after / 1e6,
+        (memory_before - memory_after) / 1e6,
+    )
@@ -0,0 +1,59 @@
+"""Exact distinct counts of purchasing documents across rollups.
+
+A count of distinct documents per row of a pre-aggregate cannot be summed when
+the charts roll the rows up: a document spanning several plants or material
+groups would be counted once per row. Instead, the pre-aggregates keep their
+documents in long format, the document is their last group column: every row
+holds one group and one of its distinct documents. Rolling rows up counts the
+distinct (group, document) pairs in a single vectorized pass, so the count is
+exact at every filter level without going back to the prepared data, and
+merging pre-aggregates is a concatenation followed by a groupby.
+
+The number of rows of a pre-aggregate is the number of distinct (group,
+document) pairs, which stays close to the number of documents as long as few
+documents span several groups.
+"""
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+DOCUMENT_COLUMN = 'Purchasing Doc.'
+
+
+def collect_documents(df: pd.DataFrame, by: list[str]) -> pd.DataFrame:
+    """Aggregate the prepared data to one row per group and distinct document.
+
+    Args:
+        df: Prepared DataFrame or a part of it.
+        by: The group columns of the pre-aggregate.
+
+    Returns:
+        The Net Value of every group and document, indexed by the group columns followed by DOCUMENT_COLUMN.
+    """
+    return df.groupby([*by, DOCUMENT_COLUMN], observed=True).agg({'Net Value': 'sum'})
+
+
+def count_documents(documents: Union[pd.Series, np.ndarray], groups: np.ndarray, number_of_groups: int) -> np.ndarray:
+    """Count the distinct documents of the rows belonging to the same group.
+
+    Every (group, document) pair is encoded as one integer, the distinct pairs
+    are found by hashing and counted per group.
+
+    Args:
+        documents: Document of every row.
+        groups: Group of every row, from 0 to number_of_groups - 1.
+        number_of_groups: Number of groups.
+
+    Returns:
+        The number of distinct documents of every group.
+    """
+    codes, uniques = pd.factorize(np.asarray(documents))
+    pairs = pd.unique(np.asarray(groups, dtype=np.int64) * len(uniques) + codes)
+
+    return np.bincount(pairs // max(len(uniques), 1), minlength=number_of_groups).astype(np.int64)
+
+
+def count_all_documents(documents: Union[pd.Series, np.ndarray]) -> int:
+    """Count the distinct documents of all rows."""
+    return len(pd.unique(np.asarray(documents)))
@@ -0,0 +1,149 @@
+"""Polling watches of a file for content changes and of a directory for new files.
+
+The modification time of a file is checked at every poll, the content hash
+only when the modification time changed. A touched but unchanged file, e.g. a
+copy of the same data, therefore does not count as a change.
+"""
+import logging
+import os
+import threading
+from typing import Any, Callable, Optional
+
+from utils.ingest_cache import file_content_hash
+
+logger = logging.getLogger(__name__)
+
+
+class _Watcher:
+    """Poll a path in a daemon thread.
+
+    Args:
+        path: The watched path.
+        interval: Seconds between two polls.
+    """
+
+    def __init__(self, path: str, interval: float) -> None:
+        self.path = path
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def poll(self) -> Any:
+        """Check the path once."""
+        raise NotImplementedError
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            try:
+                self.poll()
+            except Exception:
+                logger.exception('Handling the change of %s failed', self.path)
+
+    def start(self) -> None:
+        """Poll in a daemon thread."""
+        thread = threading.Thread(target=self._run, name='file-watch', daemon=True)
+        thread.start()
+
+    def stop(self) -> None:
+        """Stop polling after the current poll."""
+        self._stopped.set()
+
+
+class FileWatcher(_Watcher):
+    """Call back whenever the content of a file changed.
+
+    Args:
+        path: The watched file.
+        on_change: Called with the new content hash in the thread of the watcher.
+        interval: Seconds between two polls.
+    """
+
+    def __init__(self, path: str, on_change: Callable[[str], None], interval: float) -> None:
+        super().__init__(path, interval)
+        self.on_change = on_change
+
+        self._mtime = self._stat_mtime()
+        self._content_hash = file_content_hash(path) if self._mtime is not None else None
+
+    def _stat_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return None
+
+    def poll(self) -> bool:
+        """Check the file once and call back if its content changed.
+
+        Returns:
+            Whether the content changed.
+        """
+        mtime = self._stat_mtime()
+
+        if mtime is None or mtime == self._mtime:
+            return False
+
+        try:
+            content_hash = file_content_hash(self.path)
+        except OSError:
+            # The file is being replaced, retry at the next poll
+            return False
+
+        self._mtime = mtime
+
+        if content_hash == self._content_hash:
+            return False
+
+        self._content_hash = content_hash
+        self.on_change(content_hash)
+        return True
+
+
+class DirectoryWatcher(_Watcher):
+    """Call back for every new file in a directory, in the order of the file names.
+
+    Files are reported once. A file whose callback fails is reported again at
+    the next poll, the files after it wait, so the order is kept. Hidden files
+    are skipped, hence a file can be written under a hidden name and renamed
+    once it is complete.
+
+    Args:
+        path: The watched directory.
+        on_new_file: Called with the path of every new file in the thread of the watcher.
+        interval: Seconds between two polls.
+        extensions: Only files with one of these extensions are reported.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        on_new_file: Callable[[str], None],
+        interval: float,
+        extensions: tuple[str, ...],
+    ) -> None:
+        super().__init__(path, interval)
+        self.on_new_file = on_new_file
+        self.extensions = extensions
+        self._reported: set[str] = set()
+
+    def poll(self) -> list[str]:
+        """Check the directory once and call back for every new file.
+
+        Returns:
+            The paths of the reported files.
+        """
+        try:
+            names = sorted(os.listdir(self.path))
+        except OSError:
+            return []
+
+        reported = []
+
+        for name in names:
+            if name in self._reported or name.startswith('.') or not name.lower().endswith(self.extensions):
+                continue
+
+            path = os.path.join(self.path, name)
+            self.on_new_file(path)
+            self._reported.add(name)
+            reported.append(path)
+
+        return reported
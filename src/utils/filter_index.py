@@ -0,0 +1,84 @@
+"""Precomputed row positions for the global GUI filters.
+
+For every value of Company Code, Purchasing Org., Plant and Material Group
+the index holds the sorted positions of the rows carrying that value.
+Applying the filters is then an intersection of position arrays followed
+by a single take instead of a full column comparison per filter.
+"""
+from typing import Any, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.frame_registry import FrameRegistry
+
+FILTER_COLUMNS = ('Company Code', 'Purchasing Org.', 'Plant', 'Material Group')
+
+# Filter values arrive from the dropdowns as strings for these columns
+STRING_FILTER_COLUMNS = ('Material Group',)
+
+_EMPTY_POSITIONS = np.array([], dtype=np.int64)
+
+_filter_indices = FrameRegistry()
+
+
+class FilterIndex:
+    """Row positions per filter value of a DataFrame.
+
+    Args:
+        df: DataFrame containing the filter columns.
+    """
+
+    def __init__(self, df: pd.DataFrame) -> None:
+        self.number_of_rows = len(df)
+        self.positions_by_column: dict[str, dict[Any, np.ndarray]] = {}
+
+        for column in FILTER_COLUMNS:
+            indices = df.groupby(column, observed=True, sort=False).indices
+
+            if column in STRING_FILTER_COLUMNS:
+                indices = {str(value): positions for value, positions in indices.items()}
+
+            self.positions_by_column[column] = indices
+
+    def positions(
+        self,
+        company_code: int,
+        purchasing_org: int,
+        plant: int,
+        material_group: str,
+    ) -> Optional[np.ndarray]:
+        """Return the sorted positions of the rows matching the filters.
+
+        Args:
+            company_code, purchasing_org, plant, material_group: GUI filters.
+
+        Returns:
+            The row positions or None if no filter is set.
+        """
+        selections = []
+
+        for column, value in zip(FILTER_COLUMNS, (company_code, purchasing_org, plant, material_group)):
+            if value:
+                selections.append(self.positions_by_column[column].get(value, _EMPTY_POSITIONS))
+
+        if not selections:
+            return None
+
+        selections.sort(key=len)
+        positions = selections[0]
+
+        for selection in selections[1:]:
+            if not len(positions):
+                break
+            positions = np.intersect1d(positions, selection, assume_unique=True)
+
+        return positions
+
+
+def get_filter_index(df: pd.DataFrame) -> FilterIndex:
+    """Return the filter index of the DataFrame, building it on first use.
+
+    The index is kept for as long as the DataFrame itself is alive.
+    """
+    return _filter_indices.setdefault(df, FilterIndex)
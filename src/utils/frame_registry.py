@@ -0,0 +1,51 @@
+"""Values attached to DataFrames for as long as the DataFrames are alive.
+
+DataFrames are neither hashable nor safe to extend with attributes, because
+pandas propagates metadata to derived frames. The registry therefore keys on
+the object identity and drops an entry as soon as its DataFrame is collected.
+"""
+import threading
+import weakref
+from typing import Any, Callable, Hashable, Optional
+
+import pandas as pd
+
+
+class FrameRegistry:
+    """Mapping from (DataFrame, key) to a value, holding the DataFrames weakly."""
+
+    def __init__(self) -> None:
+        self._entries: dict[tuple[int, Hashable], tuple[weakref.ref, Any]] = {}
+        self._lock = threading.RLock()
+
+    def get(self, df: pd.DataFrame, key: Hashable = None) -> Optional[Any]:
+        """Return the value registered for the DataFrame or None."""
+        entry = self._entries.get((id(df), key))
+
+        if entry is None or entry[0]() is not df:
+            return None
+
+        return entry[1]
+
+    def set(self, df: pd.DataFrame, value: Any, key: Hashable = None) -> None:
+        """Register a value for the DataFrame."""
+        entry_key = (id(df), key)
+
+        with self._lock:
+            self._entries[entry_key] = (weakref.ref(df, lambda _: self._entries.pop(entry_key, None)), value)
+
+    def setdefault(self, df: pd.DataFrame, factory: Callable[[pd.DataFrame], Any], key: Hashable = None) -> Any:
+        """Return the value registered for the DataFrame, creating it with the factory on first use."""
+        value = self.get(df, key)
+
+        if value is not None:
+            return value
+
+        with self._lock:
+            value = self.get(df, key)
+
+            if value is None:
+                value = factory(df)
+                self.set(df, value, key)
+
+        return value
@@ -0,0 +1,134 @@
+"""Columnar on-disk cache for the prepared dataset.
+
+Parsing the Excel file and preparing the data takes seconds, so the prepared
+DataFrame is written to Parquet files after the first parse, one per month
+partition, see utils.partitions. The directory name contains the content hash
+of the source file, hence a changed source file never matches an old cache
+entry. Writing an entry keeps the previous one, the data loaded before a
+reload, e.g. by another worker, reads its evicted partitions from it.
+"""
+import contextlib
+import glob
+import hashlib
+import os
+import shutil
+from typing import Optional
+
+import pandas as pd
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), '../../data/.cache')
+
+# Increase whenever the preparation steps change the resulting DataFrame
+PREPARATION_VERSION = 2
+
+# Number of cache entries kept besides the one written, the most recently written first
+KEPT_PREVIOUS_ENTRIES = 1
+
+
+def file_content_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    """Return the SHA-256 hex digest of the file content."""
+    sha256 = hashlib.sha256()
+
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            sha256.update(chunk)
+
+    return sha256.hexdigest()
+
+
+def _cache_dir(content_hash: str) -> str:
+    """Return the directory of the partitions belonging to a source file hash."""
+    return os.path.join(CACHE_DIR, f'prepared_v{PREPARATION_VERSION}_{content_hash}')
+
+
+def read_partition_keys(content_hash: str) -> Optional[list[str]]:
+    """Return the keys of the partitions of the prepared data in the cache.
+
+    The entry counts as the most recently written one afterwards, so that
+    write_partitions keeps it as the previous entry.
+
+    Args:
+        content_hash: Content hash of the source file.
+
+    Returns:
+        The keys, e.g. '2020-06', or None if there is no cache entry.
+    """
+    path = _cache_dir(content_hash)
+
+    if not os.path.isdir(path):
+        return None
+
+    with contextlib.suppress(OSError):
+        os.utime(path)
+
+    return sorted(name[:-len('.parquet')] for name in os.listdir(path) if name.endswith('.parquet'))
+
+
+def read_partition(content_hash: str, key: str) -> pd.DataFrame:
+    """Read a partition of the prepared data from the cache.
+
+    Args:
+        content_hash: Content hash of the source file.
+        key: Key of the partition.
+
+    Returns:
+        The partition.
+    """
+    return pd.read_parquet(os.path.join(_cache_dir(content_hash), f'{key}.parquet'))
+
+
+def write_partitions(partitions: dict[str, pd.DataFrame], content_hash: str) -> bool:
+    """Write the partitions of the prepared data to the cache and remove outdated entries.
+
+    The partitions are written to a temporary directory which is renamed afterwards,
+    so that concurrently starting workers never read a partial cache entry. The
+    previous entry is kept, see KEPT_PREVIOUS_ENTRIES, only older ones are removed.
+
+    Args:
+        partitions: The partitions keyed on their month.
+        content_hash: Content hash of the source file.
+
+    Returns:
+        Whether the partitions are in the cache.
+    """
+    path = _cache_dir(content_hash)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+
+    try:
+        os.makedirs(tmp_path, exist_ok=True)
+
+        for key, partition in partitions.items():
+            partition.to_parquet(os.path.join(tmp_path, f'{key}.parquet'), index=False)
+
+        os.rename(tmp_path, path)
+    except (OSError, TypeError, ValueError):
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+        # Another worker may have written the same entry first
+        return read_partition_keys(content_hash) == sorted(partitions)
+
+    previous_paths = sorted(
+        (
+            previous_path for previous_path in glob.glob(os.path.join(CACHE_DIR, 'prepared_*'))
+            if previous_path != path and not previous_path.endswith('.tmp')
+        ),
+        key=_modified_at,
+        reverse=True,
+    )
+
+    for outdated_path in previous_paths[KEPT_PREVIOUS_ENTRIES:]:
+        if os.path.isdir(outdated_path):
+            shutil.rmtree(outdated_path, ignore_errors=True)
+        else:
+            with contextlib.suppress(OSError):
+                os.remove(outdated_path)
+
+    return True
+
+
+def _modified_at(path: str) -> float:
+    """Return the modification time of a cache entry, 0 if it was removed meanwhile."""
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
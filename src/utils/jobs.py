@@ -0,0 +1,234 @@
+"""Background jobs of expensive callbacks.
+
+Rendering the charts of a page can block a server thread for seconds on large
+data. With DASHBOARD_BACKGROUND_CALLBACKS_ENABLED the chart callbacks submit
+the rendering as a job to a pool of worker threads and return right away. The
+browser polls the job through an interval component, shows its progress and
+receives the figures once the job is done. A failed job is reported to its
+page, which shows an error with a retry button and marks its charts as outdated.
+
+Jobs report their progress through report_progress, which is also where a
+cancelled job stops. A page submitting a new job, e.g. after the user changed
+the filters again, cancels the job it supersedes: a job that has not started
+is dropped, a running one stops at its next progress report. Charts rendered
+before are memoized, so a later job reuses them.
+
+The workers are threads rather than processes, they share the prepared data,
+the pre-aggregates and the in-process cache tier with the server. Jobs live in
+the memory of the process they were submitted to, hence a page must poll the
+same server process, e.g. a single process serving with several threads. The
+id of a job names its process: a poll reaching another process is logged as
+an error and reports the job as failed, so the page offers to retry.
+"""
+import concurrent.futures
+import contextlib
+import contextvars
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Any, Callable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+# Seconds a finished job is kept for its page to poll it
+RESULT_TIMEOUT = 300
+
+_current_job: contextvars.ContextVar[Optional['Job']] = contextvars.ContextVar('current_job', default=None)
+_progress_part: contextvars.ContextVar[tuple[int, int]] = contextvars.ContextVar('progress_part', default=(0, 1))
+
+
+class JobCancelled(Exception):
+    """Raised by report_progress within a cancelled job."""
+
+
+class Job:
+    """A callback running in the background.
+
+    Args:
+        job_id: Identifies the job in the polls of its page.
+    """
+
+    def __init__(self, job_id: str) -> None:
+        self.id = job_id
+        self.status = PENDING
+        self.progress = 0.0
+        self.result: Any = None
+        self.finished_at: Optional[float] = None
+        self.future: Optional[concurrent.futures.Future] = None
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether the job was cancelled."""
+        return self._cancelled.is_set()
+
+    @property
+    def finished(self) -> bool:
+        """Whether the job is done, failed or cancelled."""
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    def cancel(self) -> None:
+        """Cancel the job, it stops at its next progress report unless it is finished."""
+        self._cancelled.set()
+
+        if self.future is not None and self.future.cancel():
+            self._finish(CANCELLED)
+
+    def _finish(self, status: str, result: Any = None) -> None:
+        self.result = result
+        self.finished_at = time.monotonic()
+        self.status = status
+
+
+class JobQueue:
+    """Runs jobs on a pool of worker threads.
+
+    Args:
+        max_workers: Number of worker threads, they are started on demand.
+        result_timeout: Seconds a finished job is kept until it is polled.
+    """
+
+    def __init__(self, max_workers: int, result_timeout: float = RESULT_TIMEOUT) -> None:
+        self.result_timeout = result_timeout
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers, thread_name_prefix='job')
+        self._jobs: dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, func: Callable, *args: Any, supersedes: Optional[str] = None, **kwargs: Any) -> str:
+        """Run a function in the background.
+
+        Args:
+            func: The function, it may call report_progress.
+            args, kwargs: Arguments of the function.
+            supersedes: Id of a job of the same page, which is cancelled.
+
+        Returns:
+            The id of the job.
+        """
+        if supersedes is not None:
+            self.cancel(supersedes)
+
+        self._remove_expired()
+        job = Job(f'{_process_prefix()}{uuid.uuid4().hex}')
+
+        with self._lock:
+            self._jobs[job.id] = job
+
+        job.future = self._executor.submit(self._run, job, func, args, kwargs)
+        return job.id
+
+    def cancel(self, job_id: str) -> None:
+        """Cancel a job, unknown and finished jobs are ignored."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+
+        if job is not None and not job.finished:
+            job.cancel()
+            logger.debug('Cancelled job %s', job_id)
+
+    def poll(self, job_id: str) -> Optional[Job]:
+        """Return a job, None if it is unknown or expired.
+
+        A finished job is returned once, it is removed from the queue afterwards.
+        A job submitted to another process is returned as failed.
+        """
+        if not job_id.startswith(_process_prefix()):
+            logger.error(
+                'Job %s was submitted to another server process, background callbacks need a single process', job_id)
+            job = Job(job_id)
+            job._finish(FAILED)
+            return job
+
+        with self._lock:
+            job = self._jobs.get(job_id)
+
+            if job is not None and job.finished:
+                del self._jobs[job_id]
+
+        return job
+
+    @staticmethod
+    def _run(job: Job, func: Callable, args: tuple, kwargs: dict[str, Any]) -> None:
+        """Run a job in a worker thread."""
+        if job.cancelled:
+            job._finish(CANCELLED)
+            return
+
+        job.status = RUNNING
+        token = _current_job.set(job)
+        start = time.perf_counter()
+
+        try:
+            result = func(*args, **kwargs)
+        except JobCancelled:
+            job._finish(CANCELLED)
+            logger.debug('Job %s stopped after %.2fs', job.id, time.perf_counter() - start)
+        except Exception:
+            job._finish(FAILED)
+            logger.exception('Job %s failed', job.id)
+        else:
+            job.progress = 1.0
+            job._finish(DONE, result)
+            logger.debug('Job %s done in %.2fs', job.id, time.perf_counter() - start)
+        finally:
+            _current_job.reset(token)
+
+    def _remove_expired(self) -> None:
+        """Remove finished jobs no page polled within the result timeout."""
+        expired_before = time.monotonic() - self.result_timeout
+
+        with self._lock:
+            for job_id, job in list(self._jobs.items()):
+                if job.finished and job.finished_at < expired_before:
+                    del self._jobs[job_id]
+
+
+def _process_prefix() -> str:
+    """Return the prefix of the ids of the jobs of the current process, read on every call as workers may fork."""
+    return f'{os.getpid()}-'
+
+
+def report_progress(done: int, total: int) -> None:
+    """Report the progress of the current job, a no-op outside of jobs.
+
+    Args:
+        done: Number of finished steps.
+        total: Number of all steps.
+
+    Raises:
+        JobCancelled: If the current job was cancelled.
+    """
+    job = _current_job.get()
+
+    if job is None:
+        return
+
+    if job.cancelled:
+        raise JobCancelled
+
+    part, parts = _progress_part.get()
+    job.progress = (part + (done / total if total else 0.0)) / parts
+
+
+@contextlib.contextmanager
+def progress_part(part: int, parts: int) -> Iterator[None]:
+    """Scale the progress reported within the block to one of several equal parts of the current job.
+
+    Args:
+        part: Index of the part, from 0 to parts - 1.
+        parts: Number of parts.
+    """
+    token = _progress_part.set((part, parts))
+
+    try:
+        yield
+    finally:
+        _progress_part.reset(token)
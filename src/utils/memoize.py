@@ -0,0 +1,241 @@
+"""Memoization keyed on DataFrame fingerprints.
+
+Flask-Caching derives memoization keys from the repr of the arguments, which
+is expensive for DataFrames and not unique, since different frames can print
+the same. Here a DataFrame argument contributes its fingerprint instead: a
+stable identifier of the dataset or pre-aggregate plus the version of the data
+it was built from. Frames without a registered fingerprint fall back to a hash
+of their content, computed once per frame.
+"""
+import contextlib
+import contextvars
+import functools
+import hashlib
+import inspect
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Iterator, Optional
+
+import pandas as pd
+import plotly
+from app import app, cache
+from flask import jsonify
+
+from utils.frame_registry import FrameRegistry
+
+_fingerprints = FrameRegistry()
+
+_cache_stats: dict[str, dict[str, int]] = {}
+_cache_stats_lock = threading.Lock()
+
+# Maximum number of cache keys whose fingerprints are tracked for invalidate_version
+MAX_TRACKED_KEYS = 50000
+
+# Fingerprints of the DataFrame arguments per cache key of the memoized results, least recently used first
+_fingerprints_by_key: OrderedDict[str, tuple[str, ...]] = OrderedDict()
+_fingerprints_by_key_lock = threading.Lock()
+
+# Cache keys of the memoized figures computed or hit within a record_keys block
+_recorded_keys: contextvars.ContextVar[Optional[set[str]]] = contextvars.ContextVar('recorded_keys', default=None)
+
+
+def set_fingerprint(df: pd.DataFrame, name: str, version: str) -> None:
+    """Register the fingerprint of a DataFrame.
+
+    Args:
+        df: The DataFrame.
+        name: Stable identifier of the dataset or pre-aggregate (e.g. 'os_total_by_year').
+        version: Version of the underlying data, e.g. the fingerprint of the frame it was built from.
+    """
+    _fingerprints.set(df, f'{name}@{version}')
+
+
+def get_fingerprint(df: pd.DataFrame) -> str:
+    """Return the registered fingerprint of the DataFrame or a hash of its content."""
+    return _fingerprints.setdefault(df, _content_fingerprint)
+
+
+def _content_fingerprint(df: pd.DataFrame) -> str:
+    """Hash the content, column names and dtypes of the DataFrame."""
+    sha256 = hashlib.sha256(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    sha256.update(repr(list(zip(df.columns, df.dtypes.astype(str)))).encode())
+    return f'content@{sha256.hexdigest()}'
+
+
+def _memoize(
+    func: Callable,
+    normalize: Callable[[Any], Any],
+    dump: Callable[[Any], Any],
+    load: Callable[[Any], Any],
+    timeout: Optional[int] = None,
+) -> Callable:
+    """Memoize the function in the application cache, keyed on DataFrame fingerprints.
+
+    Args:
+        func: The function to memoize.
+        normalize: Applied to every non-DataFrame argument before it becomes part of the key.
+        dump: Converts a result into the cached value.
+        load: Converts a cached value back into a result, a computed result is
+            returned the same way, so that hits and misses return the same type.
+        timeout: Seconds until a cached result expires, 0 never and None after CACHE_DEFAULT_TIMEOUT.
+
+    Returns:
+        The memoized function, the undecorated one is available as its attribute uncached.
+    """
+    name = f'{func.__module__}.{func.__qualname__}'
+    signature = inspect.signature(func)
+
+    with _cache_stats_lock:
+        stats = _cache_stats.setdefault(name, {'hits': 0, 'misses': 0})
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        arguments = signature.bind(*args, **kwargs)
+        arguments.apply_defaults()
+
+        fingerprints = {
+            key: get_fingerprint(value)
+            for key, value in arguments.arguments.items()
+            if isinstance(value, pd.DataFrame)
+        }
+        key_parts = [
+            f'{key}={fingerprints[key] if key in fingerprints else repr(normalize(value))}'
+            for key, value in arguments.arguments.items()
+        ]
+        key = f'{name}:{hashlib.sha256("|".join(key_parts).encode()).hexdigest()}'
+
+        if fingerprints:
+            _track_key(key, tuple(fingerprints.values()))
+
+        recorded_keys = _recorded_keys.get()
+
+        # Results with a timeout are expected to expire, only the others are recorded
+        if recorded_keys is not None and timeout == 0:
+            recorded_keys.add(key)
+
+        cached = cache.get(key)
+
+        with _cache_stats_lock:
+            stats['hits' if cached is not None else 'misses'] += 1
+
+        if cached is not None:
+            return load(cached)
+
+        cached = dump(func(*args, **kwargs))
+        cache.set(key, cached, timeout=timeout)
+        return load(cached)
+
+    wrapper.uncached = func
+    return wrapper
+
+
+def memoize(func: Callable) -> Callable:
+    """Memoize the function in the application cache, keyed on DataFrame fingerprints.
+
+    The undecorated function is available as the attribute uncached.
+    """
+    return _memoize(func, normalize=_identity, dump=_identity, load=_identity)
+
+
+def memoize_figure(func: Callable) -> Callable:
+    """Memoize a chart function, caching the figure as a JSON string.
+
+    The memoized function returns the decoded JSON of the figure on hits and
+    misses alike, a dict of plain lists and values rather than a plotly figure.
+    A hit skips building and validating the figure, Dash encodes the dict as is.
+    Falsy arguments are normalized to None, as the chart functions treat unset
+    filters and disabled flags alike. The key contains the fingerprints of the
+    DataFrame arguments, hence a new dataset version never hits an old figure.
+    Figures therefore never expire, they are deleted with their data version,
+    see invalidate_version, or evicted by the size caps of the cache.
+
+    The undecorated function is available as the attribute uncached.
+    """
+    return _memoize(func, normalize=_normalize_falsy, dump=_dump_figure, load=json.loads, timeout=0)
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+def _normalize_falsy(value: Any) -> Any:
+    return value if value else None
+
+
+def _dump_figure(figure: Any) -> str:
+    return json.dumps(figure, cls=plotly.utils.PlotlyJSONEncoder)
+
+
+def _track_key(key: str, fingerprints: tuple[str, ...]) -> None:
+    """Track the fingerprints of a cache key, forgetting the least recently used keys beyond MAX_TRACKED_KEYS.
+
+    A forgotten key is not deleted by invalidate_version. Its result is never
+    hit again once its data version is replaced, since the key contains the
+    fingerprints, and the size caps of the cache remove it eventually.
+    """
+    with _fingerprints_by_key_lock:
+        _fingerprints_by_key[key] = fingerprints
+        _fingerprints_by_key.move_to_end(key)
+
+        while len(_fingerprints_by_key) > MAX_TRACKED_KEYS:
+            _fingerprints_by_key.popitem(last=False)
+
+
+def invalidate_version(version: str) -> int:
+    """Delete the memoized results computed from a version of the data.
+
+    Only the results of the keys still tracked are deleted, see _track_key.
+
+    Args:
+        version: Fingerprint of the data, it is part of the fingerprints of every frame built from the data.
+
+    Returns:
+        The number of deleted cache entries.
+    """
+    with _fingerprints_by_key_lock:
+        keys = [
+            key for key, fingerprints in _fingerprints_by_key.items()
+            if any(version in fingerprint for fingerprint in fingerprints)
+        ]
+
+        for key in keys:
+            del _fingerprints_by_key[key]
+
+    if keys:
+        cache.delete_many(*keys)
+
+    return len(keys)
+
+
+@contextlib.contextmanager
+def record_keys() -> Iterator[set[str]]:
+    """Record the cache keys of the memoized figures computed or hit within the block, see memoize_figure.
+
+    Yields:
+        The recorded keys, filled while the block runs.
+    """
+    keys = set()
+    token = _recorded_keys.set(keys)
+
+    try:
+        yield keys
+    finally:
+        _recorded_keys.reset(token)
+
+
+def is_cached(keys: set[str]) -> bool:
+    """Return whether all given memoized results are still in the cache."""
+    return all(cache.cache.has(key) for key in keys)
+
+
+def get_cache_stats() -> dict[str, dict[str, int]]:
+    """Return the number of cache hits and misses per memoized function."""
+    with _cache_stats_lock:
+        return {name: dict(stats) for name, stats in _cache_stats.items()}
+
+
+@app.server.route('/cache-stats')
+def cache_stats() -> Any:
+    """Serve the cache hits and misses per memoized function as JSON."""
+    return jsonify(get_cache_stats())
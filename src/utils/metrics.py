@@ -0,0 +1,150 @@
+"""Latency metrics of the callbacks and charts in the Prometheus text format.
+
+Every callback records a latency histogram and the number of calls, errors and
+prevented updates, every chart function a latency histogram, cache hits
+included. The cache hits and misses of the memoized functions are exported as
+well. The metrics are kept per process, with several workers every worker
+serves its own.
+"""
+import functools
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from app import app
+from dash.exceptions import PreventUpdate
+from flask import Response
+
+from utils.memoize import get_cache_stats
+
+# Upper bounds in seconds of the latency buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+
+_callback_metrics: dict[str, dict[str, Any]] = {}
+_chart_metrics: dict[str, dict[str, Any]] = {}
+_metrics_lock = threading.Lock()
+
+
+def _new_metrics() -> dict[str, Any]:
+    return {'buckets': [0] * len(BUCKETS), 'sum': 0.0, 'count': 0, 'errors': 0, 'prevented_updates': 0}
+
+
+def _observe(metrics: dict[str, Any], seconds: float, outcome: Optional[str] = None) -> None:
+    """Record a latency and, if given, the outcome ('errors' or 'prevented_updates') of a call."""
+    bucket = next(position for position, bound in enumerate(BUCKETS) if seconds <= bound)
+
+    with _metrics_lock:
+        metrics['buckets'][bucket] += 1
+        metrics['sum'] += seconds
+        metrics['count'] += 1
+
+        if outcome is not None:
+            metrics[outcome] += 1
+
+
+def _instrument(func: Callable, metrics_by_name: dict[str, dict[str, Any]]) -> Callable:
+    with _metrics_lock:
+        metrics = metrics_by_name.setdefault(func.__name__, _new_metrics())
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+
+        try:
+            result = func(*args, **kwargs)
+        except PreventUpdate:
+            _observe(metrics, time.perf_counter() - start, 'prevented_updates')
+            raise
+        except Exception:
+            _observe(metrics, time.perf_counter() - start, 'errors')
+            raise
+
+        _observe(metrics, time.perf_counter() - start)
+        return result
+
+    return wrapper
+
+
+def instrument_callback(func: Callable) -> Callable:
+    """Record the latency, calls, errors and prevented updates of a callback.
+
+    Apply it below app.callback, so that Dash registers the instrumented function,
+    and above memoize, so that cache hits are recorded as well. Use memoize rather
+    than the memoize argument of app.callback, whose hits return before the
+    instrumented function runs and are not counted by get_cache_stats.
+    """
+    return _instrument(func, _callback_metrics)
+
+
+def instrument_chart(func: Callable) -> Callable:
+    """Record the latency of a chart function.
+
+    Apply it above memoize_figure, so that cache hits are recorded as well. The
+    undecorated function remains available as the attribute uncached.
+    """
+    return _instrument(func, _chart_metrics)
+
+
+def _format_histogram(
+    name: str,
+    description: str,
+    label: str,
+    metrics_by_name: dict[str, dict[str, Any]],
+) -> list[str]:
+    lines = [f'# HELP {name} {description}', f'# TYPE {name} histogram']
+
+    for label_value, metrics in metrics_by_name.items():
+        cumulative_count = 0
+
+        for bound, count in zip(BUCKETS, metrics['buckets']):
+            cumulative_count += count
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            lines.append(f'{name}_bucket{{{label}="{label_value}",le="{le}"}} {cumulative_count}')
+
+        lines.append(f'{name}_sum{{{label}="{label_value}"}} {metrics["sum"]}')
+        lines.append(f'{name}_count{{{label}="{label_value}"}} {metrics["count"]}')
+
+    return lines
+
+
+def _format_counter(name: str, description: str, label: str, values: dict[str, int]) -> list[str]:
+    lines = [f'# HELP {name} {description}', f'# TYPE {name} counter']
+    lines.extend(f'{name}{{{label}="{label_value}"}} {value}' for label_value, value in values.items())
+    return lines
+
+
+def render_metrics() -> str:
+    """Return all metrics in the Prometheus text exposition format."""
+    with _metrics_lock:
+        callback_metrics = {name: dict(metrics, buckets=list(metrics['buckets']))
+                            for name, metrics in _callback_metrics.items()}
+        chart_metrics = {name: dict(metrics, buckets=list(metrics['buckets']))
+                         for name, metrics in _chart_metrics.items()}
+
+    cache_stats = get_cache_stats()
+
+    lines = [
+        *_format_histogram('dashboard_callback_duration_seconds', 'Latency of the Dash callbacks.', 'callback',
+                           callback_metrics),
+        *_format_counter('dashboard_callback_calls_total', 'Calls of the Dash callbacks.', 'callback',
+                         {name: metrics['count'] for name, metrics in callback_metrics.items()}),
+        *_format_counter('dashboard_callback_errors_total', 'Calls of the Dash callbacks raising an error.',
+                         'callback', {name: metrics['errors'] for name, metrics in callback_metrics.items()}),
+        *_format_counter('dashboard_callback_prevented_updates_total', 'Calls of the Dash callbacks raising '
+                         'PreventUpdate.', 'callback',
+                         {name: metrics['prevented_updates'] for name, metrics in callback_metrics.items()}),
+        *_format_histogram('dashboard_chart_duration_seconds', 'Latency of the chart functions, cache hits included.',
+                           'chart', chart_metrics),
+        *_format_counter('dashboard_cache_hits_total', 'Cache hits of the memoized functions.', 'function',
+                         {name: stats['hits'] for name, stats in cache_stats.items()}),
+        *_format_counter('dashboard_cache_misses_total', 'Cache misses of the memoized functions.', 'function',
+                         {name: stats['misses'] for name, stats in cache_stats.items()}),
+    ]
+
+    return '\n'.join(lines) + '\n'
+
+
+@app.server.route('/metrics')
+def prometheus_metrics() -> Any:
+    """Serve all metrics in the Prometheus text exposition format."""
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,235 @@
+"""Prepared data partitioned by Year/Month.
+
+The prepared data is held as one partition per month, on disk as one Parquet
+file each, see utils.ingest_cache, and in memory as DataFrames loaded on first
+use. Queries name the periods they need, see utils.periods, and only the
+partitions of those months are loaded and concatenated.
+
+Once the loaded partitions exceed DASHBOARD_PARTITIONS_MAX_BYTES, the least
+recently used ones are evicted and loaded again from their files when a query
+needs them. Partitions without a file, e.g. those of appended order lines, are
+never evicted.
+"""
+import collections
+import logging
+import threading
+from typing import Callable, Optional
+
+import pandas as pd
+
+from utils.filter_index import FILTER_COLUMNS
+from utils.memoize import set_fingerprint
+from utils.periods import MONTH_KEY_COLUMN, Period
+
+logger = logging.getLogger(__name__)
+
+# Key of the partition of order lines without a document date
+UNDATED = 'undated'
+
+
+def split_partitions(df: pd.DataFrame) -> dict[str, pd.DataFrame]:
+    """Split prepared data into its partitions.
+
+    Args:
+        df: Prepared DataFrame.
+
+    Returns:
+        The partitions keyed on their month, e.g. '2020-06', in chronological order.
+    """
+    indices = df.groupby(MONTH_KEY_COLUMN, dropna=False, sort=True).indices
+
+    return {
+        UNDATED if pd.isna(month) else str(month): df.take(positions).reset_index(drop=True)
+        for month, positions in indices.items()
+    }
+
+
+def concat_partitions(partitions: list[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate partitions, merging the categories of their categorical columns.
+
+    Partitions of appended order lines may have more categories than the others.
+    """
+    if len(partitions) == 1:
+        return partitions[0]
+
+    categories = {}
+
+    for column, dtype in partitions[0].dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            categories[column] = dtype.categories
+
+            # Equal categories are kept as they are, the order of ordered categoricals matters
+            for partition in partitions[1:]:
+                if not partition[column].cat.categories.equals(categories[column]):
+                    categories[column] = categories[column].union(partition[column].cat.categories)
+
+    partitions = [
+        partition.assign(**{
+            column: partition[column].cat.set_categories(column_categories)
+            for column, column_categories in categories.items()
+            if not partition[column].cat.categories.equals(column_categories)
+        }) for partition in partitions
+    ]
+
+    return pd.concat(partitions, ignore_index=True)
+
+
+class PartitionedData:
+    """The prepared data as partitions by month, loaded on first use.
+
+    Args:
+        version: Version of the data, the fingerprint of the data is 'prepared@<version>'.
+        keys: Keys of all partitions.
+        load: Loads a partition from its file.
+        stored: Keys of the partitions with a file, only those are evicted.
+        partitions: Partitions already in memory.
+        max_bytes: Memory cap of the loaded partitions.
+        deltas: Content hashes of the delta files appended to the data, in the order they were appended.
+    """
+
+    def __init__(
+        self,
+        version: str,
+        keys: list[str],
+        load: Callable[[str], pd.DataFrame],
+        stored: set[str],
+        partitions: Optional[dict[str, pd.DataFrame]] = None,
+        max_bytes: int = 0,
+        deltas: tuple[str, ...] = (),
+    ) -> None:
+        self.version = version
+        self.keys = sorted(keys)
+        self.max_bytes = max_bytes
+        self.deltas = deltas
+        self._load = load
+        self._stored = stored
+        self._loaded: collections.OrderedDict[str, tuple[pd.DataFrame, int]] = collections.OrderedDict()
+        self._lock = threading.RLock()
+        self._filter_values: Optional[pd.DataFrame] = None
+
+        for key, partition in (partitions or {}).items():
+            self._loaded[key] = (partition, _memory_usage(partition))
+
+        self._evict()
+
+    @property
+    def fingerprint(self) -> str:
+        """Fingerprint of the data, part of the fingerprints of everything built from it."""
+        return f'prepared@{self.version}'
+
+    @property
+    def latest(self) -> Optional[pd.Period]:
+        """The latest month of the data or None if it has no dated order lines."""
+        months = [key for key in self.keys if key != UNDATED]
+        return pd.Period(months[-1], 'M') if months else None
+
+    @property
+    def number_of_bytes(self) -> int:
+        """Estimated bytes of the partitions in memory."""
+        with self._lock:
+            return sum(size for _, size in self._loaded.values())
+
+    def partition(self, key: str) -> pd.DataFrame:
+        """Return a partition, loading it if it is not in memory."""
+        with self._lock:
+            entry = self._loaded.get(key)
+
+            if entry is not None:
+                self._loaded.move_to_end(key)
+                return entry[0]
+
+            partition = self._load(key)
+            self._loaded[key] = (partition, _memory_usage(partition))
+            self._evict()
+
+        return partition
+
+    def _evict(self) -> None:
+        """Evict the least recently used stored partitions until the loaded ones fit into the memory cap."""
+        if not self.max_bytes:
+            return
+
+        with self._lock:
+            number_of_bytes = self.number_of_bytes
+
+            # The most recently used partition stays, it is about to be used
+            for key in list(self._loaded)[:-1]:
+                if number_of_bytes <= self.max_bytes:
+                    break
+
+                if key in self._stored:
+                    number_of_bytes -= self._loaded.pop(key)[1]
+                    logger.debug('Evicted partition %s', key)
+
+    def select(self, periods: list[Period]) -> pd.DataFrame:
+        """Return the order lines of the given periods, only their partitions are loaded.
+
+        Args:
+            periods: The periods, e.g. the current and prior period of the charts.
+
+        Returns:
+            The order lines of the months of the periods in chronological order.
+        """
+        keys = [
+            key for key in self.keys
+            if key != UNDATED and any(period.start <= pd.Period(key, 'M') <= period.end for period in periods)
+        ]
+
+        if not keys:
+            return self.partition(self.keys[0]).iloc[:0] if self.keys else pd.DataFrame()
+
+        return concat_partitions([self.partition(key) for key in keys])
+
+    def filter_values(self) -> pd.DataFrame:
+        """Return the distinct combinations of the filter columns of all order lines.
+
+        The partitions are read one after the other, so the memory cap holds.
+        The result is fingerprinted, memoized filters of it are keyed on the data.
+        """
+        if self._filter_values is None:
+            with self._lock:
+                if self._filter_values is None:
+                    df = concat_partitions([
+                        self.partition(key)[list(FILTER_COLUMNS)].drop_duplicates() for key in self.keys
+                    ]).drop_duplicates().reset_index(drop=True)
+
+                    set_fingerprint(df, 'filter_values', self.fingerprint)
+                    self._filter_values = df
+
+        return self._filter_values
+
+    def with_partitions(
+        self,
+        version: str,
+        partitions: dict[str, pd.DataFrame],
+        delta_hash: str,
+    ) -> 'PartitionedData':
+        """Return data of another version in which the given partitions are replaced or added.
+
+        The other partitions are shared with this data, the given ones are kept in memory.
+
+        Args:
+            version: Version of the new data.
+            partitions: The changed partitions keyed on their month.
+            delta_hash: Content hash of the delta file the changed partitions were appended from.
+
+        Returns:
+            The new data, this one is left unchanged.
+        """
+        with self._lock:
+            loaded = {key: partition for key, (partition, _) in self._loaded.items()}
+
+        return PartitionedData(
+            version,
+            list(set(self.keys) | set(partitions)),
+            self._load,
+            self._stored - set(partitions),
+            {**loaded, **partitions},
+            self.max_bytes,
+            (*self.deltas, delta_hash),
+        )
+
+
+def _memory_usage(df: pd.DataFrame) -> int:
+    """Estimate the bytes held by a partition, including the strings of its object columns."""
+    return int(df.memory_usage(index=True, deep=True).sum())
@@ -0,0 +1,204 @@
+"""Current and prior period compared by the charts.
+
+The current period is the calendar year, quarter or month containing
+DASHBOARD_PERIOD_END, or the rolling window of DASHBOARD_PERIOD_MONTHS months
+ending with it. Without DASHBOARD_PERIOD_END it contains the latest month of
+the data. The prior period is the same period one year earlier, so both cover
+the same calendar months and the charts by month compare like with like.
+
+The pre-aggregates keep the rows of the compared periods only. The column
+Period holds the label of the period of a row, an ordered categorical of the
+prior and the current label, and the column Month is ordered like the months
+of the periods, so sorting a pre-aggregate sorts it chronologically.
+
+A month index sorts the month keys of a DataFrame once. Selecting the rows of
+a period is then a slice of the sorted positions instead of a comparison of
+the full date column.
+"""
+from typing import Any, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.frame_registry import FrameRegistry
+from utils.settings import DASHBOARD_PERIOD, DASHBOARD_PERIOD_END, DASHBOARD_PERIOD_MONTHS
+
+PERIOD_COLUMN = 'Period'
+MONTH_KEY_COLUMN = 'Year/Month'
+
+# Month keys of missing dates
+_NAT = np.iinfo(np.int64).min
+
+_month_indices = FrameRegistry()
+
+if not 1 <= DASHBOARD_PERIOD_MONTHS <= 12:
+    raise ValueError(f'DASHBOARD_PERIOD_MONTHS must be between 1 and 12, got {DASHBOARD_PERIOD_MONTHS}')
+
+_period_end = pd.Period(DASHBOARD_PERIOD_END, 'M') if DASHBOARD_PERIOD_END else None
+
+
+class Period:
+    """A range of consecutive months.
+
+    Args:
+        start, end: First and last month.
+        label: Name of the period in the charts.
+    """
+
+    def __init__(self, start: pd.Period, end: pd.Period, label: str) -> None:
+        self.start = start
+        self.end = end
+        self.label = label
+
+    @property
+    def months(self) -> list[int]:
+        """Calendar months of the period in chronological order."""
+        return [(self.start + offset).month for offset in range(self.end.ordinal - self.start.ordinal + 1)]
+
+
+class Comparison:
+    """The current period of the charts and the same period one year earlier.
+
+    Args:
+        granularity: 'year', 'quarter', 'month' or 'rolling'.
+        month: A month of the current period, the last one of a rolling window.
+        number_of_months: Length of a rolling window.
+    """
+
+    def __init__(self, granularity: str, month: pd.Period, number_of_months: int = 12) -> None:
+        if granularity == 'year':
+            start, end = month - (month.month - 1), month + (12 - month.month)
+        elif granularity == 'quarter':
+            start = month - (month.month - 1) % 3
+            end = start + 2
+        elif granularity == 'month':
+            start, end = month, month
+        elif granularity == 'rolling':
+            start, end = month - (number_of_months - 1), month
+        else:
+            raise ValueError(f'Unknown period granularity {granularity!r}')
+
+        self.granularity = granularity
+        self.current = Period(start, end, _label(granularity, start, end))
+        self.prior = Period(start - 12, end - 12, _label(granularity, start - 12, end - 12))
+
+    @property
+    def key(self) -> str:
+        """Identifies the compared periods, e.g. in fingerprints."""
+        return f'{self.granularity}-{self.current.start}-{self.current.end}'
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, Comparison) and self.key == other.key
+
+    def __hash__(self) -> int:
+        return hash(self.key)
+
+    def __repr__(self) -> str:
+        return f'Comparison({self.current.label!r} vs. {self.prior.label!r})'
+
+
+def _label(granularity: str, start: pd.Period, end: pd.Period) -> str:
+    """Return the name of a period in the charts, e.g. '2020', 'Q2 2020', 'Jun 2020' or 'Jul 2019 - Jun 2020'."""
+    if granularity == 'year':
+        return str(start.year)
+
+    if granularity == 'quarter':
+        return f'Q{start.quarter} {start.year}'
+
+    if start == end:
+        return start.strftime('%b %Y')
+
+    return f'{start.strftime("%b %Y")} - {end.strftime("%b %Y")}'
+
+
+class MonthIndex:
+    """Row positions of a DataFrame sorted by month.
+
+    Args:
+        df: DataFrame containing the column Year/Month.
+    """
+
+    def __init__(self, df: pd.DataFrame) -> None:
+        keys = df[MONTH_KEY_COLUMN].array.asi8
+        self.order = np.argsort(keys, kind='stable')
+        self.keys = keys[self.order]
+
+        valid_keys = self.keys[self.keys != _NAT]
+        self.latest: Optional[pd.Period] = pd.Period(ordinal=valid_keys[-1], freq='M') if len(valid_keys) else None
+
+    def positions(self, period: Period) -> np.ndarray:
+        """Return the sorted positions of the rows within the period."""
+        start = np.searchsorted(self.keys, period.start.ordinal, side='left')
+        end = np.searchsorted(self.keys, period.end.ordinal, side='right')
+
+        return np.sort(self.order[start:end])
+
+
+def get_month_index(df: pd.DataFrame) -> MonthIndex:
+    """Return the month index of the DataFrame, building it on first use.
+
+    The index is kept for as long as the DataFrame itself is alive.
+    """
+    return _month_indices.setdefault(df, MonthIndex)
+
+
+def get_comparison(latest: Optional[pd.Period]) -> Comparison:
+    """Return the periods compared by the charts, see the settings DASHBOARD_PERIOD*.
+
+    Args:
+        latest: The latest month of the prepared data, None if it has no dated order lines.
+    """
+    month = _period_end or latest or pd.Period.now('M')
+    return Comparison(DASHBOARD_PERIOD, month, DASHBOARD_PERIOD_MONTHS)
+
+
+def _order_months(df: pd.DataFrame, comparison: Comparison) -> pd.DataFrame:
+    """Order the column Month like the months of the compared periods."""
+    return df.assign(Month=pd.Categorical(df['Month'], categories=comparison.current.months, ordered=True))
+
+
+def select_current_period(df: pd.DataFrame, comparison: Comparison) -> pd.DataFrame:
+    """Select the rows of the current period.
+
+    Args:
+        df: Prepared DataFrame or a part of it.
+        comparison: The compared periods.
+
+    Returns:
+        The selected rows.
+    """
+    return _order_months(df.take(get_month_index(df).positions(comparison.current)), comparison)
+
+
+def select_periods(df: pd.DataFrame, comparison: Comparison) -> pd.DataFrame:
+    """Select the rows of the prior and the current period and label them in the column Period.
+
+    Args:
+        df: Prepared DataFrame or a part of it.
+        comparison: The compared periods.
+
+    Returns:
+        The selected rows, those of the prior period first.
+    """
+    month_index = get_month_index(df)
+    prior_positions = month_index.positions(comparison.prior)
+    current_positions = month_index.positions(comparison.current)
+
+    df_periods = df.take(np.concatenate([prior_positions, current_positions]))
+    codes = np.repeat(np.array([0, 1], dtype=np.int8), [len(prior_positions), len(current_positions)])
+
+    df_periods = df_periods.assign(**{
+        PERIOD_COLUMN: pd.Categorical.from_codes(
+            codes,
+            categories=[comparison.prior.label, comparison.current.label],
+            ordered=True,
+        ),
+    })
+
+    return _order_months(df_periods, comparison)
+
+
+def period_labels(df: pd.DataFrame) -> tuple[str, str]:
+    """Return the labels of the current and the prior period of a pre-aggregate built by select_periods."""
+    prior, current = df[PERIOD_COLUMN].cat.categories
+    return current, prior
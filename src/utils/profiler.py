@@ -0,0 +1,124 @@
+"""Opt-in profiling of single callback requests.
+
+With DASHBOARD_PROFILER_ENABLED set, a callback request sending the header
+X-Dashboard-Profile or the cookie dashboard_profile with a true value is run
+under cProfile. Every other request is left alone. The profile covers the
+whole dispatch, i.e. the callback and the serialization of its outputs, and is
+written in the pstats format to DASHBOARD_PROFILER_DIR, named after the time,
+the callback and its inputs, e.g. for snakeviz or python -m pstats.
+
+The directory keeps at most DASHBOARD_PROFILER_MAX_FILES profiles of at most
+DASHBOARD_PROFILER_MAX_BYTES in total, the oldest are removed first.
+"""
+import contextlib
+import cProfile
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from typing import Any, Optional
+
+import flask
+from app import app
+
+from utils.settings import (DASHBOARD_PROFILER_DIR, DASHBOARD_PROFILER_ENABLED, DASHBOARD_PROFILER_MAX_BYTES,
+                            DASHBOARD_PROFILER_MAX_FILES)
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Dashboard-Profile'
+PROFILE_COOKIE = 'dashboard_profile'
+
+DISPATCH_PATH = '/_dash-update-component'
+
+# Length of the part of the file name describing the inputs
+MAX_INPUTS_LENGTH = 80
+
+
+def _is_requested(request: flask.Request) -> bool:
+    """Return whether the request asks to be profiled."""
+    value = request.headers.get(PROFILE_HEADER) or request.cookies.get(PROFILE_COOKIE) or ''
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def _callback_name(output: str) -> str:
+    """Return the name of the callback function of the output or the output itself if it is not registered."""
+    callback = app.callback_map.get(output, {}).get('callback')
+    return getattr(callback, '__name__', None) or output
+
+
+def profile_name(body: dict[str, Any]) -> str:
+    """Return the file name of the profile of a callback request.
+
+    The inputs are shortened to keep the file name valid, a hash of all of them
+    keeps the names of different inputs apart.
+
+    Args:
+        body: JSON body of the callback request.
+
+    Returns:
+        The file name, e.g. '20210901-120000-123-update_store-company-code=52_plant=None-1a2b3c4d.prof'.
+    """
+    inputs = [item for item in body.get('inputs', []) if isinstance(item, dict)]
+    inputs_text = '_'.join(f'{item.get("id")}={item.get("value")}' for item in inputs)
+    inputs_hash = hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()[:8]
+
+    timestamp = time.strftime('%Y%m%d-%H%M%S') + f'-{int(time.time() * 1000) % 1000:03d}'
+    name = f'{_callback_name(str(body.get("output", "")))}-{inputs_text[:MAX_INPUTS_LENGTH]}'
+
+    return f'{timestamp}-{re.sub(r"[^A-Za-z0-9=._-]+", "_", name)}-{inputs_hash}.prof'
+
+
+def _enforce_caps(directory: str, max_files: int, max_bytes: int) -> None:
+    """Remove the oldest profiles until the directory is within the caps."""
+    paths = sorted(glob.glob(os.path.join(directory, '*.prof')), key=os.path.getmtime)
+    sizes = [os.path.getsize(path) for path in paths]
+
+    while paths and (len(paths) > max_files or sum(sizes) > max_bytes):
+        with contextlib.suppress(OSError):
+            os.remove(paths[0])
+
+        del paths[0], sizes[0]
+
+
+def _start_profile() -> None:
+    request = flask.request
+
+    if request.path != DISPATCH_PATH or not _is_requested(request):
+        return
+
+    profiler = cProfile.Profile()
+
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiler is active in this thread
+        return
+
+    flask.g.profiler = profiler
+
+
+def _stop_profile(exception: Optional[BaseException]) -> None:
+    profiler = flask.g.pop('profiler', None)
+
+    if profiler is None:
+        return
+
+    profiler.disable()
+
+    try:
+        os.makedirs(DASHBOARD_PROFILER_DIR, exist_ok=True)
+        path = os.path.join(DASHBOARD_PROFILER_DIR, profile_name(flask.request.get_json(silent=True) or {}))
+        profiler.dump_stats(path)
+        _enforce_caps(DASHBOARD_PROFILER_DIR, DASHBOARD_PROFILER_MAX_FILES, DASHBOARD_PROFILER_MAX_BYTES)
+        logger.info('Wrote profile %s', path)
+    except OSError:
+        logger.exception('Writing the profile failed')
+
+
+if DASHBOARD_PROFILER_ENABLED:
+    app.server.before_request(_start_profile)
+    app.server.teardown_request(_stop_profile)
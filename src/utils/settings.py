@@ -0,0 +1,125 @@
+"""Runtime settings of the dashboard.
+
+Every setting can be overridden through an environment variable of the same name.
+"""
+import json
+import os
+from typing import Any
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    """Read a boolean flag from the environment."""
+    value = os.environ.get(name)
+
+    if value is None:
+        return default
+
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer from the environment."""
+    value = os.environ.get(name)
+
+    if value is None:
+        return default
+
+    return int(value)
+
+
+def _env_choice(name: str, default: str, choices: tuple[str, ...]) -> str:
+    """Read one of several choices from the environment."""
+    value = os.environ.get(name, default).strip().lower()
+
+    if value not in choices:
+        raise ValueError(f'{name} must be one of {", ".join(choices)}, got {value!r}')
+
+    return value
+
+
+def _env_json(name: str, default: Any) -> Any:
+    """Read a JSON document from the environment."""
+    value = os.environ.get(name)
+
+    if value is None:
+        return default
+
+    return json.loads(value)
+
+
+# Source data of the dashboard, an Excel, CSV or Parquet file in the schema of the bundled Excel-File
+DASHBOARD_DATA_PATH = os.environ.get(
+    'DASHBOARD_DATA_PATH',
+    os.path.join(os.path.dirname(__file__), '../../data/Daten I.xlsx'),
+)
+
+# When to build the pre-aggregates: on first use, in a background thread after the startup or before serving
+DASHBOARD_PRE_AGGREGATES_BUILD = _env_choice(
+    'DASHBOARD_PRE_AGGREGATES_BUILD',
+    'lazy',
+    ('lazy', 'background', 'startup'),
+)
+
+# Share the prepared data and the pre-aggregates between worker processes through memory-mapped files
+DASHBOARD_SHARED_DATA_ENABLED = _env_flag('DASHBOARD_SHARED_DATA_ENABLED', False)
+
+# Memory cap of the month partitions of the prepared data, the least recently used ones are evicted, 0 disables it
+DASHBOARD_PARTITIONS_MAX_BYTES = _env_int('DASHBOARD_PARTITIONS_MAX_BYTES', 0)
+
+# Materialize the aggregated chart data of every filter combination after the startup
+DASHBOARD_CUBE_ENABLED = _env_flag('DASHBOARD_CUBE_ENABLED', False)
+
+# Memory cap of all materialized cubes, combinations beyond it are computed on the fly
+DASHBOARD_CUBE_MAX_BYTES = _env_int('DASHBOARD_CUBE_MAX_BYTES', 256 * 1024 * 1024)
+
+# In-process tier of the application cache, bounded by entry count and estimated bytes
+DASHBOARD_CACHE_MEMORY_MAX_ENTRIES = _env_int('DASHBOARD_CACHE_MEMORY_MAX_ENTRIES', 256)
+DASHBOARD_CACHE_MEMORY_MAX_BYTES = _env_int('DASHBOARD_CACHE_MEMORY_MAX_BYTES', 64 * 1024 * 1024)
+
+# Quota of the file system tier and seconds between its garbage collections
+DASHBOARD_CACHE_DISK_MAX_BYTES = _env_int('DASHBOARD_CACHE_DISK_MAX_BYTES', 1024 * 1024 * 1024)
+DASHBOARD_CACHE_GC_INTERVAL = _env_int('DASHBOARD_CACHE_GC_INTERVAL', 60)
+
+# Precompute the figures of the default view and the popular filter combinations at startup. Off by default, it
+# builds every pre-aggregate the figures need, which the lazy DASHBOARD_PRE_AGGREGATES_BUILD defers to first use
+DASHBOARD_WARM_UP_ENABLED = _env_flag('DASHBOARD_WARM_UP_ENABLED', False)
+DASHBOARD_WARM_UP_BACKGROUND = _env_flag('DASHBOARD_WARM_UP_BACKGROUND', True)
+
+# Popular filter combinations, e.g. [{"company_code": 52}, {"purchasing_org": 5200, "plant": 51}]
+DASHBOARD_WARM_UP_FILTERS = _env_json('DASHBOARD_WARM_UP_FILTERS', [])
+
+# Current period of the charts, a calendar year, quarter or month or a rolling window of DASHBOARD_PERIOD_MONTHS
+# months, compared with the same period one year earlier
+DASHBOARD_PERIOD = _env_choice('DASHBOARD_PERIOD', 'year', ('year', 'quarter', 'month', 'rolling'))
+DASHBOARD_PERIOD_MONTHS = _env_int('DASHBOARD_PERIOD_MONTHS', 12)
+
+# A month of the current period, e.g. 2020-06, the latest month of the data if empty
+DASHBOARD_PERIOD_END = os.environ.get('DASHBOARD_PERIOD_END', '').strip()
+
+# Directory of delta files of new order lines, appended in the order of their names, empty disables it.
+# The files stay in the directory, they are appended again at every startup and reload.
+DASHBOARD_DELTA_DIR = os.environ.get('DASHBOARD_DELTA_DIR', '').strip()
+
+# Seconds between two checks of the delta directory for new files
+DASHBOARD_DELTA_INTERVAL = _env_int('DASHBOARD_DELTA_INTERVAL', 10)
+
+# Render the charts in background jobs the browser polls, instead of within the request, see utils.jobs
+DASHBOARD_BACKGROUND_CALLBACKS_ENABLED = _env_flag('DASHBOARD_BACKGROUND_CALLBACKS_ENABLED', False)
+
+# Worker threads of the background jobs and milliseconds between two polls of the browser
+DASHBOARD_BACKGROUND_WORKERS = _env_int('DASHBOARD_BACKGROUND_WORKERS', 2)
+DASHBOARD_BACKGROUND_POLL_INTERVAL = _env_int('DASHBOARD_BACKGROUND_POLL_INTERVAL', 500)
+
+# Seconds between two checks of the Excel-File for changes, 0 disables the reload on change
+DASHBOARD_RELOAD_INTERVAL = _env_int('DASHBOARD_RELOAD_INTERVAL', 0)
+
+# Profile the callbacks of requests sending the header X-Dashboard-Profile or the cookie dashboard_profile
+DASHBOARD_PROFILER_ENABLED = _env_flag('DASHBOARD_PROFILER_ENABLED', False)
+DASHBOARD_PROFILER_DIR = os.environ.get(
+    'DASHBOARD_PROFILER_DIR',
+    os.path.join(os.path.dirname(__file__), '../../data/.cache/profiles'),
+)
+
+# Caps of the kept profiles, the oldest are removed first
+DASHBOARD_PROFILER_MAX_FILES = _env_int('DASHBOARD_PROFILER_MAX_FILES', 50)
+DASHBOARD_PROFILER_MAX_BYTES = _env_int('DASHBOARD_PROFILER_MAX_BYTES', 100 * 1024 * 1024)
@@ -0,0 +1,99 @@
+"""Prepared data and pre-aggregates shared between worker processes.
+
+Every frame is written once to an uncompressed Arrow IPC file and memory-mapped
+read-only by all workers. Numeric, date and categorical columns are views of the
+mapping, so the operating system keeps a single copy of them in its page cache
+however many workers map the file, and a worker starts without parsing or
+aggregating anything. Only string columns are materialized per worker.
+
+The file names contain a hash of the fingerprint of the frame, hence a worker
+never maps a frame of another data version.
+"""
+import contextlib
+import glob
+import hashlib
+import os
+from typing import Optional
+
+import pandas as pd
+import pyarrow as pa
+
+SHARED_DIR = os.path.join(os.path.dirname(__file__), '../../data/.cache/shared')
+
+
+def _shared_path(name: str, version: str) -> str:
+    """Return the path of the shared file of a frame."""
+    version_hash = hashlib.sha256(version.encode()).hexdigest()
+    return os.path.join(SHARED_DIR, f'{name}-{version_hash}.arrow')
+
+
+def map_frame(name: str, version: str) -> Optional[pd.DataFrame]:
+    """Map a shared frame.
+
+    The columns of the frame are read-only, callers must not modify them in place.
+
+    Args:
+        name: Name of the frame, e.g. 'prepared' or 'os_by_month'.
+        version: Fingerprint of the data the frame was built from.
+
+    Returns:
+        The frame or None if no worker shared it yet.
+    """
+    path = _shared_path(name, version)
+
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with pa.memory_map(path, 'r') as source:
+            table = pa.ipc.open_file(source).read_all()
+
+        # Every column in a block of its own, otherwise pandas copies to consolidate them
+        return table.to_pandas(split_blocks=True)
+    except (OSError, TypeError, ValueError):
+        return None
+
+
+def share_frame(df: pd.DataFrame, name: str, version: str) -> None:
+    """Write a frame for the other workers to map.
+
+    The file is written under a temporary name and renamed afterwards, so that
+    no worker maps a partial file.
+
+    Args:
+        df: The frame.
+        name: Name of the frame, e.g. 'prepared' or 'os_by_month'.
+        version: Fingerprint of the data the frame was built from.
+    """
+    path = _shared_path(name, version)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        os.makedirs(SHARED_DIR, exist_ok=True)
+
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+        os.replace(tmp_path, path)
+    except (OSError, TypeError, ValueError):
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+
+
+def remove_outdated_frames(*versions: str) -> None:
+    """Remove the shared frames of all data versions but the given ones.
+
+    Workers still mapping a removed file keep their mapping until they unmap it.
+
+    Args:
+        versions: Fingerprints of the data whose frames are kept, e.g. those of
+            the prepared data and of the data with the delta files appended.
+    """
+    suffixes = tuple(f'-{hashlib.sha256(version.encode()).hexdigest()}.arrow' for version in versions)
+
+    for path in glob.glob(os.path.join(SHARED_DIR, '*.arrow')):
+        if not path.endswith(suffixes):
+            with contextlib.suppress(OSError):
+                os.remove(path)
@@ -0,0 +1,258 @@
+"""Two-tier cache backend: a bounded in-process LRU in front of the file system.
+
+Every value is written through to the file system, so it is shared between
+worker processes and survives restarts. Reads are served from the in-process
+tier first; values found only on disk are promoted into it. The in-process tier
+evicts its least recently used entries once it exceeds either its entry count
+or its estimated size in bytes.
+
+A background thread removes expired files from the cache directory and, once
+the directory exceeds its quota, the least recently used files.
+
+Configure it in Flask-Caching with CACHE_TYPE 'utils.tiered_cache.TieredCache'.
+"""
+import logging
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+import pandas as pd
+from flask_caching.backends.filesystemcache import FileSystemCache
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_size(value: Any) -> int:
+    """Estimate the bytes held by a cached value."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(pd.Series(value.memory_usage(index=True, deep=True)).sum())
+
+    if isinstance(value, (bytes, str)):
+        return len(value)
+
+    try:
+        return len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+    except (pickle.PicklingError, TypeError, AttributeError):
+        return 0
+
+
+class TieredCache(FileSystemCache):
+    """File system cache with a bounded in-process LRU tier.
+
+    Values served from the in-process tier are shared, callers must not mutate them.
+
+    Args:
+        cache_dir: Directory of the file system tier.
+        memory_max_entries: Maximum number of entries of the in-process tier.
+        memory_max_bytes: Maximum estimated bytes of the in-process tier.
+        disk_max_bytes: Quota of the cache directory, 0 disables the quota.
+        gc_interval: Seconds between two garbage collections of the cache directory, 0 disables them.
+        **kwargs: Passed on to FileSystemCache.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        memory_max_entries: int = 256,
+        memory_max_bytes: int = 64 * 1024 * 1024,
+        disk_max_bytes: int = 1024 * 1024 * 1024,
+        gc_interval: int = 60,
+        **kwargs: Any,
+    ) -> None:
+        self.memory_max_entries = memory_max_entries
+        self.memory_max_bytes = memory_max_bytes
+        self.disk_max_bytes = disk_max_bytes
+
+        self._memory: OrderedDict[str, tuple[float, Any, int]] = OrderedDict()
+        self._memory_bytes = 0
+        self._memory_lock = threading.Lock()
+
+        super().__init__(cache_dir, **kwargs)
+
+        if gc_interval > 0:
+            thread = threading.Thread(target=self._run_gc, args=(gc_interval,), name='cache-gc', daemon=True)
+            thread.start()
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        kwargs.update(
+            dict(
+                memory_max_entries=config.get('CACHE_MEMORY_MAX_ENTRIES', 256),
+                memory_max_bytes=config.get('CACHE_MEMORY_MAX_BYTES', 64 * 1024 * 1024),
+                disk_max_bytes=config.get('CACHE_DISK_MAX_BYTES', 1024 * 1024 * 1024),
+                gc_interval=config.get('CACHE_GC_INTERVAL', 60),
+            ))
+        return super().factory(app, config, args, kwargs)
+
+    # In-process tier
+
+    def _memory_get(self, key: str) -> Optional[Any]:
+        with self._memory_lock:
+            entry = self._memory.get(key)
+
+            if entry is None:
+                return None
+
+            expires, value, size = entry
+
+            if expires != 0 and expires < time.time():
+                self._memory_pop(key)
+                return None
+
+            self._memory.move_to_end(key)
+            return value
+
+    def _memory_set(self, key: str, value: Any, expires: float) -> None:
+        size = estimate_size(value)
+
+        with self._memory_lock:
+            self._memory_pop(key)
+
+            if size > self.memory_max_bytes:
+                return
+
+            self._memory[key] = (expires, value, size)
+            self._memory_bytes += size
+
+            while len(self._memory) > self.memory_max_entries or self._memory_bytes > self.memory_max_bytes:
+                self._memory_pop(next(iter(self._memory)))
+
+    def _memory_pop(self, key: str) -> None:
+        """Remove an entry of the in-process tier, the caller holds the lock."""
+        entry = self._memory.pop(key, None)
+
+        if entry is not None:
+            self._memory_bytes -= entry[2]
+
+    def memory_stats(self) -> dict[str, int]:
+        """Return the number of entries and estimated bytes of the in-process tier."""
+        with self._memory_lock:
+            return {'entries': len(self._memory), 'bytes': self._memory_bytes}
+
+    # Cache interface
+
+    def get(self, key: str) -> Optional[Any]:
+        # The file counter of the file system tier changes underneath, never keep it in memory
+        if key == self._fs_count_file:
+            return super().get(key)
+
+        value = self._memory_get(key)
+
+        if value is not None:
+            return value
+
+        filename = self._get_filename(key)
+
+        try:
+            with open(filename, 'rb') as file:
+                expires = pickle.load(file)
+
+                if expires != 0 and expires < time.time():
+                    value = None
+                else:
+                    value = pickle.load(file)
+        except FileNotFoundError:
+            return None
+        except (OSError, pickle.PickleError, EOFError) as exc:
+            logger.error('get key %r -> %s', key, exc)
+            return None
+
+        if value is None:
+            self.delete(key)
+            return None
+
+        # Refresh the modification time, the garbage collection evicts the least recently used files
+        try:
+            os.utime(filename)
+        except OSError:
+            pass
+
+        self._memory_set(key, value, expires)
+        return value
+
+    def set(self, key: str, value: Any, timeout: Optional[int] = None, mgmt_element: bool = False) -> bool:
+        result = super().set(key, value, timeout, mgmt_element)
+
+        if not mgmt_element:
+            self._memory_set(key, value, self._normalize_timeout(timeout))
+
+        return result
+
+    def delete(self, key: str, mgmt_element: bool = False) -> bool:
+        with self._memory_lock:
+            self._memory_pop(key)
+
+        return super().delete(key, mgmt_element)
+
+    def has(self, key: str) -> bool:
+        return self._memory_get(key) is not None or super().has(key)
+
+    def clear(self) -> bool:
+        with self._memory_lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+
+        return super().clear()
+
+    # Garbage collection of the file system tier
+
+    def _run_gc(self, interval: int) -> None:
+        while True:
+            time.sleep(interval)
+
+            try:
+                self.collect_garbage()
+            except Exception:
+                logger.exception('Garbage collection of %s failed', self._path)
+
+    def collect_garbage(self) -> int:
+        """Remove expired files and, above the quota, the least recently used files.
+
+        Returns:
+            The number of removed files.
+        """
+        now = time.time()
+        files = []
+        removed = 0
+
+        for filename in self._list_dir():
+            try:
+                stat = os.stat(filename)
+
+                with open(filename, 'rb') as file:
+                    expires = pickle.load(file)
+            except (OSError, pickle.PickleError, EOFError):
+                continue
+
+            if expires != 0 and expires < now:
+                removed += self._remove_file(filename)
+            else:
+                files.append((stat.st_mtime, stat.st_size, filename))
+
+        total_size = sum(size for _, size, _ in files)
+
+        if self.disk_max_bytes:
+            for _, size, filename in sorted(files):
+                if total_size <= self.disk_max_bytes:
+                    break
+
+                removed += self._remove_file(filename)
+                total_size -= size
+
+        if removed:
+            self._update_count(value=len(self._list_dir()))
+            logger.debug('Garbage collection removed %d file(s) from %s', removed, self._path)
+
+        return removed
+
+    @staticmethod
+    def _remove_file(filename: str) -> int:
+        try:
+            os.remove(filename)
+        except OSError:
+            return 0
+
+        return 1
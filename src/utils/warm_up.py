@@ -0,0 +1,123 @@
+"""Warm-up of the figure cache for the most common dashboard views.
+
+After a deploy the cache is cold and the first users would pay for building
+every chart. The warm-up renders the views, i.e. the charts of a page in one
+style, without filters and with the configured popular filter combinations for
+both metrics. The figures land in the application cache, hence the callbacks
+serve them as cache hits. The readiness flag reports when the warm-up is complete
+and all warmed figures are still cached.
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from app import app
+from flask import jsonify
+
+from utils.memoize import is_cached, record_keys
+
+logger = logging.getLogger(__name__)
+
+NO_FILTERS = {'company_code': None, 'purchasing_org': None, 'plant': None, 'material_group': None}
+
+_ready = threading.Event()
+
+# Cache keys of the figures rendered by the last warm-up
+_warmed_keys: set[str] = set()
+
+# Number of the latest warm-up, only it sets the readiness flag
+_generation = 0
+_generation_lock = threading.Lock()
+
+
+def is_ready() -> bool:
+    """Return whether the warm-up is complete and the figures it rendered are still cached."""
+    return _ready.is_set() and is_cached(_warmed_keys)
+
+
+def warm_up(views: list[Callable], filter_combinations: list[dict[str, Any]], generation: Optional[int] = None) -> None:
+    """Render the views without filters and with the popular filter combinations for both metrics.
+
+    Args:
+        views: Render the memoized charts of a view, given the metric flag number_of_orders and the filters.
+        filter_combinations: Popular filters, missing filters are unset. Values must have the type
+            the dropdowns send, i.e. integers apart from the material group, which is a string.
+        generation: Number of the warm-up, see start_warm_up. A warm-up superseded by a later one
+            finishes without setting the readiness flag.
+    """
+    global _warmed_keys
+
+    start = time.perf_counter()
+    number_of_views = 0
+
+    with record_keys() as keys:
+        for filters in [NO_FILTERS, *filter_combinations]:
+            filters = {**NO_FILTERS, **filters}
+
+            for number_of_orders in (False, True):
+                for view in views:
+                    try:
+                        view(number_of_orders=number_of_orders, **filters)
+                    except Exception:
+                        logger.exception('Warm-up of %r with %s failed', view, filters)
+                    else:
+                        number_of_views += 1
+
+    with _generation_lock:
+        if generation is None or generation == _generation:
+            _warmed_keys = keys
+            _ready.set()
+    logger.info('Warm-up rendered %d view(s) in %.1fs', number_of_views, time.perf_counter() - start)
+
+
+def start_warm_up(
+    views: list[Callable],
+    filter_combinations: list[dict[str, Any]],
+    enabled: bool = True,
+    background: bool = True,
+) -> None:
+    """Run the warm-up, see warm_up.
+
+    The dashboard is not ready until the warm-up is complete, e.g. after the
+    data was reloaded and the figures of the new version are still missing.
+
+    Args:
+        views, filter_combinations: See warm_up.
+        enabled: Whether to warm up at all, if not the dashboard is ready right away.
+        background: Whether to warm up in a daemon thread instead of blocking the startup.
+    """
+    for filters in filter_combinations:
+        unknown_filters = set(filters) - set(NO_FILTERS)
+
+        if unknown_filters:
+            raise ValueError(f'Unknown warm-up filter(s): {", ".join(sorted(unknown_filters))}')
+
+    global _generation
+
+    with _generation_lock:
+        _generation += 1
+        generation = _generation
+
+        if enabled:
+            _ready.clear()
+
+    if not enabled:
+        _ready.set()
+    elif background:
+        thread = threading.Thread(
+            target=warm_up,
+            args=(views, filter_combinations, generation),
+            name='warm-up',
+            daemon=True,
+        )
+        thread.start()
+    else:
+        warm_up(views, filter_combinations, generation)
+
+
+@app.server.route('/ready')
+def ready() -> Any:
+    """Report whether the warm-up is complete and its figures are cached, with status 503 otherwise."""
+    ready = is_ready()
+    return jsonify({'ready': ready}), 200 if ready else 503
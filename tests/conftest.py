@@ -0,0 +1,5 @@
+"""Test setup, the application modules are imported from src like when running the dashboard."""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../src'))
@@ -0,0 +1,83 @@
+"""Tests of the materialized chart data over all filter combinations."""
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.cube import aggregate_measures, filter_and_aggregate, get_cube, materialize_cubes, pre_aggregate
+from utils.data_prep import copy_and_apply_filter
+from utils.document_sets import DOCUMENT_COLUMN
+from utils.filter_index import FILTER_COLUMNS
+
+# A value of every filter column and one that does not occur
+FILTER_VALUES = {
+    'Company Code': [51, 99],
+    'Purchasing Org.': [5100, 9999],
+    'Plant': [5200, 9999],
+    'Material Group': ['4017', 'XXXX'],
+}
+
+GROUPINGS = [[], ['Plant'], ['Material Group', 'Company Code']]
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(0)
+    number_of_rows = 3000
+
+    df = pd.DataFrame({
+        'Company Code': rng.choice([51, 52], number_of_rows),
+        'Purchasing Org.': rng.choice([5100, 5200], number_of_rows),
+        'Plant': rng.choice([5100, 5200, 5300], number_of_rows),
+        'Material Group': pd.Categorical(rng.choice(['4017', 'C14A'], number_of_rows)),
+        DOCUMENT_COLUMN: rng.integers(4500000000, 4500000300, number_of_rows),
+        'Net Value': rng.random(number_of_rows) * 1000,
+    })
+
+    return pre_aggregate(df, list(FILTER_COLUMNS))
+
+
+def _filter_combinations():
+    return itertools.product(*[[None, *values] for values in FILTER_VALUES.values()])
+
+
+def _on_the_fly(df: pd.DataFrame, by: list[str], filters: tuple) -> pd.DataFrame:
+    return aggregate_measures(copy_and_apply_filter(df, *filters), by)
+
+
+def _assert_equal(result, expected):
+    if isinstance(expected, pd.Series):
+        pd.testing.assert_series_equal(result, expected, check_names=False)
+    else:
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_categorical=False)
+
+
+@pytest.mark.parametrize('max_bytes', [2**30, 3000])
+def test_cube_matches_on_the_fly(df, max_bytes):
+    cubes = materialize_cubes([(df, by) for by in GROUPINGS], max_bytes)
+
+    assert sum(cube.number_of_bytes for cube in cubes) <= max_bytes
+
+    for by in GROUPINGS:
+        for filters in _filter_combinations():
+            _assert_equal(filter_and_aggregate(df, by, *filters), _on_the_fly(df, by, filters))
+
+
+def test_cube_under_the_cap_keeps_the_combinations_with_fewer_filters(df):
+    entries = materialize_cubes([(df, ['Plant'])], 2**30)[0].entries
+    cube = materialize_cubes([(df, ['Plant'])], 3000)[0]
+
+    assert get_cube(df, ['Plant']) is cube
+    assert len(cube.entries) < len(entries)
+    assert {key for key in entries if sum(value is not None for value in key) <= 1} <= set(cube.entries)
+
+
+def test_cube_entries_are_copies(df):
+    materialize_cubes([(df, ['Plant'])], 2**30)
+    filter_and_aggregate(df, ['Plant'], 51, None, None, None)['Ordered Spend'] *= 0
+
+    _assert_equal(
+        filter_and_aggregate(df, ['Plant'], 51, None, None, None),
+        _on_the_fly(df, ['Plant'], (51, None, None, None)),
+    )
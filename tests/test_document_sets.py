@@ -0,0 +1,105 @@
+"""Tests of the exact distinct document counts of the pre-aggregates."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from charts.config import NUMBER_OF_ORDERS, ORDERED_SPEND
+from utils import callbacks
+from utils.aggregates import AggregateRegistry
+from utils.cube import aggregate_measures, pre_aggregate
+from utils.data_prep import DATA_PATH, prepare_data, read_raw_data
+from utils.document_sets import DOCUMENT_COLUMN, count_all_documents, count_documents
+from utils.partitions import PartitionedData, split_partitions
+
+GROUP_COLUMNS = ['Company Code', 'Plant', 'Material Group']
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(0)
+    number_of_rows = 5000
+
+    # Few documents, so that most of them span several groups
+    return pd.DataFrame({
+        'Company Code': rng.choice([51, 52], number_of_rows),
+        'Plant': rng.choice([5100, 5200, 5300], number_of_rows),
+        'Material Group': pd.Categorical(rng.choice(['4017', '4711', 'C14A'], number_of_rows)),
+        DOCUMENT_COLUMN: rng.integers(4500000000, 4500000400, number_of_rows),
+        'Net Value': rng.random(number_of_rows) * 1000,
+    })
+
+
+def _expected(df: pd.DataFrame, by: list[str]) -> pd.DataFrame:
+    return df.groupby(by, observed=True).agg(**{
+        NUMBER_OF_ORDERS: (DOCUMENT_COLUMN, 'nunique'),
+        ORDERED_SPEND: ('Net Value', 'sum'),
+    }).sort_index().reset_index()
+
+
+@pytest.mark.parametrize('by', [['Company Code'], ['Plant', 'Material Group'], GROUP_COLUMNS])
+def test_rolled_up_counts_match_nunique(df, by):
+    result = aggregate_measures(pre_aggregate(df, GROUP_COLUMNS), by)
+    pd.testing.assert_frame_equal(result, _expected(df, by), check_dtype=False)
+
+
+def test_total_count_matches_nunique(df):
+    result = aggregate_measures(pre_aggregate(df, GROUP_COLUMNS), [])
+
+    assert result[NUMBER_OF_ORDERS] == df[DOCUMENT_COLUMN].nunique()
+    assert result[ORDERED_SPEND] == pytest.approx(df['Net Value'].sum())
+
+
+def test_filtered_counts_match_nunique(df):
+    aggregate = pre_aggregate(df, GROUP_COLUMNS)
+    result = aggregate_measures(aggregate.loc[aggregate['Plant'] == 5200], ['Material Group'])
+
+    pd.testing.assert_frame_equal(result, _expected(df.loc[df['Plant'] == 5200], ['Material Group']), check_dtype=False)
+
+
+@pytest.fixture(scope='module')
+def raw():
+    return read_raw_data(DATA_PATH)
+
+
+def _registry(df: pd.DataFrame, version: str) -> AggregateRegistry:
+    partitions = split_partitions(df)
+    data = PartitionedData(version, list(partitions), partitions.__getitem__, set(), partitions)
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(callbacks, 'load_data', lambda: data)
+        return callbacks.create_aggregates()
+
+
+@pytest.fixture(scope='module')
+def appended_and_rebuilt(raw):
+    # The delta shares documents with the data, without moving the compared periods
+    rng = np.random.default_rng(1)
+    is_delta = rng.random(len(raw)) < 0.15
+    is_delta[raw['Document Date'] == raw['Document Date'].max()] = False
+
+    registry = _registry(prepare_data(raw.loc[~is_delta].reset_index(drop=True)), 'base')
+    registry.build_all()
+    appended = registry.append(prepare_data(raw.loc[is_delta].reset_index(drop=True)), 'delta')
+
+    assert appended.data().latest == registry.data().latest
+    return appended, _registry(prepare_data(raw.copy()), 'all')
+
+
+@pytest.mark.parametrize('name', callbacks.create_aggregates().names)
+def test_appended_pre_aggregates_match_rebuild(appended_and_rebuilt, name):
+    appended, rebuilt = appended_and_rebuilt
+
+    pd.testing.assert_frame_equal(
+        appended.get(name),
+        rebuilt.get(name),
+        check_dtype=False,
+        check_categorical=False,
+        check_exact=False,
+    )
+
+
+def test_counts_of_no_rows():
+    documents = np.empty(0, dtype=np.int64)
+
+    assert count_documents(documents, np.empty(0, dtype=np.int64), 2).tolist() == [0, 0]
+    assert count_all_documents(documents) == 0
@@ -0,0 +1,89 @@
+"""Tests of the filter index and of the registry attaching values to DataFrames."""
+import gc
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import frame_registry
+from utils.filter_index import FILTER_COLUMNS, get_filter_index
+from utils.memoize import get_fingerprint, set_fingerprint
+
+# A value of every filter column and one that does not occur
+FILTER_VALUES = {
+    'Company Code': (51, 99),
+    'Purchasing Org.': (5100, 9999),
+    'Plant': (5200, 9999),
+    'Material Group': ('4017', 'XXXX'),
+}
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(0)
+    number_of_rows = 2000
+
+    return pd.DataFrame({
+        'Company Code': rng.choice([51, 52], number_of_rows),
+        'Purchasing Org.': rng.choice([5100, 5200], number_of_rows),
+        'Plant': rng.choice([5100, 5200, 5300], number_of_rows),
+        'Material Group': pd.Categorical(rng.choice(['4017', '4711', 'C14A'], number_of_rows)),
+        'Net Value': rng.random(number_of_rows),
+    })
+
+
+def _mask_positions(df: pd.DataFrame, filters: dict[str, object]) -> np.ndarray:
+    mask = np.ones(len(df), dtype=bool)
+
+    for column, value in filters.items():
+        mask &= (df[column].astype(str) == value if isinstance(value, str) else df[column] == value).to_numpy()
+
+    return np.flatnonzero(mask)
+
+
+@pytest.mark.parametrize('missing', [False, True])
+@pytest.mark.parametrize('selected', list(itertools.product([False, True], repeat=len(FILTER_COLUMNS))))
+def test_positions_match_boolean_mask(df, selected, missing):
+    filters = {
+        column: FILTER_VALUES[column][missing and column == 'Plant']
+        for column, is_set in zip(FILTER_COLUMNS, selected) if is_set
+    }
+    positions = get_filter_index(df).positions(*[filters.get(column) for column in FILTER_COLUMNS])
+
+    if not filters:
+        assert positions is None
+    else:
+        np.testing.assert_array_equal(positions, _mask_positions(df, filters))
+
+
+@pytest.fixture
+def recycled_id(monkeypatch):
+    """Give every DataFrame the same id, as if each reused the address of the one before."""
+    monkeypatch.setattr(frame_registry, 'id', lambda obj: 0, raising=False)
+
+
+def test_recycled_id_returns_no_stale_fingerprint(recycled_id):
+    df_stale = pd.DataFrame({'a': [1, 2]})
+    set_fingerprint(df_stale, 'stale', 'prepared@v1')
+    df = pd.DataFrame({'a': [3, 4]})
+
+    assert get_fingerprint(df).startswith('content@')
+
+    set_fingerprint(df, 'new', 'prepared@v2')
+    del df_stale
+    gc.collect()
+
+    # Collecting the stale frame keeps the entry of the frame with its id
+    assert get_fingerprint(df) == 'new@prepared@v2'
+
+
+def test_recycled_id_returns_no_stale_filter_index(df, recycled_id):
+    df_stale = df.iloc[:10].copy()
+    get_filter_index(df_stale)
+    del df_stale
+    gc.collect()
+
+    positions = get_filter_index(df).positions(51, None, None, None)
+
+    np.testing.assert_array_equal(positions, _mask_positions(df, {'Company Code': 51}))
@@ -0,0 +1,118 @@
+"""Tests of the background jobs."""
+import threading
+import time
+
+import pytest
+
+from utils.jobs import CANCELLED, DONE, FAILED, JobQueue, progress_part, report_progress
+
+
+@pytest.fixture
+def queue():
+    return JobQueue(max_workers=1)
+
+
+def _wait(queue: JobQueue, job_id: str):
+    """Poll a job until it is finished."""
+    deadline = time.monotonic() + 5
+
+    while time.monotonic() < deadline:
+        job = queue.poll(job_id)
+
+        if job is None or job.finished:
+            return job
+
+        time.sleep(0.01)
+
+    raise AssertionError(f'Job {job_id} did not finish')
+
+
+def _run_until_cancelled(started: threading.Event) -> None:
+    started.set()
+
+    while True:
+        report_progress(0, 1)
+        time.sleep(0.01)
+
+
+def test_done_job_is_polled_once(queue):
+    job_id = queue.submit(lambda a, b: a + b, 1, b=2)
+    job = _wait(queue, job_id)
+
+    assert (job.status, job.result, job.progress) == (DONE, 3, 1.0)
+    assert queue.poll(job_id) is None
+
+
+def test_progress_is_reported_per_part(queue):
+    reported = threading.Event()
+    release = threading.Event()
+
+    def render():
+        with progress_part(1, 2):
+            report_progress(1, 2)
+
+        reported.set()
+        release.wait(5)
+
+    job_id = queue.submit(render)
+    reported.wait(5)
+
+    assert queue.poll(job_id).progress == 0.75
+
+    release.set()
+    assert _wait(queue, job_id).status == DONE
+
+
+def test_superseding_a_pending_job_drops_it(queue):
+    started = threading.Event()
+    running_id = queue.submit(_run_until_cancelled, started)
+    started.wait(5)
+
+    pending_id = queue.submit(lambda: 'pending')
+    superseding_id = queue.submit(lambda: 'superseding', supersedes=pending_id)
+
+    assert queue.poll(pending_id).status == CANCELLED
+
+    queue.cancel(running_id)
+
+    assert _wait(queue, superseding_id).result == 'superseding'
+
+
+def test_superseding_a_running_job_stops_it_at_its_next_progress_report(queue):
+    started = threading.Event()
+    running_id = queue.submit(_run_until_cancelled, started)
+    started.wait(5)
+
+    superseding_id = queue.submit(lambda: 'superseding', supersedes=running_id)
+
+    assert _wait(queue, running_id).status == CANCELLED
+    assert _wait(queue, superseding_id).result == 'superseding'
+
+
+def test_failed_job_is_polled_once(queue):
+    job_id = queue.submit(lambda: 1 / 0)
+    job = _wait(queue, job_id)
+
+    assert (job.status, job.result) == (FAILED, None)
+    assert queue.poll(job_id) is None
+
+
+def test_finished_job_expires_unless_polled():
+    queue = JobQueue(max_workers=1, result_timeout=0)
+    failed_id = queue.submit(lambda: 1 / 0)
+
+    # A single worker runs the jobs in turn, the failed job is finished once the next one is
+    _wait(queue, queue.submit(lambda: None))
+    queue.submit(lambda: None)
+
+    assert queue.poll(failed_id) is None
+
+
+def test_job_of_another_process_is_failed(queue):
+    job = queue.poll('0-0123456789abcdef')
+
+    assert job.status == FAILED
+
+
+def test_report_progress_outside_of_jobs_is_a_no_op():
+    report_progress(1, 2)
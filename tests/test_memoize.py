@@ -0,0 +1,55 @@
+"""Tests of the memoization keyed on DataFrame fingerprints."""
+import pandas as pd
+import pytest
+from flask_caching.backends import SimpleCache
+
+from utils import memoize as memoize_module
+from utils.memoize import invalidate_version, memoize, set_fingerprint
+
+
+@pytest.fixture(autouse=True)
+def cache(monkeypatch):
+    cache = SimpleCache(threshold=1000, default_timeout=0)
+    monkeypatch.setattr(memoize_module, 'cache', cache)
+    monkeypatch.setattr(memoize_module, '_fingerprints_by_key', memoize_module.OrderedDict())
+    return cache
+
+
+@memoize
+def count_rows(df: pd.DataFrame) -> int:
+    return len(df)
+
+
+def _frame(version: str, number_of_rows: int = 3) -> pd.DataFrame:
+    df = pd.DataFrame({'a': range(number_of_rows)})
+    set_fingerprint(df, 'frame', f'prepared@{version}')
+    return df
+
+
+def test_invalidate_version_deletes_the_results_of_the_version(cache):
+    df_v1, df_v2 = _frame('v1'), _frame('v2', 4)
+    count_rows(df_v1)
+    count_rows(df_v2)
+
+    assert invalidate_version('prepared@v1') == 1
+    assert invalidate_version('prepared@v1') == 0
+    assert len(memoize_module._fingerprints_by_key) == 1
+    assert count_rows(df_v2) == 4
+
+
+def test_tracked_keys_are_bounded(cache, monkeypatch):
+    monkeypatch.setattr(memoize_module, 'MAX_TRACKED_KEYS', 2)
+    frames = [_frame(f'v{version}') for version in range(3)]
+
+    for df in frames:
+        count_rows(df)
+
+    # The least recently used key is forgotten, the others are still deleted with their version
+    assert len(memoize_module._fingerprints_by_key) == 2
+    assert invalidate_version('prepared@v0') == 0
+    assert invalidate_version('prepared@v1') == 1
+
+    count_rows(frames[2])
+    count_rows(_frame('v3'))
+
+    assert invalidate_version('prepared@v2') == 1
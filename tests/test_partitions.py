@@ -0,0 +1,61 @@
+"""Tests of the month partitions of the prepared data and their on-disk cache."""
+import pandas as pd
+import pytest
+
+from utils import ingest_cache
+from utils.ingest_cache import read_partition, read_partition_keys, write_partitions
+from utils.partitions import PartitionedData
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest_cache, 'CACHE_DIR', str(tmp_path))
+    return tmp_path
+
+
+def _partitions(offset: int) -> dict[str, pd.DataFrame]:
+    return {
+        key: pd.DataFrame({'Order Quantity': range(offset + month, offset + month + 1000)})
+        for month, key in enumerate(['2020-01', '2020-02', '2020-03'])
+    }
+
+
+def _load(content_hash: str) -> PartitionedData:
+    keys = read_partition_keys(content_hash)
+    return PartitionedData(content_hash, keys, lambda key: read_partition(content_hash, key), set(keys), max_bytes=1)
+
+
+def test_evicted_partition_is_reloaded_after_a_version_change():
+    partitions = _partitions(0)
+    assert write_partitions(partitions, 'a')
+    data = _load('a')
+
+    for key in data.keys:
+        data.partition(key)
+
+    assert list(data._loaded) == ['2020-03']
+
+    assert write_partitions(_partitions(10), 'b')
+
+    for key, partition in partitions.items():
+        pd.testing.assert_frame_equal(data.partition(key), partition)
+
+
+def test_entries_older_than_the_previous_one_are_removed():
+    for content_hash in ('a', 'b', 'c'):
+        assert write_partitions(_partitions(0), content_hash)
+
+    assert read_partition_keys('a') is None
+    assert read_partition_keys('b') == ['2020-01', '2020-02', '2020-03']
+    assert read_partition_keys('c') == ['2020-01', '2020-02', '2020-03']
+
+
+def test_entry_in_use_is_kept_after_switching_back():
+    for content_hash in ('a', 'b'):
+        assert write_partitions(_partitions(0), content_hash)
+
+    data = _load('a')
+    assert write_partitions(_partitions(0), 'c')
+
+    pd.testing.assert_frame_equal(data.partition('2020-01'), _partitions(0)['2020-01'])
+    assert read_partition_keys('b') is None
@@ -0,0 +1,113 @@
+"""Tests of the periods compared by the charts."""
+import pandas as pd
+import pytest
+
+from utils import periods
+from utils.periods import PERIOD_COLUMN, Comparison, get_comparison, period_labels, select_periods
+
+
+@pytest.fixture
+def df():
+    # One order line per month from Dec 2018 to Jan 2021 and one without a date
+    document_dates = pd.Series([*pd.date_range('2018-12-01', '2021-01-01', freq='MS') + pd.Timedelta(days=14), pd.NaT])
+
+    return pd.DataFrame({
+        'Year/Month': document_dates.dt.to_period('M'),
+        'Month': document_dates.dt.month,
+        'Net Value': range(len(document_dates)),
+    })
+
+
+@pytest.mark.parametrize('month', ['2020-01', '2020-06', '2020-12'])
+def test_year_covers_the_calendar_year(month):
+    comparison = Comparison('year', pd.Period(month, 'M'))
+
+    assert (comparison.current.start, comparison.current.end) == (pd.Period('2020-01', 'M'), pd.Period('2020-12', 'M'))
+    assert (comparison.prior.start, comparison.prior.end) == (pd.Period('2019-01', 'M'), pd.Period('2019-12', 'M'))
+    assert (comparison.current.label, comparison.prior.label) == ('2020', '2019')
+
+
+@pytest.mark.parametrize('month, start, end, label', [
+    ('2020-01', '2020-01', '2020-03', 'Q1 2020'),
+    ('2020-03', '2020-01', '2020-03', 'Q1 2020'),
+    ('2020-04', '2020-04', '2020-06', 'Q2 2020'),
+    ('2020-12', '2020-10', '2020-12', 'Q4 2020'),
+])
+def test_quarter_covers_the_calendar_quarter(month, start, end, label):
+    comparison = Comparison('quarter', pd.Period(month, 'M'))
+
+    assert (comparison.current.start, comparison.current.end) == (pd.Period(start, 'M'), pd.Period(end, 'M'))
+    assert (comparison.prior.start, comparison.prior.end) == (pd.Period(start, 'M') - 12, pd.Period(end, 'M') - 12)
+    assert comparison.current.label == label
+    assert comparison.prior.label == label.replace('2020', '2019')
+
+
+def test_rolling_window_spans_the_turn_of_the_year():
+    comparison = Comparison('rolling', pd.Period('2020-02', 'M'), 3)
+
+    assert comparison.current.months == [12, 1, 2]
+    assert comparison.current.label == 'Dec 2019 - Feb 2020'
+    assert comparison.prior.label == 'Dec 2018 - Feb 2019'
+
+
+def test_month_compares_the_same_month_one_year_earlier():
+    comparison = Comparison('month', pd.Period('2020-06', 'M'))
+
+    assert (comparison.current.label, comparison.prior.label) == ('Jun 2020', 'Jun 2019')
+
+
+def test_comparison_is_keyed_on_its_periods():
+    assert Comparison('year', pd.Period('2020-01', 'M')) == Comparison('year', pd.Period('2020-12', 'M'))
+    assert Comparison('year', pd.Period('2020-12', 'M')) != Comparison('year', pd.Period('2021-01', 'M'))
+    assert Comparison('quarter', pd.Period('2020-01', 'M')) != Comparison('year', pd.Period('2020-01', 'M'))
+
+
+def test_get_comparison_follows_the_settings(monkeypatch):
+    monkeypatch.setattr(periods, 'DASHBOARD_PERIOD', 'quarter')
+
+    assert get_comparison(pd.Period('2020-05', 'M')).current.label == 'Q2 2020'
+
+    monkeypatch.setattr(periods, '_period_end', pd.Period('2019-12', 'M'))
+
+    assert get_comparison(pd.Period('2020-05', 'M')).current.label == 'Q4 2019'
+
+
+@pytest.mark.parametrize('month, current, prior', [
+    ('2020-12', ['2020-01', '2020-12'], ['2019-01', '2019-12']),
+    ('2021-01', ['2021-01', '2021-01'], ['2020-01', '2020-12']),
+])
+def test_select_periods_of_a_year(df, month, current, prior):
+    comparison = Comparison('year', pd.Period(month, 'M'))
+    df_periods = select_periods(df, comparison)
+    prior_label, current_label = comparison.prior.label, comparison.current.label
+
+    assert period_labels(df_periods) == (current_label, prior_label)
+    assert df_periods[PERIOD_COLUMN].cat.ordered
+
+    # The prior period first, both in chronological order
+    labels = df_periods[PERIOD_COLUMN].astype(str)
+    months = df_periods['Year/Month'].astype(str)
+
+    assert labels.tolist() == sorted(labels, key=[prior_label, current_label].index)
+    assert [months[labels == current_label].min(), months[labels == current_label].max()] == current
+    assert [months[labels == prior_label].min(), months[labels == prior_label].max()] == prior
+    assert months.is_monotonic_increasing
+
+
+def test_select_periods_of_a_quarter(df):
+    df_periods = select_periods(df, Comparison('quarter', pd.Period('2020-02', 'M')))
+
+    assert df_periods['Year/Month'].astype(str).tolist() == [
+        '2019-01', '2019-02', '2019-03', '2020-01', '2020-02', '2020-03'
+    ]
+    assert df_periods[PERIOD_COLUMN].astype(str).tolist() == ['Q1 2019'] * 3 + ['Q1 2020'] * 3
+    assert df_periods['Month'].cat.categories.tolist() == [1, 2, 3]
+
+
+def test_select_periods_orders_months_of_a_rolling_window(df):
+    df_periods = select_periods(df, Comparison('rolling', pd.Period('2020-02', 'M'), 3))
+
+    assert df_periods['Month'].cat.categories.tolist() == [12, 1, 2]
+    assert df_periods.sort_values([PERIOD_COLUMN, 'Month'])['Year/Month'].astype(str).tolist() == [
+        '2018-12', '2019-01', '2019-02', '2019-12', '2020-01', '2020-02'
+    ]
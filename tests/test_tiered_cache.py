@@ -0,0 +1,125 @@
+"""Tests of the two-tier cache backend."""
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.tiered_cache import TieredCache, estimate_size
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return str(tmp_path / 'cache')
+
+
+def _cache(cache_dir: str, **kwargs) -> TieredCache:
+    return TieredCache(cache_dir, gc_interval=0, **kwargs)
+
+
+def test_estimate_size():
+    df = pd.DataFrame({'a': np.arange(1000, dtype=np.int64)})
+
+    assert estimate_size(b'x' * 100) == 100
+    assert estimate_size('x' * 100) == 100
+    assert estimate_size(df) >= 8000
+    assert estimate_size({'a': list(range(100))}) > 100
+
+
+def test_memory_tier_evicts_least_recently_used_entries(cache_dir):
+    cache = _cache(cache_dir, memory_max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.memory_stats()['entries'] == 2
+    assert cache._memory_get('b') is None
+    assert cache._memory_get('a') == 1
+
+    # Written through to the file system, the evicted entry is still served
+    assert cache.get('b') == 2
+
+
+def test_memory_tier_is_bounded_by_bytes(cache_dir):
+    cache = _cache(cache_dir, memory_max_bytes=150)
+    cache.set('a', 'x' * 100)
+    cache.set('b', 'y' * 100)
+    cache.set('too large', 'z' * 200)
+
+    assert cache.memory_stats() == {'entries': 1, 'bytes': 100}
+    assert cache._memory_get('b') == 'y' * 100
+    assert cache.get('too large') == 'z' * 200
+
+
+def test_disk_hit_is_promoted_into_the_memory_tier(cache_dir):
+    _cache(cache_dir).set('a', {'figure': 1})
+
+    # Another worker process sharing the cache directory
+    cache = _cache(cache_dir)
+
+    assert cache.memory_stats()['entries'] == 0
+    assert cache.get('a') == {'figure': 1}
+    assert cache.memory_stats()['entries'] == 1
+
+
+def test_expired_entries_are_not_served(cache_dir):
+    cache = _cache(cache_dir)
+    cache.set('a', 1, timeout=1)
+    cache.set('b', 2, timeout=0)
+    time.sleep(1.1)
+
+    assert cache.get('a') is None
+    assert not cache.has('a')
+    assert cache.get('b') == 2
+
+
+def test_delete_removes_both_tiers(cache_dir):
+    cache = _cache(cache_dir)
+    cache.set('a', 1)
+    cache.delete('a')
+
+    assert cache.get('a') is None
+    assert cache.memory_stats()['entries'] == 0
+
+
+def test_garbage_collection_removes_expired_and_least_recently_used_files(cache_dir):
+    cache = _cache(cache_dir, disk_max_bytes=0)
+    cache.set('expired', 0, timeout=1)
+
+    for age, key in enumerate(['new', 'old', 'oldest']):
+        cache.set(key, 'x' * 1000, timeout=0)
+        modified_at = time.time() - 100 * (age + 1)
+        os.utime(cache._get_filename(key), (modified_at, modified_at))
+
+    time.sleep(1.1)
+    file_size = os.path.getsize(cache._get_filename('new'))
+
+    # Without a disk quota only the expired file is removed
+    assert cache.collect_garbage() == 1
+
+    cache.disk_max_bytes = 2 * file_size
+
+    assert cache.collect_garbage() == 1
+    assert not os.path.exists(cache._get_filename('oldest'))
+    assert os.path.exists(cache._get_filename('old'))
+    assert os.path.exists(cache._get_filename('new'))
+
+
+def test_disk_hit_refreshes_the_file_for_the_garbage_collection(cache_dir):
+    cache = _cache(cache_dir, disk_max_bytes=0)
+
+    for age, key in enumerate(['new', 'old']):
+        cache.set(key, 'x' * 1000, timeout=0)
+        modified_at = time.time() - 100 * (age + 1)
+        os.utime(cache._get_filename(key), (modified_at, modified_at))
+
+    # Read from the file system tier of another worker process
+    assert _cache(cache_dir).get('old') == 'x' * 1000
+
+    cache.disk_max_bytes = os.path.getsize(cache._get_filename('new'))
+
+    assert cache.collect_garbage() == 1
+    assert os.path.exists(cache._get_filename('old'))
+    assert not os.path.exists(cache._get_filename('new'))